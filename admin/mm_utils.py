@@ -5,6 +5,12 @@ We have some slightly altered versions due to the lack of functionality
 in os and sys breaking the core ones
 
 ===== History =====
+ v3.6 - 18/10/2026:
+ admin.listPlayers is now retrieved via the ModManager rcon query cache
+
+ v3.5 - 18/10/2026:
+ Added UpdatePriority constants for ModManager.registerUpdates
+
  v3.4 - 27/01/2010:
  Fixed get_cd_key_hash for BFHeroes and BFP4F
 
@@ -101,7 +107,7 @@ import types
 import host
 import bf2
 
-__version__ = 3.4
+__version__ = 3.6
 
 __all__ = [
 	# custom methods
@@ -219,6 +225,11 @@ class BanMethod:
 	key = 'Key'
 	address = 'Address'
 
+class UpdatePriority:
+	low = 0
+	normal = 1
+	high = 2 # always run even if the frame budget is exhausted
+
 timers = {}
 mm = None
 
@@ -362,7 +373,7 @@ def get_cd_key_hash( player ):
 
 	id_re = re.compile( "Id:\s+%d\s+-" % player.index )
 	found = False
-	for line in host.rcon_invoke( "admin.listPlayers" ).split( '\n' ):
+	for line in mm.rconQuery( "admin.listPlayers" ).split( '\n' ):
 		line = line.strip()
 		match = id_re.search( line )
 		if match is not None:
@@ -390,7 +401,7 @@ def get_player_details():
 	if allset:
 		return players_hash.values()
 
-	rawData = host.rcon_invoke( "admin.listplayers" )
+	rawData = mm.rconQuery( "admin.listplayers" )
 
 	# Thanks Woody http://bf2.fun-o-matic.org/index.php/Cookbook:Accessing_CD_Key_Hash
 	pattern = re.compile(r'''^Id:\ +(\d+)					# PlayerID
@@ -417,7 +428,7 @@ def get_player_by_cd_key_hash( cdkeyhash ):
 	"""Find a player by cdkeyhash."""
 	id_re = re.compile( "Id:\s+(\d+)\s+-" )
 	playerid = None
-	for line in host.rcon_invoke( "admin.listPlayers" ).split( '\n' ):
+	for line in mm.rconQuery( "admin.listPlayers" ).split( '\n' ):
 		line = line.strip()
 		match =  id_re.search( line )
 		if match is not None:
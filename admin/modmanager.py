@@ -53,6 +53,28 @@ framework and Rcon implementation.
  # The format for the log date
  modmanager.logDateFormat "[%Y-%m-%d %H:%M:%S] "
 
+ # Enable / disable profiling of the update requestors and event handlers
+ modmanager.profileEnable 0
+
+ # The time in milliseconds each frame may spend running normal and low
+ # priority update requestors, 0 = unlimited. At least one due requestor of
+ # each priority is always run
+ modmanager.updateBudget 0
+
+ # How often in seconds the player roster is checked against the engine
+ # to correct any missed events, 0 = never
+ modmanager.rosterResync 60
+
+ # Save parameter changes made by modules and mm setParam while the
+ # server is running, hand edits made to the config in the meantime are
+ # overwritten
+ modmanager.saveOnChange 0
+
+ # When saveOnChange is enabled parameter changes are saved after this
+ # many seconds, any further changes made in the meantime being saved at
+ # the same time, 0 = immediately
+ modmanager.saveDelay 10
+
 ===== Rcon methods =====
  # Print the running config
  mm printRunningConfig
@@ -78,11 +100,81 @@ framework and Rcon implementation.
  # Set the parameter of a module
  mm setParam <module_name> <param> <value>
 
+ # Dump and reset the update and event profile or enable / disable profiling
+ mm profile [on|off]
+
+ # Show the rcon query cache statistics or clear the cache
+ mm rconCache [clear]
+
 ===== Notes =====
 * Its not currently garanteed that shutdown methods are called when the server exits. Due to this autoSave may be unreliable
 * Setting the parameter of a module may not take effect until that module is reloaded or the server restarted ( requires saveConfig )
+* debug( level, fmt, args... ), info( fmt, args... ) and warn( fmt, args... ) only format the message if it will be logged. Use isDebugEnabled( level ) to skip building expensive debug output altogether
+* registerHandler( event, method, alwaysTrigger ) and unregisterHandler( event, method ) should be used instead of host.registerHandler so that modules stop receiving events when shutdown
+* roster() returns the PlayerRoster which indexes the connected players by team, squad, commander and AI / human. It is updated from the host events so queries dont need to walk bf2.playerManager.getPlayers(). Modules which change a players team or squad should call roster().updatePlayer( player ) afterwards
+* rconQuery( cmd ) should be used instead of host.rcon_invoke for read only console queries. Queries listed in rconQueryTTLs are cached for the given number of seconds, the cache being invalidated by the matching console commands run via the rcon exec command, player connects / disconnects and game status changes
+* The parsed config is cached in modmanager.con.cache and reused on startup while the size and md5 digest of modmanager.con are unchanged
+* The config is saved to modmanager.con.tmp which is then renamed over modmanager.con. Automatic saves only re-render the sections of modules whose parameters have changed via setParam, addParam or removeParam, modules which modify their config dict directly are written out by the next mm saveConfig or shutdown
+* publishEvent( event, fields... ) sends an event to the rcon clients subscribed to it, doing nothing if the rcon module doesnt support subscriptions
+* createTimer( method, delay, data ) returns a timer with the same setRecurring / destroy interface as bf2.Timer. All timers are held in a single heap driven from update() so the engine sees no per item timers
+* registerUpdates( method, priority, frequency ) takes an mm_utils.UpdatePriority and the target number of calls per second ( 0 = every frame ). High priority requestors always run, normal and low priority requestors are run round robin until the frame budget is exhausted
 
 ===== History =====
+ v3.8 - 18/10/2026
+ The roster now adds a player it isnt tracking when asked for their team or squad instead of raising KeyError
+
+ v3.7 - 18/10/2026
+ The config cache is now keyed by the md5 digest of the config so edits which keep its size and modification time are no longer ignored
+
+ v3.6 - 18/10/2026
+ Added publishEvent which passes events to the rcon module if it supports subscriptions
+
+ v3.5 - 18/10/2026
+ autoSave once again only saves the config at shutdown, saving parameter changes after saveDelay now requires the new saveOnChange option
+
+ v3.4 - 18/10/2026
+ A config line which fails to apply is logged with its line number again and no longer stops the rest of the config being applied
+
+ v3.3 - 18/10/2026
+ updateBudget no longer includes the time taken by the high priority requestors and at least one normal and one low priority requestor is run each frame
+ Update requestors can now be unregistered by an update
+
+ v3.2 - 18/10/2026
+ debug, info and warn now take optional format arguments which are only applied if the message is logged
+ Added isDebugEnabled
+
+ v3.1 - 18/10/2026
+ The log date is now only formatted once a second
+
+ v3.0 - 18/10/2026
+ With autoSave enabled parameter changes are now saved after saveDelay, changes made in the meantime being saved together
+ The config is now saved to a temporary file which is renamed over the original
+ Automatic saves reuse the rendered text of module sections which havent changed
+ Fixed reference to an undefined ctx when writing the config failed
+
+ v2.9 - 18/10/2026
+ The parsed config is now cached next to the config file and reused on startup if the file is unchanged
+
+ v2.8 - 18/10/2026
+ Added rconQuery which caches read only console queries and the rconCache rcon method
+
+ v2.7 - 18/10/2026
+ Added the player roster index available via roster()
+
+ v2.6 - 18/10/2026
+ Added registerHandler and unregisterHandler which dispatch host events to modules and support unregistering
+ mm profile now includes per event handler statistics
+
+ v2.5 - 18/10/2026
+ Added createTimer which schedules callbacks on a single ModManager owned timer heap
+
+ v2.4 - 18/10/2026
+ registerUpdates now takes an optional priority and frequency
+ Added updateBudget which limits the time spent on normal and low priority update requestors each frame
+
+ v2.3 - 18/10/2026
+ Added update requestor profiling and the profile rcon method
+
  v2.2c - 14/05/2013
  Added dependant_day_night to Heroes
  
@@ -214,11 +306,15 @@ import mm_utils
 import datetime
 import time
 import re
+import bisect
+import heapq
+import marshal
+import md5
 import host
 import bf2
 import bf2.stats.constants
 
-__version__ = 2.2
+__version__ = 3.8
 
 __description__ = "Multiplay, ModManager v%s" % __version__
 
@@ -274,8 +370,65 @@ configDefaults = {
 
 	# The format for the log date
 	'logDateFormat': "[%Y-%m-%d %H:%M:%S] ",
+
+	#
+	# Profile settings
+	#
+	# Enable / disable profiling of the update requestors and event handlers
+	'profileEnable': 0,
+
+	#
+	# Update settings
+	#
+	# The time in milliseconds each frame may spend running normal and
+	# low priority update requestors, 0 = unlimited
+	'updateBudget': 0,
+
+	#
+	# Roster settings
+	#
+	# How often in seconds the player roster is checked against the engine
+	# to correct any missed events, 0 = never
+	'rosterResync': 60,
+
+	#
+	# Save settings
+	#
+	# Save parameter changes while the server is running
+	'saveOnChange': 0,
+	# When saveOnChange is enabled parameter changes are saved after this
+	# many seconds, 0 = immediately
+	'saveDelay': 10,
+}
+
+# The best wall clock for timing short calls on this platform
+if 'win32' == sys.platform:
+	frameTimer = time.clock
+else:
+	frameTimer = time.time
+
+# Read only console queries which rconQuery caches and for how many seconds
+rconQueryTTLs = {
+	'maplist.list': 10,
+	'admin.nextlevel': 10,
+	'sv.servername': 60,
+	'sv.numreservedslots': 60,
+	'reservedslots.list': 60,
+	'admin.listplayers': 2,
 }
 
+# Console command prefixes and the cached queries they invalidate
+# N.B. running a cached query with arguments e.g. sv.serverName "x" always invalidates it
+rconQueryInvalidates = [
+	( 'maplist.', [ 'maplist.list', 'admin.nextlevel' ] ),
+	( 'admin.runnextlevel', [ 'admin.nextlevel' ] ),
+	( 'admin.kickplayer', [ 'admin.listplayers' ] ),
+	( 'reservedslots.', [ 'reservedslots.list', 'sv.numreservedslots' ] ),
+]
+
+# The upper bounds in milliseconds of the profile histogram buckets
+profileBuckets = [ 0.1, 0.5, 1, 2, 5, 10, 20, 50 ]
+
 class ModuleStatus:
 	unloaded = 0
 	loaded = 1
@@ -307,6 +460,382 @@ class DebugLogger:
 		if self.__file:
 			self.__file.close()
 
+class MethodProfile:
+	"""The timing statistics for a single profiled method."""
+	def __init__( self, name ):
+		"""Create an empty profile for the named method."""
+		self.name = name
+		self.calls = 0
+		self.total = 0.0
+		self.min = None
+		self.max = 0.0
+		self.histogram = [ 0 ] * ( len( profileBuckets ) + 1 )
+
+	def record( self, elapsed ):
+		"""Record a single call which took elapsed seconds."""
+		self.calls += 1
+		self.total += elapsed
+		if self.min is None or elapsed < self.min:
+			self.min = elapsed
+		if elapsed > self.max:
+			self.max = elapsed
+		self.histogram[bisect.bisect_left( profileBuckets, elapsed * 1000 )] += 1
+
+	def mean( self ):
+		"""Return the mean call time in seconds."""
+		if self.calls:
+			return self.total / self.calls
+		return 0.0
+
+class UpdateRequestor:
+	"""A method registered for updates and its scheduling details."""
+	def __init__( self, method, priority, frequency ):
+		"""Create a requestor which is called at most frequency times a second."""
+		self.method = method
+		self.priority = priority
+		self.interval = 0
+		if frequency:
+			self.interval = 1.0 / frequency
+		self.due = 0
+		self.active = True
+
+class EventDispatcher:
+	"""Fans a single host event out to the handlers registered for it."""
+	def __init__( self, manager, event ):
+		"""Create a dispatcher with no handlers."""
+		self.manager = manager
+		self.event = event
+		self.handlers = []
+		self.profiles = {}
+
+	def add( self, method ):
+		"""Add a handler."""
+		# copy on write so handlers can be changed during a dispatch
+		self.handlers = self.handlers + [ method ]
+
+	def remove( self, method ):
+		"""Remove a handler returning True if it was registered."""
+		if method not in self.handlers:
+			return False
+		handlers = self.handlers[:]
+		handlers.remove( method )
+		self.handlers = handlers
+		return True
+
+	def dispatch( self, *args ):
+		"""Called by the host, pass the event on to all the handlers."""
+		if not self.manager.profileEnable:
+			for method in self.handlers:
+				try:
+					method( *args )
+				except StandardError, detail:
+					self.manager.error( "Failed to handle '%s' in '%s' (%s)" % ( self.event, mm_utils.method_name( method ), detail ), True )
+			return
+
+		for method in self.handlers:
+			start = frameTimer()
+			try:
+				method( *args )
+			except StandardError, detail:
+				self.manager.error( "Failed to handle '%s' in '%s' (%s)" % ( self.event, mm_utils.method_name( method ), detail ), True )
+
+			elapsed = frameTimer() - start
+			try:
+				self.profiles[method].record( elapsed )
+			except KeyError:
+				profile = self.profiles[method] = MethodProfile( "%s %s" % ( self.event, mm_utils.method_name( method ) ) )
+				profile.record( elapsed )
+
+class PlayerRoster:
+	"""An index of the connected players maintained from the host events.
+
+	Answers team, squad, commander and AI / human questions without
+	querying every player from the engine. Squads are keyed by team and
+	squad id as squad ids are only unique within a team.
+	"""
+	def __init__( self, manager ):
+		"""Create an empty roster."""
+		self.manager = manager
+		self.__handlers = []
+		self.clear()
+
+	def clear( self ):
+		"""Forget all players."""
+		self.__players = {}
+		self.__teamOf = {}
+		self.__squadOf = {}
+		self.__teams = {}
+		self.__squads = {}
+		self.__commanders = {}
+		self.__ai = {}
+		self.__joining = {}
+
+	def start( self ):
+		"""Register for the events which keep the roster up to date."""
+		for ( event, method ) in (
+			( 'PlayerConnect', self.onPlayerConnect ),
+			( 'PlayerDisconnect', self.onPlayerDisconnect ),
+			( 'PlayerChangeTeams', self.onPlayerChangeTeams ),
+			( 'PlayerChangedSquad', self.onPlayerChangedSquad ),
+			( 'ChangedCommander', self.onChangedCommander ),
+		):
+			try:
+				self.manager.registerHandler( event, method, 1 )
+				self.__handlers.append( ( event, method ) )
+			except StandardError, detail:
+				# Not all games support all events, rosterResync will cover these
+				self.manager.warn( "Roster unable to register for '%s' (%s)" % ( event, detail ) )
+
+		self.refresh()
+
+	def stop( self ):
+		"""Unregister our event handlers."""
+		for ( event, method ) in self.__handlers:
+			self.manager.unregisterHandler( event, method )
+		self.__handlers = []
+
+	def refresh( self, data=None ):
+		"""Rebuild the index from the engine."""
+		self.clear()
+		for player in bf2.playerManager.getPlayers():
+			self.__add( player )
+
+	def updatePlayer( self, player ):
+		"""Re-read the players team, squad and commander status from the engine."""
+		if not self.__players.has_key( player.index ):
+			self.__add( player )
+			return
+
+		team = player.getTeam()
+		self.__place( player, team, player.getSquadId() )
+		self.__setCommander( player, team, player.isCommander() )
+
+	#
+	# Event handlers
+	#
+
+	def onPlayerConnect( self, player ):
+		"""Add the player."""
+		self.__add( player )
+
+	def onPlayerDisconnect( self, player ):
+		"""Remove the player."""
+		index = player.index
+		if not self.__players.has_key( index ):
+			return
+
+		team = self.__teamOf[index]
+		self.__setCommander( player, team, False )
+		self.__unplace( index )
+		del self.__players[index]
+		if self.__ai.has_key( index ):
+			del self.__ai[index]
+		if self.__joining.has_key( index ):
+			del self.__joining[index]
+
+	def onPlayerChangeTeams( self, player, humanHasSpawned ):
+		"""Move the player to their new team."""
+		self.updatePlayer( player )
+
+	def onPlayerChangedSquad( self, player, oldSquad, newSquad ):
+		"""Move the player to their new squad."""
+		if not self.__players.has_key( player.index ):
+			self.__add( player )
+		else:
+			self.__place( player, self.__teamOf[player.index], newSquad )
+
+	def onChangedCommander( self, team, oldCommander, newCommander ):
+		"""Record the teams new commander."""
+		if newCommander is not None:
+			self.__commanders[team] = newCommander
+		elif self.__commanders.has_key( team ):
+			del self.__commanders[team]
+
+	#
+	# Queries
+	#
+
+	def players( self ):
+		"""Return a list of all the players."""
+		return self.__players.values()
+
+	def playerCount( self ):
+		"""Return the number of players."""
+		return len( self.__players )
+
+	def aiCount( self ):
+		"""Return the number of AI players."""
+		return len( self.__ai )
+
+	def humanCount( self ):
+		"""Return the number of human players."""
+		return len( self.__players ) - len( self.__ai )
+
+	def isAIPlayer( self, player ):
+		"""Return True if the player is an AI player."""
+		return self.__ai.has_key( player.index )
+
+	def joiningCount( self ):
+		"""Return the number of players which have not finished connecting."""
+		# only the players still joining are rechecked
+		for ( index, player ) in self.__joining.items():
+			try:
+				if player.isConnected():
+					del self.__joining[index]
+			except StandardError:
+				pass
+
+		return len( self.__joining )
+
+	def getTeam( self, player ):
+		"""Return the players team, adding them to the roster if they're untracked."""
+		try:
+			return self.__teamOf[player.index]
+		except KeyError:
+			# missed their connect or asked before the next refresh
+			self.__add( player )
+			return self.__teamOf[player.index]
+
+	def getSquadId( self, player ):
+		"""Return the players squad id, 0 for no squad, adding them to the roster if they're untracked."""
+		try:
+			return self.__squadOf[player.index]
+		except KeyError:
+			self.__add( player )
+			return self.__squadOf[player.index]
+
+	def teamCount( self, team ):
+		"""Return the number of players in team."""
+		try:
+			return len( self.__teams[team] )
+		except KeyError:
+			return 0
+
+	def teamPlayers( self, team ):
+		"""Return a list of the players in team."""
+		try:
+			return self.__teams[team].values()
+		except KeyError:
+			return []
+
+	def teamAIPlayers( self, team ):
+		"""Return a list of the AI players in team."""
+		players = []
+		for ( index, player ) in self.__teams.get( team, {} ).items():
+			if self.__ai.has_key( index ):
+				players.append( player )
+		return players
+
+	def squadCount( self, team, squad ):
+		"""Return the number of players in the teams squad, squad 0 being those not in a squad."""
+		try:
+			return len( self.__squads[( team, squad )] )
+		except KeyError:
+			return 0
+
+	def squadMembers( self, team, squad ):
+		"""Return a list of the players in the teams squad."""
+		try:
+			return self.__squads[( team, squad )].values()
+		except KeyError:
+			return []
+
+	def commander( self, team ):
+		"""Return the teams commander or None."""
+		return self.__commanders.get( team )
+
+	#
+	# Internal methods
+	#
+
+	def __add( self, player ):
+		"""Add the player reading their details from the engine."""
+		index = player.index
+		self.__players[index] = player
+
+		try:
+			if player.isAIPlayer():
+				self.__ai[index] = player
+		except AttributeError:
+			pass
+
+		try:
+			if not player.isConnected():
+				self.__joining[index] = player
+		except StandardError:
+			self.__joining[index] = player
+
+		team = player.getTeam()
+		self.__place( player, team, player.getSquadId() )
+		self.__setCommander( player, team, player.isCommander() )
+
+	def __place( self, player, team, squad ):
+		"""Move the player to team and squad."""
+		index = player.index
+		if self.__teamOf.has_key( index ):
+			old_team = self.__teamOf[index]
+			if old_team == team and self.__squadOf[index] == squad:
+				return
+
+			if old_team != team:
+				self.__setCommander( player, old_team, False )
+			self.__unplace( index )
+
+		self.__teamOf[index] = team
+		self.__squadOf[index] = squad
+		self.__teams.setdefault( team, {} )[index] = player
+		self.__squads.setdefault( ( team, squad ), {} )[index] = player
+
+	def __unplace( self, index ):
+		"""Remove the player from their team and squad."""
+		team = self.__teamOf.pop( index )
+		squad = self.__squadOf.pop( index )
+		del self.__teams[team][index]
+
+		key = ( team, squad )
+		del self.__squads[key][index]
+		if not self.__squads[key]:
+			del self.__squads[key]
+
+	def __setCommander( self, player, team, isCommander ):
+		"""Update the teams commander."""
+		if isCommander:
+			self.__commanders[team] = player
+		elif self.__commanders.has_key( team ) and self.__commanders[team].index == player.index:
+			del self.__commanders[team]
+
+class Timer:
+	"""A callback scheduled on the ModManager timer heap.
+
+	Provides the same interface as bf2.Timer, the method is called with
+	data when the timer triggers.
+	"""
+	def __init__( self, manager, method, time, data ):
+		"""Create a timer, use ModManager.createTimer instead of calling this directly."""
+		self.manager = manager
+		self.method = method
+		self.time = time
+		self.data = data
+		self.interval = 0
+		self.destroyed = False
+		self.scheduled = False
+
+	def getTime( self ):
+		"""Return the wall time the timer next triggers at."""
+		return self.time
+
+	def setRecurring( self, interval ):
+		"""Make the timer trigger every interval seconds, 0 disables."""
+		self.interval = interval
+
+	def destroy( self ):
+		"""Cancel the timer."""
+		if not self.destroyed:
+			self.manager.destroyTimer( self )
+
+	# bf2.Timer compatibility
+	abort = destroy
+
 class ModManager( object ):
 	"""The core manager which looks after the modules and configuration."""
 	def __init__( self, debuglog ):
@@ -326,9 +855,34 @@ class ModManager( object ):
 		self.__gameName = self.__bf2Id
 		self.__state = 0
 		self.__logger = None
+		self.__logDateTime = 0
+		self.__logDateString = ''
 		self.__modules = {}
-		self.__updateRequestors = []
+		self.__updateRequestors = {
+			mm_utils.UpdatePriority.high: [],
+			mm_utils.UpdatePriority.normal: [],
+			mm_utils.UpdatePriority.low: [],
+		}
+		self.__updateCursors = {
+			mm_utils.UpdatePriority.normal: 0,
+			mm_utils.UpdatePriority.low: 0,
+		}
+		self.__profiles = {}
+		self.__eventDispatchers = {}
+		self.__roster = PlayerRoster( self )
+		self.__rconCache = {}
+		self.__rconCacheHits = 0
+		self.__rconCacheMisses = 0
+		self.__rconCacheInvalidations = 0
+		self.__rosterTimer = None
+		self.__timers = []
+		self.__timerSeq = 0
+		self.__timersDestroyed = 0
+		self.__profileStart = frameTimer()
+		self.__profileFrames = 0
 		self.__configFull = { __name__: {} }
+		self.__configText = {}
+		self.__saveTimer = None
 		self.__playCount = 0
 		self.__pauseStart = 0
 		self.__matchTimeLost = 0
@@ -389,6 +943,8 @@ class ModManager( object ):
 			'saveConfig': { 'method': self.cmdSaveConfig, 'aliases': [ 'save' ], 'level': 90 },
 			'loadModule': { 'method': self.cmdLoadModule, 'args': '<module_name>', 'aliases': [ 'load' ], 'level': 90 },
 			'listModules': { 'method': self.cmdListModules, 'aliases': [ 'list' ], 'level': 70 },
+			'profile': { 'method': self.cmdProfile, 'args': '[on|off]', 'level': 70 },
+			'rconCache': { 'method': self.cmdRconCache, 'args': '[clear]', 'level': 70 },
 			'shutdownModule': { 'method': self.cmdShutdownModule, 'args': '<module_name>', 'aliases': [ 'shutdown' ], 'level': 90 },
 			'startModule': { 'method': self.cmdStartModule, 'args': '<module_name>', 'aliases': [ 'start' ], 'level': 90 },
 			'reloadModule': { 'method': self.cmdReloadModule, 'args': '<module_name>', 'aliases': [ 'reload' ], 'level': 90 },
@@ -466,6 +1022,8 @@ class ModManager( object ):
 				self.__matchTimeLost = 0
 				self.startTimeUTC = int( time.time() ) + start_delay
 				self.startTimeWall = now + start_delay
+				# teams may have been reassigned by the map change
+				self.__roster.refresh()
 				if 2 == self.__playCount:
 					# We see state change from PreGame -> Playing twice before the round really starts
 					self.roundStarted = True
@@ -480,6 +1038,9 @@ class ModManager( object ):
 		else:
 			self.__pauseStart = 0
 
+		# levels and players change with the game status
+		self.__rconCache = {}
+
 		self.lastGameStatus = self.currentGameStatus
 		self.currentGameStatus = status
 		#self.debug( 3, "STATUS NOW: last = %s, current = %s, playing = %s, started = %s" % ( mm_utils.status_name( self.lastGameStatus ), mm_utils.status_name( self.currentGameStatus ), self.gamePlaying, self.roundStarted ) )
@@ -818,12 +1379,68 @@ class ModManager( object ):
 		return value
 
 	def __parseConfig( self ):
-		"""Parse the configuration file."""
+		"""Load the configuration file, using the compiled cache if its still valid."""
 		self.info( "Loading config '%s'" % ( self.__configFile ) )
 
+		cacheFile = "%s.cache" % self.__configFile
+		start = frameTimer()
+		key = self.__configCacheKey()
+		if key is not None:
+			try:
+				fh = open( cacheFile, 'rb' )
+				try:
+					( cacheKey, parseTime, ops ) = marshal.load( fh )
+				finally:
+					fh.close()
+
+				if cacheKey == key:
+					self.__applyConfig( ops )
+					self.info( "Loaded config cache '%s' in %.1fms ( full parse took %.1fms )" % ( cacheFile, ( frameTimer() - start ) * 1000, parseTime * 1000 ) )
+					return
+
+				self.info( "Config cache '%s' is stale" % cacheFile )
+			except ( IOError, EOFError, ValueError, TypeError ), detail:
+				self.debug( 1, "No valid config cache '%s' (%s)" % ( cacheFile, detail ) )
+
+		ops = self.__readConfig()
+		if ops is None:
+			return
+
+		parseTime = frameTimer() - start
+		self.__applyConfig( ops )
+		self.info( "Parsed config in %.1fms" % ( parseTime * 1000 ) )
+
+		if key is not None:
+			try:
+				fh = open( cacheFile, 'wb' )
+				try:
+					marshal.dump( ( key, parseTime, ops ), fh )
+				finally:
+					fh.close()
+			except IOError, detail:
+				self.warn( "Failed to write config cache '%s' (%s)" % ( cacheFile, detail ) )
+
+	def __configCacheKey( self ):
+		"""Return the key which identifies the current contents of the config file.
+
+		This is the size and md5 digest of the contents, the modification
+		time only has a resolution of a second so can miss edits.
+		"""
+		try:
+			fh = open( self.__configFile, 'rb' )
+			data = fh.read()
+			fh.close()
+		except IOError:
+			return None
+
+		return ( __version__, len( data ), md5.new( data ).hexdigest() )
+
+	def __readConfig( self ):
+		"""Parse the configuration file returning a list of ( op, module, key, val1, val2, lineNo ) operations."""
 		add_re = re.compile( '^add([A-Z].*)$' )
 		set_re = re.compile( '^set([A-Z].*)$' )
 
+		ops = []
 		try:
 			config = open( self.__configFile, 'r' )
 			lineNo = 0
@@ -849,12 +1466,11 @@ class ModManager( object ):
 						if __name__ == module:
 							if "loadModule" == module_key:
 								# loadable module
-								self.__addModule( val1 )
+								ops.append( ( 'load', module, module_key, val1, None, lineNo ) )
 
 							else:
 								# core config file
-								self.__setattr__( module_key, val1 )
-								self.__setParam( module, module_key, val1 )
+								ops.append( ( 'core', module, module_key, val1, None, lineNo ) )
 						else:
 							match = add_re.search( module_key )
 							if match is not None:
@@ -869,23 +1485,50 @@ class ModManager( object ):
 								# <module>.addCmdAlias "b" "ban"
 								# and sets:
 								# <module>.cmdAliass = { 'k': 'kick', 'b': 'ban' }
-								self.__addParam( module, "%c%ss" % ( module_key[3:4].lower(), module_key[4:] ), val1, val2 )
+								ops.append( ( 'add', module, "%c%ss" % ( module_key[3:4].lower(), module_key[4:] ), val1, val2, lineNo ) )
 
 							else:
 								# user single setting
-								self.__setParam( module, module_key, val1 )
+								ops.append( ( 'set', module, module_key, val1, None, lineNo ) )
 
 					except Exception, detail:
 						self.error( 'Syntax error in "%s" on line %d (%s)' % ( self.__configFile, lineNo, detail ), True )
 			config.close()
 		except IOError, detail:
 			self.error( "Couldn't read '%s' (%s)" % ( self.__configFile, detail ) )
+			return None
+
+		return ops
+
+	def __applyConfig( self, ops ):
+		"""Apply the operations returned by __readConfig.
+
+		A failed operation is logged against its line and the rest are
+		still applied.
+		"""
+		for ( op, module, key, val1, val2, lineNo ) in ops:
+			try:
+				if 'set' == op:
+					self.__setParam( module, key, val1 )
+				elif 'add' == op:
+					self.__addParam( module, key, val1, val2 )
+				elif 'core' == op:
+					self.__setattr__( key, val1 )
+					self.__setParam( module, key, val1 )
+				elif 'load' == op:
+					self.__addModule( val1 )
+			except Exception, detail:
+				self.error( 'Syntax error in "%s" on line %d (%s)' % ( self.__configFile, lineNo, detail ), True )
 
 	def __log( self, level, msg ):
 		"""Log the message if its level is less than or equal to the current log level."""
 		if self.logLevel >= level:
-			currentDate = datetime.datetime.today()
-			dateString = time.strftime( self.logDateFormat, currentDate.timetuple() )
+			# the date only changes once a second so only format it then
+			now = int( time.time() )
+			if now != self.__logDateTime:
+				self.__logDateTime = now
+				self.__logDateString = time.strftime( self.logDateFormat, time.localtime( now ) )
+			dateString = self.__logDateString
 			output = ''
 			cr = '\n'
 			if msg.endswith( '\n' ):
@@ -911,6 +1554,7 @@ class ModManager( object ):
 
 	def __setParam( self, module, var, val ):
 		"""Set the modules configuration parameter."""
+		self.__dirtyConfig( module )
 		if self.__configFull.has_key( module ):
 			self.__configFull[module][var] = val
 		else:
@@ -935,11 +1579,13 @@ class ModManager( object ):
 			return 0
 
 		del self.__configFull[module][key][idx]
+		self.__dirtyConfig( module )
 		return 1
 
 	def __addParam( self, module, key, val1, val2=None ):
 		"""Add the modules configuration parameter."""
 		#self.debug( 2, "ADD2: %s.%s = %s, %s" % ( module, key, val1, val2 ) )
+		self.__dirtyConfig( module )
 
 		if val2 is None:
 			#self.debug( 2, "LIST2: %s.%s = %s" % ( module, key, val1 ) )
@@ -983,21 +1629,82 @@ class ModManager( object ):
 		else:
 			return {}
 
-	def __saveConfig( self, ctx=None ):
+	def __dirtyConfig( self, module ):
+		"""Flag the modules config section as needing to be re-rendered."""
+		if self.__configText.has_key( module ):
+			del self.__configText[module]
+
+	def __requestSave( self ):
+		"""Save the config after saveDelay if saveOnChange is enabled.
+
+		Requests made while a save is pending are coalesced into it.
+		"""
+		if not self.saveOnChange or self.__saveTimer is not None:
+			return
+
+		if 0 >= self.saveDelay:
+			self.__saveConfig( None, 0 )
+		else:
+			self.__saveTimer = self.createTimer( self.__onSaveTimer, self.saveDelay )
+
+	def __onSaveTimer( self, data ):
+		"""Perform a pending automatic save."""
+		self.__saveTimer = None
+		self.__saveConfig( None, 0 )
+
+	def __saveConfig( self, ctx=None, full=1 ):
 		"""Save the entire config.
 
+		The config is written to a temporary file which then replaces the
+		original so a failed save never leaves a truncated config. If full
+		is false only the dirty module sections are re-rendered.
+
 		Note: return value 0 indicates success
 		"""
+		# this save includes any pending changes
+		if self.__saveTimer is not None:
+			self.__saveTimer.destroy()
+			self.__saveTimer = None
+
 		try:
-			fh = open( self.__configFile, 'w' )
+			import os
+			rename = os.rename
+		except ( ImportError, AttributeError ):
+			# no os module so we cant rename, write in place
+			os = None
+			tmpFile = self.__configFile
+		else:
+			tmpFile = self.__configFile + '.tmp'
+
+		try:
+			fh = open( tmpFile, 'w' )
 		except IOError, detail:
-			msg = "Failed to open config '%s' for write (%s)\n" % ( self.__configFile, detail )
+			msg = "Failed to open config '%s' for write (%s)\n" % ( tmpFile, detail )
 			self.error( msg )
 			if ctx is not None:
 				ctx.write( msg )
 			return 0
 
-		if not self.__writeConfig( fh ):
+		saved = self.__writeConfig( fh, full )
+		try:
+			fh.close()
+		except IOError, detail:
+			self.error( "Failed to close config '%s' (%s)" % ( tmpFile, detail ) )
+			saved = 0
+
+		if saved and os is not None:
+			try:
+				try:
+					rename( tmpFile, self.__configFile )
+				except OSError:
+					# win32 wont rename over an existing file
+					os.remove( self.__configFile )
+					rename( tmpFile, self.__configFile )
+			except OSError, detail:
+				self.error( "Failed to replace config '%s' (%s)" % ( self.__configFile, detail ) )
+				saved = 0
+
+		if not saved:
 			msg = "Failed to save config\n"
 		else:
 			msg = "Config saved\n"
@@ -1006,15 +1713,16 @@ class ModManager( object ):
 		if ctx is not None:
 			ctx.write( msg )
 
-		fh.close()
-
 		return 0
 
-	def __writeConfig( self, fh ):
-		"""Write the module config to the file handle."""
+	def __writeConfig( self, fh, full=1 ):
+		"""Write the module config to the file handle.
+
+		If full is false the cached text of clean module sections is reused.
+		"""
 		try:
 			# Global first
-			self.__writeModuleConfig( fh, __name__ )
+			self.__writeModuleConfig( fh, __name__, full )
 
 			# Addon modules
 			fh.write( "\n# Modules\n" )
@@ -1028,18 +1736,15 @@ class ModManager( object ):
 			modules.sort()
 			for module in modules:
 				if __name__ != module:
-					self.__writeModuleConfig( fh, module )
+					self.__writeModuleConfig( fh, module, full )
 
 		except IOError, detail:
-			msg = "Failed to save config '%s' (%s)\n" % ( self.__configFile, detail )
-			self.error( msg )
-			if ctx is not None:
-				ctx.write( msg )
+			self.error( "Failed to save config '%s' (%s)" % ( self.__configFile, detail ) )
 			return 0
 
 		return 1
 
-	def __writeModuleConfig( self, fh, module_name ):
+	def __writeModuleConfig( self, fh, module_name, full=1 ):
 		"""Write out the named modules header and config to the passed file handle."""
 
 		# Write the descriptive header
@@ -1061,6 +1766,14 @@ class ModManager( object ):
 			fh.write( "#\n# %s\n#\n" % module_name )
 
 		# Now the parameters for this module
+		if full or not self.__configText.has_key( module_name ):
+			self.__configText[module_name] = self.__renderModuleConfig( module_name )
+		fh.write( self.__configText[module_name] )
+		fh.write( "\n" )
+
+	def __renderModuleConfig( self, module_name ):
+		"""Return the named modules config lines as a string."""
+		lines = []
 		params = self.__configFull[module_name]
 		var_names = params.keys()
 		var_names.sort()
@@ -1068,7 +1781,7 @@ class ModManager( object ):
 			value = params[param]
 			if isinstance( value, ( int, long ) ):
 				# just an int
-				fh.write( '%s.%s %s\n' % ( module_name, param, value ) )
+				lines.append( '%s.%s %s\n' % ( module_name, param, value ) )
 
 			elif isinstance( value, dict ):
 				# multi value list
@@ -1082,15 +1795,15 @@ class ModManager( object ):
 					val = value[k]
 					if isinstance( k, ( int, long ) ):
 						if isinstance( val, ( int, long ) ):
-							fh.write( '%s.%s %d %d\n' % ( module_name, multi_param, k, val ) )
+							lines.append( '%s.%s %d %d\n' % ( module_name, multi_param, k, val ) )
 						else:
-							fh.write( '%s.%s %d "%s"\n' % ( module_name, multi_param, k, val ) )
+							lines.append( '%s.%s %d "%s"\n' % ( module_name, multi_param, k, val ) )
 					else:
 						# string, double quote it
 						if isinstance( val, ( int, long ) ):
-							fh.write( '%s.%s "%s" %d\n' % ( module_name, multi_param, k, val ) )
+							lines.append( '%s.%s "%s" %d\n' % ( module_name, multi_param, k, val ) )
 						else:
-							fh.write( '%s.%s "%s" "%s"\n' % ( module_name, multi_param, k, val ) )
+							lines.append( '%s.%s "%s" "%s"\n' % ( module_name, multi_param, k, val ) )
 
 			elif isinstance( value, list ):
 				# multi value list
@@ -1103,15 +1816,15 @@ class ModManager( object ):
 				for multi in value:
 					if isinstance( multi, ( int, long ) ):
 						# just an int
-						fh.write( '%s.%s %s\n' % ( module_name, multi_param, multi ) )
+						lines.append( '%s.%s %s\n' % ( module_name, multi_param, multi ) )
 					else:
 						# string, double quote it
-						fh.write( '%s.%s "%s"\n' % ( module_name, multi_param, multi ) )
+						lines.append( '%s.%s "%s"\n' % ( module_name, multi_param, multi ) )
 			else:
 				# string, double quote it
-				fh.write( '%s.%s "%s"\n' % ( module_name, param, value ) )
+				lines.append( '%s.%s "%s"\n' % ( module_name, param, value ) )
 
-		fh.write( "\n" )
+		return ''.join( lines )
 
 	#
 	# Rcon methods
@@ -1232,6 +1945,8 @@ class ModManager( object ):
 			self.__configFull[module_name][var] = int_val
 		else:
 			self.__configFull[module_name][var] = val.strip( '"' )
+		self.__dirtyConfig( module_name )
+		self.__requestSave()
 
 		msg = "Param %s.%s set to %s\n" % ( module_name, var, val )
 		self.info( msg )
@@ -1301,6 +2016,88 @@ class ModManager( object ):
 
 		return 1
 
+	def cmdProfile( self, ctx, cmd ):
+		"""Dump and reset the update and event profile or enable / disable profiling."""
+		cmd = cmd.strip().lower()
+		if 'on' == cmd or 'off' == cmd:
+			self.__setParam( __name__, 'profileEnable', int( 'on' == cmd ) )
+			self.__resetProfile()
+			ctx.write( "Profiling %s\n" % cmd )
+			return 1
+
+		if cmd:
+			ctx.write( "Invalid profile argument '%s' ( expected on or off )\n" % cmd )
+			return 0
+
+		if not self.profileEnable:
+			ctx.write( "Profiling is disabled ( use 'mm profile on' )\n" )
+			return 1
+
+		elapsed = frameTimer() - self.__profileStart
+		ctx.write( "Update profile: %d frames in %.3fs, %d timers scheduled\n" % ( self.__profileFrames, elapsed, len( self.__timers ) - self.__timersDestroyed ) )
+
+		self.__writeProfiles( ctx, 'requestor', self.__profiles.values() )
+
+		ctx.write( "Event profile:\n" )
+		profiles = []
+		for dispatcher in self.__eventDispatchers.values():
+			profiles.extend( dispatcher.profiles.values() )
+		self.__writeProfiles( ctx, 'handler', profiles )
+
+		self.__resetProfile()
+
+		return 1
+
+	def __writeProfiles( self, ctx, title, profiles ):
+		"""Write the profiles to ctx heaviest first."""
+		ordered = []
+		for profile in profiles:
+			ordered.append( ( profile.total, profile ) )
+		ordered.sort()
+		ordered.reverse()
+
+		header = ' %-40s %8s %10s %9s %9s %9s' % ( title, 'calls', 'total(ms)', 'min(ms)', 'mean(ms)', 'max(ms)' )
+		buckets = []
+		for bound in profileBuckets:
+			buckets.append( '<%s' % bound )
+		buckets.append( '>=%s' % profileBuckets[-1] )
+		ctx.write( "%s %s\n" % ( header, ' '.join( buckets ) ) )
+
+		for ( total, profile ) in ordered:
+			histogram = []
+			for count in profile.histogram:
+				histogram.append( str( count ) )
+			ctx.write( ' %-40s %8d %10.3f %9.3f %9.3f %9.3f %s\n' % ( profile.name, profile.calls, profile.total * 1000, profile.min * 1000, profile.mean() * 1000, profile.max * 1000, ' '.join( histogram ) ) )
+
+	def __resetProfile( self ):
+		"""Discard all collected update and event profile data."""
+		self.__profiles = {}
+		for dispatcher in self.__eventDispatchers.values():
+			dispatcher.profiles = {}
+		self.__profileFrames = 0
+		self.__profileStart = frameTimer()
+
+	def cmdRconCache( self, ctx, cmd ):
+		"""Show the rcon query cache statistics or clear the cache."""
+		if 'clear' == cmd.strip().lower():
+			self.__rconCache = {}
+			ctx.write( "Rcon query cache cleared\n" )
+			return 1
+
+		lookups = self.__rconCacheHits + self.__rconCacheMisses
+		ratio = 0.0
+		if lookups:
+			ratio = 100.0 * self.__rconCacheHits / lookups
+		ctx.write( "Rcon query cache: %d hits, %d misses ( %.1f%% hit rate ), %d invalidations\n" % ( self.__rconCacheHits, self.__rconCacheMisses, ratio, self.__rconCacheInvalidations ) )
+
+		now = host.timer_getWallTime()
+		queries = self.__rconCache.keys()
+		queries.sort()
+		for query in queries:
+			ctx.write( " %s ( expires in %.1fs )\n" % ( query, self.__rconCache[query][0] - now ) )
+
+		return 1
+
 	def cmdSaveConfig( self, ctx, cmd ):
 		"""Start and existing module."""
 		return self.__saveConfig( ctx )
@@ -1352,15 +2149,22 @@ class ModManager( object ):
 
 	def setParam( self, key, value ):
 		"""Set the calling modules parameter."""
-		return self.__setParam( mm_utils.caller_module(), key, value )
+		ret = self.__setParam( mm_utils.caller_module(), key, value )
+		self.__requestSave()
+		return ret
 
 	def addParam( self, key, val1, val2=None ):
 		"""Add a value to the the calling modules parameters."""
-		return self.__addParam( mm_utils.caller_module(), key, val1, val2 )
+		ret = self.__addParam( mm_utils.caller_module(), key, val1, val2 )
+		self.__requestSave()
+		return ret
 
 	def removeParam( self, key, idx ):
 		"""Remove one of the calling modules parameter values."""
-		return self.__removeParam( mm_utils.caller_module(), key, idx )
+		ret = self.__removeParam( mm_utils.caller_module(), key, idx )
+		if ret:
+			self.__requestSave()
+		return ret
 
 	def getParam( self, key ):
 		"""Return the calling modules parameter."""
@@ -1382,16 +2186,36 @@ class ModManager( object ):
 	# Logging methods
 	#
 
-	def debug( self, level, msg ):
-		"""Log the message at the given debug level."""
+	def isDebugEnabled( self, level ):
+		"""Return True if messages at the given debug level are logged."""
+		return self.logLevel >= 2 + level
+
+	def debug( self, level, msg, *args ):
+		"""Log the message at the given debug level.
+
+		If args are given msg is formatted with them only if the message
+		is going to be logged.
+		"""
+		if self.logLevel < 2 + level:
+			return
+		if args:
+			msg = msg % args
 		self.__log( 2 + level, msg )
 
-	def info( self, msg ):
-		"""Log the message at the info level."""
+	def info( self, msg, *args ):
+		"""Log the message at the info level, formatting it with args if given."""
+		if self.logLevel < 2:
+			return
+		if args:
+			msg = msg % args
 		self.__log( 2, msg )
 
-	def warn( self, msg ):
-		"""Log the message at the warn level."""
+	def warn( self, msg, *args ):
+		"""Log the message at the warn level, formatting it with args if given."""
+		if self.logLevel < 1:
+			return
+		if args:
+			msg = msg % args
 		self.__log( 1, msg )
 
 	def error( self, msg, traceback=False ):
@@ -1460,6 +2284,14 @@ class ModManager( object ):
 		"""Return the rcon handle."""
 		return self.__rcon
 
+	def publishEvent( self, event, *fields ):
+		"""Publish an event to the rcon clients subscribed to it.
+
+		Does nothing if the rcon module doesnt support event subscriptions.
+		"""
+		if hasattr( self.__rcon, 'publishEvent' ):
+			self.__rcon.publishEvent( event, *fields )
+
 	#
 	# Ban Manager methods
 	#
@@ -1472,13 +2304,193 @@ class ModManager( object ):
 	# Update methods
 	#
 
-	def registerUpdates( self, method ):
-		"""Requests updates."""
-		self.__updateRequestors.append( method )
+	def registerUpdates( self, method, priority=mm_utils.UpdatePriority.normal, frequency=0 ):
+		"""Requests updates.
+
+		frequency is the target number of calls per second, 0 means every frame.
+		"""
+		# copy on write so requestors can be changed during an update
+		self.__updateRequestors[priority] = self.__updateRequestors[priority] + [ UpdateRequestor( method, priority, frequency ) ]
 
 	def unregisterUpdates( self, method ):
 		"""Cancel request for updates."""
-		self.__updateRequestors.remove( method )
+		for ( priority, requestors ) in self.__updateRequestors.items():
+			for requestor in requestors:
+				if requestor.method == method:
+					# stop it running if the current frame has yet to reach it
+					requestor.active = False
+					requestors = requestors[:]
+					requestors.remove( requestor )
+					self.__updateRequestors[priority] = requestors
+					return
+
+		raise ValueError, "%s not registered for updates" % mm_utils.method_name( method )
+
+	#
+	# Rcon query cache methods
+	#
+
+	def rconQuery( self, cmd ):
+		"""Run a read only console query returning its result.
+
+		Queries listed in rconQueryTTLs are served from the cache until they
+		expire or are invalidated, anything else is passed straight through.
+		"""
+		key = cmd.strip().lower()
+		if not rconQueryTTLs.has_key( key ):
+			return host.rcon_invoke( cmd )
+
+		now = host.timer_getWallTime()
+		try:
+			( expires, result ) = self.__rconCache[key]
+			if expires > now:
+				self.__rconCacheHits += 1
+				return result
+		except KeyError:
+			pass
+
+		self.__rconCacheMisses += 1
+		result = host.rcon_invoke( cmd )
+		self.__rconCache[key] = ( now + rconQueryTTLs[key], result )
+		return result
+
+	def rconInvalidate( self, cmd ):
+		"""Invalidate any cached queries which the console command may change."""
+		if not self.__rconCache:
+			return
+
+		parts = cmd.strip().lower().split( None, 1 )
+		if not parts:
+			return
+
+		query = parts[0]
+		keys = []
+		if 1 < len( parts ) and rconQueryTTLs.has_key( query ):
+			# a query with arguments is a setter
+			keys.append( query )
+
+		for ( prefix, queries ) in rconQueryInvalidates:
+			if query.startswith( prefix ):
+				keys.extend( queries )
+
+		for key in keys:
+			if self.__rconCache.has_key( key ):
+				del self.__rconCache[key]
+				self.__rconCacheInvalidations += 1
+
+	def __invalidatePlayers( self, player ):
+		"""Invalidate the cached player list."""
+		if self.__rconCache.has_key( 'admin.listplayers' ):
+			del self.__rconCache['admin.listplayers']
+			self.__rconCacheInvalidations += 1
+
+	#
+	# Roster methods
+	#
+
+	def roster( self ):
+		"""Return the player roster."""
+		return self.__roster
+
+	#
+	# Event methods
+	#
+
+	def registerHandler( self, event, method, alwaysTrigger=0 ):
+		"""Register method to be called when the host triggers event.
+
+		Unlike host.registerHandler this can be undone with unregisterHandler.
+		The host only ever sees a single handler per event.
+		"""
+		key = ( event, alwaysTrigger )
+		if not self.__eventDispatchers.has_key( key ):
+			dispatcher = EventDispatcher( self, event )
+			# Note: may raise if the host doesnt support the event
+			host.registerHandler( event, dispatcher.dispatch, alwaysTrigger )
+			self.__eventDispatchers[key] = dispatcher
+
+		self.__eventDispatchers[key].add( method )
+
+	def unregisterHandler( self, event, method ):
+		"""Cancel a registration made with registerHandler."""
+		for ( key, dispatcher ) in self.__eventDispatchers.items():
+			if key[0] == event and dispatcher.remove( method ):
+				return
+
+		raise ValueError, "%s not registered for '%s'" % ( mm_utils.method_name( method ), event )
+
+	#
+	# Timer methods
+	#
+
+	def createTimer( self, method, delay, data=None ):
+		"""Schedule method( data ) to be called in delay seconds.
+
+		Returns a Timer which can be made recurring or destroyed.
+		"""
+		timer = Timer( self, method, host.timer_getWallTime() + delay, data )
+		self.__scheduleTimer( timer )
+		return timer
+
+	def destroyTimer( self, timer ):
+		"""Cancel a timer created by createTimer."""
+		if timer.destroyed:
+			return
+		timer.destroyed = True
+		if not timer.scheduled:
+			# currently triggering
+			return
+
+		# Destroyed timers are left in the heap until they come due, compact
+		# it if they start to dominate e.g. after clearing a large ban list
+		self.__timersDestroyed += 1
+		if self.__timersDestroyed > 64 and self.__timersDestroyed * 2 > len( self.__timers ):
+			timers = []
+			for entry in self.__timers:
+				if not entry[2].destroyed:
+					timers.append( entry )
+			heapq.heapify( timers )
+			self.__timers = timers
+			self.__timersDestroyed = 0
+
+	def __scheduleTimer( self, timer ):
+		"""Add the timer to the heap."""
+		# the sequence keeps timers due at the same time in creation order
+		self.__timerSeq += 1
+		timer.scheduled = True
+		heapq.heappush( self.__timers, ( timer.time, self.__timerSeq, timer ) )
+
+	def __runTimers( self ):
+		"""Trigger all the timers which are due."""
+		now = host.timer_getWallTime()
+		while self.__timers and self.__timers[0][0] <= now:
+			timer = heapq.heappop( self.__timers )[2]
+			timer.scheduled = False
+			if timer.destroyed:
+				self.__timersDestroyed -= 1
+				continue
+
+			# flag one shot timers as done first so destroy() in the callback is a noop
+			if not timer.interval:
+				timer.destroyed = True
+
+			try:
+				timer.method( timer.data )
+			except StandardError, detail:
+				self.error( "Failed to trigger timer '%s' (%s)" % ( mm_utils.method_name( timer.method ), detail ), True )
+
+			if timer.destroyed:
+				continue
+
+			if timer.interval:
+				timer.time += timer.interval
+				if timer.time <= now:
+					# we fell behind, dont fire a burst to catch up
+					timer.time = now + timer.interval
+				self.__scheduleTimer( timer )
+			else:
+				# setRecurring( 0 ) called by the callback
+				timer.destroyed = True
 
 	#
 	# Core game methods
@@ -1491,6 +2503,14 @@ class ModManager( object ):
 		# Register our handers
 		self.registerRconCmdHandler( 'mm', { 'method': self.cmdExec, 'subcmds': self.__cmds } )
 
+		# Start the roster and query cache before the modules so they are up to date when their handlers are called
+		self.__roster.start()
+		self.registerHandler( 'PlayerConnect', self.__invalidatePlayers, 1 )
+		self.registerHandler( 'PlayerDisconnect', self.__invalidatePlayers, 1 )
+		if self.rosterResync:
+			self.__rosterTimer = self.createTimer( self.__roster.refresh, self.rosterResync )
+			self.__rosterTimer.setRecurring( self.rosterResync )
+
 		initialised = 0
 		for module_name in self.__modules:
 			initialised += self.__initModule( module_name )
@@ -1500,9 +2520,11 @@ class ModManager( object ):
 		"""Shutdown the Module manager and all modules."""
 		self.info( 'ModManager shutting down' )
 
-		# Save the config if required
+		# Save the config if required, this includes any pending save
 		if self.autoSave:
 			self.__saveConfig()
+		elif self.__saveTimer is not None:
+			self.__saveConfig( None, 0 )
 
 		shutdown = 0
 		for module_name in self.__modules:
@@ -1511,19 +2533,86 @@ class ModManager( object ):
 
 		host.unregisterGameStatusHandler( self.onGameStatusChanged )
 
+		self.__roster.stop()
+		if self.__rosterTimer:
+			self.__rosterTimer.destroy()
+			self.__rosterTimer = None
+
 	def update( self ):
 		"""Update all the modules that have registered for updates.
 
+		High priority requestors are always run. Normal then low priority
+		requestors are run round robin until updateBudget is exhausted, the
+		remainder being picked up first on the next frame. The budget starts
+		after the high priority requestors and at least one due requestor of
+		each priority is run every frame so none are starved.
+
 		Note / Warning:
 		We could use the same method as for shutdown and init but
 		due to the frequency of update calls we use this optimised
 		methodology.
 		"""
-		for method in self.__updateRequestors:
+		if self.profileEnable:
+			self.__profileFrames += 1
+
+		if self.__timers:
+			self.__runTimers()
+
+		# the requestor lists are replaced not changed by register and
+		# unregister so they are safe to iterate while updates run
+		now = frameTimer()
+		for requestor in self.__updateRequestors[mm_utils.UpdatePriority.high]:
+			if requestor.due <= now and requestor.active:
+				self.__runUpdate( requestor, now )
+
+		deadline = None
+		if self.updateBudget:
+			deadline = frameTimer() + self.updateBudget / 1000.0
+
+		for priority in ( mm_utils.UpdatePriority.normal, mm_utils.UpdatePriority.low ):
+			requestors = self.__updateRequestors[priority]
+			count = len( requestors )
+			if not count:
+				continue
+
+			cursor = self.__updateCursors[priority] % count
+			ran = False
+			for i in range( count ):
+				requestor = requestors[( cursor + i ) % count]
+				if requestor.due > now or not requestor.active:
+					continue
+
+				if ran and deadline is not None and frameTimer() >= deadline:
+					# out of time, resume from here next frame
+					self.__updateCursors[priority] = ( cursor + i ) % count
+					break
+
+				self.__runUpdate( requestor, now )
+				ran = True
+
+	def __runUpdate( self, requestor, now ):
+		"""Run a single update requestor, profiling it if enabled."""
+		requestor.due = now + requestor.interval
+		method = requestor.method
+		if not self.profileEnable:
 			try:
 				method()
 			except StandardError, detail:
 				self.error( "Failed to update '%s' (%s)" % ( mm_utils.method_name( method ), detail ), True )
+			return
+
+		start = frameTimer()
+		try:
+			method()
+		except StandardError, detail:
+			self.error( "Failed to update '%s' (%s)" % ( mm_utils.method_name( method ), detail ), True )
+
+		elapsed = frameTimer() - start
+		try:
+			self.__profiles[method].record( elapsed )
+		except KeyError:
+			profile = self.__profiles[method] = MethodProfile( mm_utils.method_name( method ) )
+			profile.record( elapsed )
 
 # Create the singleton manger
 # TODO: enforce singleton status
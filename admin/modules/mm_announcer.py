@@ -38,6 +38,12 @@ This is an Auto Announcer ModManager module
 * The '|' character in messages to represents a new line.
 
 ===== History =====
+ v2.0 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
+ v1.9 - 18/10/2026:
+ Timed messages now use the ModManager timer heap hence requires MM v2.5
+
  v1.8 - 12/10/2011:
  Added BFP4F Support
 
@@ -76,10 +82,10 @@ import bf2
 import host
 import mm_utils
 
-__version__ = 1.8
+__version__ = 2.0
 
 __required_modules__ = {
-	'modmanager': 1.6
+	'modmanager': 2.6
 }
 
 __supported_games__ = {
@@ -196,7 +202,7 @@ class Announcer( object ):
 			'repeat': repeat,
 			'text': text
 		}
-		timer = bf2.Timer( self.announce, start, 1, details )
+		timer = self.mm.createTimer( self.announce, start, details )
 		if repeat:
 			timer.setRecurring( repeat )
 		details['timer'] = timer
@@ -328,10 +334,9 @@ class Announcer( object ):
 		self.__newPlayers = {}
 
 		# Register our base handlers
-		if 0 == self.__state:
-			host.registerHandler( 'PlayerConnect', self.onPlayerConnect, 1 )
-			host.registerHandler( 'PlayerSpawn', self.onPlayerSpawn, 1 )
-			host.registerHandler( 'PlayerDisconnect', self.onPlayerDisconnect, 1 )
+		self.mm.registerHandler( 'PlayerConnect', self.onPlayerConnect, 1 )
+		self.mm.registerHandler( 'PlayerSpawn', self.onPlayerSpawn, 1 )
+		self.mm.registerHandler( 'PlayerDisconnect', self.onPlayerDisconnect, 1 )
 
 		# Load the join messages
 		for msg in self.__config['joinMessages']:
@@ -364,7 +369,11 @@ class Announcer( object ):
 		self.mm.unregisterRconCmdHandler( 'announcer' )
 
 		# Unregister our game handlers
-		# Flag as shutdown as there is currently way to do this
+		self.mm.unregisterHandler( 'PlayerConnect', self.onPlayerConnect )
+		self.mm.unregisterHandler( 'PlayerSpawn', self.onPlayerSpawn )
+		self.mm.unregisterHandler( 'PlayerDisconnect', self.onPlayerDisconnect )
+
+		# Flag as shutdown
 		self.__state = 2
 
 def mm_load( modManager ):
@@ -23,6 +23,13 @@ This is a autobalance system ModManager module
  mm_autobalance.roundSwitch
 
 ===== History =====
+ v2.7 - 18/10/2026:
+ Team, squad and AI counts now come from the ModManager player roster instead of scanning all players
+ Squad checks now only consider squads on the players own team hence requires MM v2.7
+
+ v2.6 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
  v2.5 - 12/10/2011:
  Fixed being able to load on Heroes
 
@@ -80,10 +87,10 @@ import host
 import random
 import mm_utils
 
-__version__ = 2.5
+__version__ = 2.7
 
 __required_modules__ = {
-	'modmanager': 1.6
+	'modmanager': 2.7
 }
 
 __supports_reload__ = True
@@ -123,13 +130,9 @@ class AutoBalance( object ):
 			return
 
 		# place player on the team with least players
-		team1 = 0
-		team2 = 0
-		for tp in bf2.playerManager.getPlayers():
-			if 1 == tp.getTeam():
-				team1 += 1
-			else:
-				team2 += 1
+		roster = self.mm.roster()
+		team1 = roster.teamCount( 1 )
+		team2 = roster.playerCount() - team1
 
 		# Ignore the new player's team entry
 		# N.B. Doing it this way avoids a loop level check
@@ -142,6 +145,7 @@ class AutoBalance( object ):
 			p.setTeam(1)
 		else:
 			p.setTeam(2)
+		roster.updatePlayer( p )
 
 	def onPlayerDeath( self, p, vehicle ):
 		"""Autobalance a player that has died if required and allowed by the balance rules."""
@@ -172,48 +176,35 @@ class AutoBalance( object ):
 			# dont autobalance the commander
 			return
 
-		squadid = p.getSquadId()
-		teamid = p.getTeam()
-		players = bf2.playerManager.getPlayers()
+		roster = self.mm.roster()
+		squadid = roster.getSquadId( p )
+		teamid = roster.getTeam( p )
 
 		if ( not self.__config['allowSquadLeader'] ) and p.isSquadLeader():
 			# only autobalance the squad leader if they are the only
 			# member of that squad
-			squad_members = 0
-			for tp in players:
-				if squadid == tp.getSquadId() and tp.index != p.index:
-					# we have other members in this squad dont autobalance
-					#self.mm.debug( 2, "AB: no ( squad leader with members )" )
-					return
+			if 1 < roster.squadCount( teamid, squadid ):
+				# we have other members in this squad dont autobalance
+				#self.mm.debug( 2, "AB: no ( squad leader with members )" )
+				return
 
 		if ( not self.__config['allowSquadMember'] ) and ( squadid > 0 ):
 			# only autobalance squad members if there are no none
 			# squad members / commander on this team
-			basic_players = 0
-			for tp in players:
-				if ( 0 == tp.getSquadId() ) and ( teamid == tp.getTeam() ) and ( not p.isCommander() ):
-					# none squad member / commander of this team
-					basic_players += 1
+			basic_players = roster.squadCount( teamid, 0 )
+			commander = roster.commander( teamid )
+			if commander is not None and 0 == roster.getSquadId( commander ):
+				basic_players -= 1
 
-			if 0 != basic_players:
+			if 0 < basic_players:
 				# we have basic players in this team we
 				# will balance them instead
 				#self.mm.debug( 2, "AB: no ( basic players avail )" )
 				return
 
-		aiPlayerBalance = 0
-		team1 = 0
-		team2 = 0
-		for tp in players:
-			if tp.getTeam() == 1:
-				team1 += 1
-			else:
-				team2 += 1
-
-			if tp.isAIPlayer():
-				aiPlayerBalance += 1
-			else:
-				aiPlayerBalance -= 1
+		team1 = roster.teamCount( 1 )
+		team2 = roster.playerCount() - team1
+		aiPlayerBalance = roster.aiCount() - roster.humanCount()
 
 		if host.sgl_getIsAIGame():
 			if self.mm.isBattleField2142() or not (host.ss_getParam('gameMode') == "gpm_coop"):
@@ -226,10 +217,12 @@ class AutoBalance( object ):
 			if ( team2 + 1 ) < team1:
 				#self.mm.debug( 2, "AB: player '%s' -> team %d" % ( p.getName(), 2 ) )
 				p.setTeam( 2 )
+				roster.updatePlayer( p )
 		elif ( teamid == 2 ):
 			if ( team1 + 1 ) < team2:
 				#self.mm.debug( 2, "AB: player '%s' -> team %d" % ( p.getName(), 1 ) )
 				p.setTeam( 1 )
+				roster.updatePlayer( p )
 
 	def onPlayerChangeTeams( self, p, humanHasSpawned ):
 		"""Ensure the player isnt unbalancing the teams."""
@@ -241,6 +234,8 @@ class AutoBalance( object ):
 		if not bf2.serverSettings.getAutoBalanceTeam():
 			return
 
+		roster = self.mm.roster()
+
 		# dont teamswitch alive players, or they will have the wrong teams kit
 		if p.isAlive():
 			return
@@ -250,36 +245,28 @@ class AutoBalance( object ):
 				return
 
 			# handling aiplayer team change autobalance when round not started
-			team = p.getTeam()
-			aiplayer = 0
-
-			for tp in bf2.playerManager.getPlayers():
-				if aiplayer == 0 and tp.getTeam() == team and tp.isAIPlayer():
-					aiplayer = tp
-					break
+			team = roster.getTeam( p )
+			aiplayers = roster.teamAIPlayers( team )
 
-			if aiplayer:
-				if p.getTeam() == 1:
+			if aiplayers:
+				aiplayer = aiplayers[0]
+				if team == 1:
 					aiplayer.setTeam(2)
 				else:
 					aiplayer.setTeam(1)
+				roster.updatePlayer( aiplayer )
 
 		else:
 			# checking to see if player is allowed to change teams
-
-			team1 = 0
-			team2 = 0
-			for tp in bf2.playerManager.getPlayers():
-				if tp.getTeam() == 1:
-					team1 += 1
-				else:
-					team2 += 1
+			team1 = roster.teamCount( 1 )
+			team2 = roster.playerCount() - team1
 
 			if abs(team1 - team2) > 1:
-				if p.getTeam() == 1:
+				if roster.getTeam( p ) == 1:
 					p.setTeam(2)
 				else:
 					p.setTeam(1)
+				roster.updatePlayer( p )
 
 	def onGameStatusChanged( self, status ):
 		"""Make a note of the game status"""
@@ -296,6 +283,7 @@ class AutoBalance( object ):
 						player.setTeam( 2 )
 					else:
 						player.setTeam( 1 )
+					self.mm.roster().updatePlayer( player )
 
 			elif 2 == self.__config['roundSwitch']:
 				# Randomise
@@ -312,6 +300,7 @@ class AutoBalance( object ):
 						player.setTeam( 1 )
 					else:
 						player.setTeam( 2 )
+					self.mm.roster().updatePlayer( player )
 					i += 1
 
 	def init( self ):
@@ -319,10 +308,9 @@ class AutoBalance( object ):
 		self.__config = self.mm.getModuleConfig( configDefaults )
 
 		# Register our game handlers
-		if 0 == self.__state:
-			host.registerHandler( 'PlayerConnect', self.onPlayerConnect, 1 )
-			host.registerHandler( 'PlayerDeath', self.onPlayerDeath, 1 )
-			host.registerHandler( 'PlayerChangeTeams', self.onPlayerChangeTeams, 1 )
+		self.mm.registerHandler( 'PlayerConnect', self.onPlayerConnect, 1 )
+		self.mm.registerHandler( 'PlayerDeath', self.onPlayerDeath, 1 )
+		self.mm.registerHandler( 'PlayerChangeTeams', self.onPlayerChangeTeams, 1 )
 
 		# Register your game handlers and provide any
 		# other dynamic initialisation here
@@ -337,8 +325,11 @@ class AutoBalance( object ):
 		# other actions to ensure your module no longer affects
 		# the game in anyway
 		host.unregisterGameStatusHandler( self.onGameStatusChanged )
+		self.mm.unregisterHandler( 'PlayerConnect', self.onPlayerConnect )
+		self.mm.unregisterHandler( 'PlayerDeath', self.onPlayerDeath )
+		self.mm.unregisterHandler( 'PlayerChangeTeams', self.onPlayerChangeTeams )
 
-		# Flag as shutdown as there is currently way to do this
+		# Flag as shutdown
 		self.__state = 2
 
 def mm_load( modManager ):
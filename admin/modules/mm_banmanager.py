@@ -50,6 +50,22 @@ All rcon commands are safe to use.
 It is strongly recommended you do NOT change defaultBanAddress, defaultBanCdKeyHash or defaultBanProfileId
 
 ===== History =====
+ v4.3 - 18/10/2026:
+ Ban events are now published through ModManager so they no longer require mm_rcon hence requires MM v3.6
+
+ v4.2 - 18/10/2026:
+ Bans added and removed are now published as rcon ban events hence requires mm_rcon v10.1
+
+ v4.1 - 18/10/2026:
+ Debug messages are now only formatted, and the admin name only looked up for them, if debug logging is enabled at their level hence requires MM v3.2
+
+ v4.0 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
+ v3.9 - 18/10/2026:
+ Ban, unban and kick timers now use the ModManager timer heap instead of one bf2.Timer each hence requires MM v2.5
+ Epoc ban expiry times are no longer truncated to whole seconds
+
  v3.8 - 29/01/2013:
  Fixed compatibility issue with BFHeores using long not int profileid's
 
@@ -179,11 +195,11 @@ import mm_utils
 import codecs
 
 # Set the version of your module here
-__version__ = 3.8
+__version__ = 4.3
 
 # Set the required module versions here
 __required_modules__ = {
-	'modmanager': 1.6
+	'modmanager': 3.6
 }
 
 # Does this module support reload ( are all its reference closed on shutdown? )
@@ -250,7 +266,8 @@ class BanManager( object ):
 
 	def cmdClearBans( self, ctx, cmd ):
 		"""Clear all bans"""
-		self.mm.debug( 2, "cmdClearBanList by %s" % ( ctx.getName() ) )
+		if self.mm.isDebugEnabled( 2 ):
+			self.mm.debug( 2, "cmdClearBanList by %s", ctx.getName() )
 		if self.clearBanList():
 			ctx.write( "Banlist cleared\n" )
 		else:
@@ -258,13 +275,14 @@ class BanManager( object ):
 
 	def cmdListBans( self, ctx, cmd ):
 		"""Ban a player for a specified timer period from the server with a message."""
-		self.mm.debug( 2, "cmdListBans by %s" % ( ctx.getName() ) )
+		if self.mm.isDebugEnabled( 2 ):
+			self.mm.debug( 2, "cmdListBans by %s", ctx.getName() )
 
 		self.writeBanlist( ctx )
 
 	def cmdUpdateBan( self, ctx, cmd ):
 		"""Update a ban."""
-		self.mm.debug( 2, "cmdUpdateBan %s" % cmd )
+		self.mm.debug( 2, "cmdUpdateBan %s", cmd )
 		( bankey, method, nick, period, address, cdkeyhash, profileid, by, reason, datetime ) = mm_utils.largs( cmd, None, 10, '' )
 		if self.__bans.has_key( bankey ):
 			ban = self.__bans[bankey]
@@ -315,7 +333,7 @@ class BanManager( object ):
 
 	def cmdAddBan( self, ctx, cmd ):
 		"""Rcon command to add a ban."""
-		self.mm.debug( 2, "cmdAddBan %s" % cmd )
+		self.mm.debug( 2, "cmdAddBan %s", cmd )
 		( method, nick, period, address, cdkeyhash, profileid, by, reason, datetime ) = mm_utils.largs( cmd, None, 9, '' )
 		ban = self.__addBan( method, nick, period, address, cdkeyhash, profileid, by, reason, datetime )
 
@@ -334,7 +352,7 @@ class BanManager( object ):
 
 	def cmdRemoveBan( self, ctx, cmd ):
 		"""Remove a ban."""
-		self.mm.debug( 2, "cmdRemoveBan %s" % cmd )
+		self.mm.debug( 2, "cmdRemoveBan %s", cmd )
 		( ban, reason ) = mm_utils.largs( cmd, None, 2, '' )
 		if self.__removeBan( ban, reason ):
 			ctx.write( 'Unban successful\n' )
@@ -343,7 +361,8 @@ class BanManager( object ):
 
 	def cmdBanPlayer( self, ctx, cmd ):
 		"""Ban a player for a specified time period from the server with a message."""
-		self.mm.debug( 2, "cmdBanPlayerBy '%s' by %s" % ( cmd, ctx.getName() ) )
+		if self.mm.isDebugEnabled( 2 ):
+			self.mm.debug( 2, "cmdBanPlayerBy '%s' by %s", cmd, ctx.getName() )
 
 		( playerid, banPeriod, banReason, bannedBy ) = mm_utils.largs( cmd, None, 4, '' )
 
@@ -617,7 +636,6 @@ class BanManager( object ):
 			return None
 
 		# Setup unban times for from now and epoc period bans
-		# Note: we may loose presision here with the casts to int for bf2.Timer but not much we can do
 		if 'Round' == ban['period']:
 			# Round ban
 			self.__roundBans[key] = ban
@@ -625,7 +643,7 @@ class BanManager( object ):
 		elif self.__fromNowRe.search( ban['period'] ) is not None:
 			# A from now ban period
 			ban_start = ban['datetime']
-			self.__unBanTimers[key] = bf2.Timer( self.expireBan, int( ban['period'] ), 1, key )
+			self.__unBanTimers[key] = self.mm.createTimer( self.expireBan, int( ban['period'] ), key )
 
 		elif self.__epocRe.search( ban['period'] ) is not None:
 			# A from epoc ban period
@@ -637,9 +655,11 @@ class BanManager( object ):
 				return None
 			else:
 				# Still expires in the future
-				self.__unBanTimers[key] = bf2.Timer( self.expireBan, int( expires_from_now ), 1, key )
+				self.__unBanTimers[key] = self.mm.createTimer( self.expireBan, expires_from_now, key )
 
 		self.mm.info( "Banned '%s' (%s:%s) period '%s' by '%s' => '%s'" % ( ban['nick'], ban['profileid'], key, ban['period'], ban['by'], ban['reason'] ) )
+		if not skipSave:
+			self.mm.publishEvent( 'ban', 'add', key, ban['nick'], ban['period'], ban['by'], ban['reason'] )
 
 		if skipSave or self.saveBanlist():
 			return ban
@@ -668,10 +688,13 @@ class BanManager( object ):
 			del self.__unBanTimers[ban]
 
 		if self.__bans.has_key( ban ):
+			old = self.__bans[ban]
 			del self.__bans[ban]
 
 			if skipSave:
 				return True
+			self.mm.publishEvent( 'ban', 'remove', ban, old['nick'], old['period'], old['by'], unBanReason )
+
 			# Persist the banlist
 			return self.saveBanlist()
 		else:
@@ -811,7 +834,7 @@ class BanManager( object ):
 			msg = self.__config['banMessage'] % ( player.mmBanDetails['name'], player.mmBanDetails['reason'] )
 			mm_utils.msg_player( player.index, msg )
 
-			self.__banTimers[player.index] = bf2.Timer( self.banPlayerNow, banDelay, 1, player )
+			self.__banTimers[player.index] = self.mm.createTimer( self.banPlayerNow, banDelay, player )
 		else:
 			self.banPlayerNow( player )
 
@@ -937,7 +960,7 @@ class BanManager( object ):
 		mm_utils.msg_player( player.index, msg )
 		player.mmKickReason = kickReason
 		player.mmKickType = kickType
-		self.__kickTimers[player.index] = bf2.Timer( self.kickPlayerNow, kickDelay, 1, player )
+		self.__kickTimers[player.index] = self.mm.createTimer( self.kickPlayerNow, kickDelay, player )
 
 		return True
 
@@ -1139,8 +1162,7 @@ class BanManager( object ):
 		# Register our rcon command handlers
 		self.mm.registerRconCmdHandler( 'bm', { 'method': self.cmdExec, 'subcmds': self.__cmds, 'level': 1 } )
 
-		if 0 == self.__state:
-			host.registerHandler( 'PlayerDisconnect', self.onPlayerDisconnect, 1 )
+		self.mm.registerHandler( 'PlayerDisconnect', self.onPlayerDisconnect, 1 )
 
 		# Register your game handlers and provide any
 		# other dynamic initialisation here
@@ -1158,9 +1180,9 @@ class BanManager( object ):
 		# Unregister our game handlers
 		host.unregisterGameStatusHandler( self.onGameStatusChanged )
 		self.mm.unregisterRconCmdHandler( 'bm' )
+		self.mm.unregisterHandler( 'PlayerDisconnect', self.onPlayerDisconnect )
 
-		# Flag as shutdown as there is currently way to:
-		# host.unregisterHandler
+		# Flag as shutdown
 		self.__state = 2
 
 	def update( self ):
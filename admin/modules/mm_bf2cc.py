@@ -17,6 +17,18 @@ ModManager conversion and additional development by:
 Steven 'Killing' Hartland
 
 ===== History =====
+ v7.6 - 18/10/2026:
+ Monitoring status changes are now sent with AdminConnection.enqueue so they work with threaded rcon hence requires mm_rcon v9.6
+
+ v7.5 - 18/10/2026:
+ getSnapshot console queries now use the ModManager rcon query cache hence requires MM v2.8
+
+ v7.4 - 18/10/2026:
+ getSnapshot player and team counts now come from the ModManager player roster hence requires MM v2.7
+
+ v7.3 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
  v7.2 - 23/06/2011:
  Updated BFP4F Support to add ReservedSlot info
   
@@ -140,11 +152,12 @@ import time
 import re
 from bf2.stats.constants import *
 
-__version__ = 7.2
+__version__ = 7.6
 __compat_version__ = 6.1
 
 __required_modules__ = {
-	'modmanager': 2.0,
+	'modmanager': 2.8,
+	'mm_rcon': 9.6,
 	'mm_kicker': 1.9,
 	'mm_tk_punish': 1.7
 }
@@ -324,7 +337,7 @@ class BF2CC:
 		for key in self.__authedClients:
 			ctx = self.__authedClients[key]
 			if ctx.bf2ccClient.isMonitoring:
-				ctx.conn.outbuf.enqueue( str( status ) + '\x04' )
+				ctx.conn.enqueue( str( status ) + '\x04' )
 
 	def cmdPause( self, ctx, cmd ):
 		"""Pause the server if its running."""
@@ -544,10 +557,10 @@ class BF2CC:
 		Each field is seperated by a \t ( <tab )
 		"""
 
-		allMaps = str( host.rcon_invoke( 'mapList.list' ) ).split('\n')
+		allMaps = str( self.mm.rconQuery( 'mapList.list' ) ).split('\n')
 		mapcount = len( allMaps )
 		if mapcount > 2:
-			nextMapIndex = host.rcon_invoke( 'admin.nextLevel' )
+			nextMapIndex = self.mm.rconQuery( 'admin.nextLevel' )
 			nextMapName = allMaps[int(nextMapIndex)].split('"')[1]
 		else:
 			nextMapName = ''
@@ -562,23 +575,11 @@ class BF2CC:
 		# Max players
 		parts.append( host.ss_getParam( 'maxPlayers' ) )						#2
 
-		connectedPlayers = 0
-		joiningPlayers = 0
-		team1 = 0
-		team2 = 0
-		for p in bf2.playerManager.getPlayers():
-			try:
-				if p.isConnected() == 0:
-					joiningPlayers += 1
-				else:
-					connectedPlayers += 1
-			except:
-				joiningPlayers += 1
-
-			if p.getTeam() == 1:
-				team1 += 1
-			else:
-				team2 += 1
+		roster = self.mm.roster()
+		joiningPlayers = roster.joiningCount()
+		connectedPlayers = roster.playerCount() - joiningPlayers
+		team1 = roster.teamCount( 1 )
+		team2 = roster.playerCount() - team1
 
 		# Connected players
 		parts.append( connectedPlayers )
@@ -593,7 +594,7 @@ class BF2CC:
 		parts.append( nextMapName )												#6
 
 		# Server name
-		parts.append( host.rcon_invoke( 'sv.serverName' ).strip() )
+		parts.append( self.mm.rconQuery( 'sv.serverName' ).strip() )
 
 		# Team 1 details
 		parts.append( host.sgl_getParam( 'teamName', 1, 0 ) )					#8
@@ -661,7 +662,7 @@ class BF2CC:
 			parts.append( bf2.gameLogic.getRoundNr() )							#31
 		else:
 			# query ReservedSlot Count - 29
-			parts.append( host.rcon_invoke( 'sv.numreservedslots' ) )
+			parts.append( self.mm.rconQuery( 'sv.numreservedslots' ) )
 		
 		ctx.write( "%s\n" % '\t'.join( map( str, parts ) ) )
 
@@ -901,11 +902,10 @@ class BF2CC:
 		# Register our base handlers
 		host.registerGameStatusHandler( self.onGameStatusChanged )
 
-		if 0 == self.__state:
-			host.registerHandler( 'ChatMessage', self.onChatMessage, 1 )
-			host.registerHandler( 'PlayerDeath', self.onPlayerDeath )
-			# Not currently used
-			#host.registerHandler( 'PlayerKilled', self.onPlayerKilled )
+		self.mm.registerHandler( 'ChatMessage', self.onChatMessage, 1 )
+		self.mm.registerHandler( 'PlayerDeath', self.onPlayerDeath )
+		# Not currently used
+		#self.mm.registerHandler( 'PlayerKilled', self.onPlayerKilled )
 
 		# Register our rcon command handler
 		self.mm.registerRconCmdHandler( 'bf2cc', { 'method': self.cmdExec, 'subcmds': self.__cmds, 'level': 1 } )
@@ -934,8 +934,10 @@ class BF2CC:
 
 		# Unregister our game handlers
 		host.unregisterGameStatusHandler( self.onGameStatusChanged )
+		self.mm.unregisterHandler( 'ChatMessage', self.onChatMessage )
+		self.mm.unregisterHandler( 'PlayerDeath', self.onPlayerDeath )
 
-		# Flag as shutdown as there is currently way to do this
+		# Flag as shutdown
 		self.__state = 2
 
 class Client(object):
@@ -54,6 +54,12 @@ This is a the ModManager In Game Admin module
  iga delAdmin <profileid|cdkeyhash|name>
 
 ===== History =====
+ v1.9 - 18/10/2026:
+ Debug messages are now only formatted if debug logging is enabled at their level hence requires MM v3.2
+
+ v1.8 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
  v1.7 - 12/10/2011:
  Added BFP4F Support
 
@@ -90,11 +96,11 @@ import host
 import mm_utils
 
 # Set the version of your module here
-__version__ = 1.7
+__version__ = 1.9
 
 # Set the required module versions here
 __required_modules__ = {
-	'modmanager': 1.7
+	'modmanager': 3.2
 }
 
 # Does this module support reload ( are all its reference closed on shutdown? )
@@ -266,21 +272,21 @@ class InGameAdmin( object ):
 		try:
 			# Strip channel prefixes so commands can be used in all channels
 			text = mm_utils.MsgChannels.named[channel].stripPrefix( text )
-			self.mm.debug( 2, "Chat[%d]: '%s'" % ( playerid, text ) )
+			self.mm.debug( 2, "Chat[%d]: '%s'", playerid, text )
 			player = bf2.playerManager.getPlayerByIndex( playerid )
 			if player:
 				prefix = self.__config['cmdPrefix']
 				if text.startswith( prefix ):
 					# We have a potential command
 					( cmd, args ) = mm_utils.largs( text[len(prefix):], None, 2, '', True )
-					self.mm.debug( 2, "CMD?: '%s' '%s'" % ( cmd, args ) )
+					self.mm.debug( 2, "CMD?: '%s' '%s'", cmd, args )
 					if cmd in self.__igacmds:
 						# We have a command
 						cdkeyhash = mm_utils.get_cd_key_hash( player )
 						profileid = str( player.getProfileId() )
 						playername = player.getName()
 						admins = self.__admins
-						self.mm.debug( 2, "Looking for: %s, %s, %s" % ( cdkeyhash, profileid, playername ) )
+						self.mm.debug( 2, "Looking for: %s, %s, %s", cdkeyhash, profileid, playername )
 						if cdkeyhash in admins:
 							# User is an admin
 							admin = cdkeyhash
@@ -500,9 +506,7 @@ class InGameAdmin( object ):
 		# other dynamic initialisation here
 		self.mm.registerRconAuthHandler( self.inGameAuth, self.inGameAllowed )
 
-		if 0 == self.__state:
-			# Register your host handlers here
-			host.registerHandler( 'ChatMessage', self.onChatMessage, 1 )
+		self.mm.registerHandler( 'ChatMessage', self.onChatMessage, 1 )
 
 		# Register our rcon command handlers
 		self.mm.registerRconCmdHandler( 'iga', { 'method': self.cmdExec, 'subcmds': self.__cmds, 'level': 1 } )
@@ -521,8 +525,10 @@ class InGameAdmin( object ):
 		# Unregister our rcon command handlers
 		self.mm.unregisterRconCmdHandler( 'iga' )
 
-		# Flag as shutdown as there is currently way to:
-		# host.unregisterHandler
+		# Unregister our game handlers
+		self.mm.unregisterHandler( 'ChatMessage', self.onChatMessage )
+
+		# Flag as shutdown
 		self.__state = 2
 
 	def update( self ):
@@ -84,6 +84,15 @@ low ping and idle players.
 * When changing messages ensure that any replacement parameters are maintained e.g. %s
 
 ===== History =====
+ v2.9 - 18/10/2026:
+ Debug messages are now only formatted, and player names only looked up for them, if debug logging is enabled at their level hence requires MM v3.2
+
+ v2.8 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
+ v2.7 - 18/10/2026:
+ The check timer now uses the ModManager timer heap hence requires MM v2.5
+
  v2.6 - 12/10/2011:
  Added BFP4F Support
 
@@ -162,10 +171,10 @@ import host
 import mm_utils
 import re
 
-__version__ = 2.6
+__version__ = 2.9
 
 __required_modules__ = {
-	'modmanager': 1.6
+	'modmanager': 3.2
 }
 
 __supports_reload__ = True
@@ -561,7 +570,8 @@ class Kicker( object ):
 						kicker_info.highPing.append( now )
 						# Now check limits
 						if ping_limit <= len( kicker_info.highPing ):
-							self.mm.debug( 4, "K-2HI: player %s" % player.getName() )
+							if self.mm.isDebugEnabled( 4 ):
+								self.mm.debug( 4, "K-2HI: player %s", player.getName() )
 							return self.__kickPlayer( player, KickReason.highPing )
 
 					elif ping < min_ping:
@@ -569,7 +579,8 @@ class Kicker( object ):
 						kicker_info.lowPing.append( now )
 						# Now check limits
 						if ping_limit <= len( kicker_info.lowPing ):
-							self.mm.debug( 4, "K-2LOW: player %s" % player.getName() )
+							if self.mm.isDebugEnabled( 4 ):
+								self.mm.debug( 4, "K-2LOW: player %s", player.getName() )
 							return self.__kickPlayer( player, KickReason.lowPing )
 
 					# Check score
@@ -652,7 +663,8 @@ class Kicker( object ):
 		if 1 != self.__state:
 			return 0
 
-		self.mm.debug( 2, "K: connect %s" % player.getName() )
+		if self.mm.isDebugEnabled( 2 ):
+			self.mm.debug( 2, "K: connect %s", player.getName() )
 		player.mmKickerInfo = KickerInfo()
 
 	def playerKickerInfo( self, player ):
@@ -682,7 +694,8 @@ class Kicker( object ):
 						return self.mm.banManager().banPlayer( player, self.__config['chatSpamBanReason'], self.__config['chatSpamBanPeriod'], self.__config['kickType'], self.__config['banType'], 'ModManager Kicker', self.__config['kickDelay'] )
 
 					if self.__config['enableChatChecks']:
-						self.mm.debug( 5, "K-CC: %s" % player.getName() )
+						if self.mm.isDebugEnabled( 5 ):
+							self.mm.debug( 5, "K-CC: %s", player.getName() )
 						# we have a real player i.e. not an admin
 						isban = self.__banWords.has_key
 						iskick = self.__kickWords.has_key
@@ -760,13 +773,8 @@ class Kicker( object ):
 		self.__kickWords = {}
 
 		# Register our base handlers
-		if 0 == self.__state:
-			self.mm.debug( 2, "Setting Connect and Chat handlers" )
-			host.registerHandler( 'PlayerConnect', self.onPlayerConnect, 1 )
-			host.registerHandler( 'ChatMessage', self.onChatMessage, 1 )
-			self.mm.debug( 2, "Handlers set" )
-		else:
-			self.mm.debug( 2, "Handlers NOT set" )
+		self.mm.registerHandler( 'PlayerConnect', self.onPlayerConnect, 1 )
+		self.mm.registerHandler( 'ChatMessage', self.onChatMessage, 1 )
 
 		host.registerGameStatusHandler( self.onGameStatusChanged )
 
@@ -784,7 +792,7 @@ class Kicker( object ):
 				self.mm.warn( "Max ping is restricted on ranked servers setting to %d" % self.__config['maxPing'] )
 
 		# set up our times
-		self.__checkTimer = bf2.Timer( self.checkPlayers, self.__config['initDelay'], 1 )
+		self.__checkTimer = self.mm.createTimer( self.checkPlayers, self.__config['initDelay'] )
 		self.__checkTimer.setRecurring( self.__config['sampleRate'] )
 
 		# ban words
@@ -839,7 +847,10 @@ class Kicker( object ):
 		self.mm.unregisterRconCmdHandler( 'kicker' )
 
 		# Unregister our game handlers
-		# Flag as shutdown as there is currently way to do this
+		self.mm.unregisterHandler( 'PlayerConnect', self.onPlayerConnect )
+		self.mm.unregisterHandler( 'ChatMessage', self.onChatMessage )
+
+		# Flag as shutdown
 		self.__state = 2
 
 def mm_load( modManager ):
@@ -13,7 +13,28 @@ This is a basic logger which writes to a file.
  # Append to the log if it already exists if set to 1
  mm_logger.logAppend 1
 
+ # Buffer log messages in memory and write them out in the background
+ # if 1, logAutoFlush is ignored when enabled
+ mm_logger.logBuffered 0
+
+ # Write the buffer out once it holds at least this many bytes
+ mm_logger.logFlushSize 8192
+
+ # Write the buffer out at least this often in seconds
+ mm_logger.logFlushInterval 1
+
+ # The maximum number of messages which can be buffered, further
+ # messages are dropped until the buffer has been written out
+ mm_logger.logQueueSize 5000
+
+===== Notes =====
+* When logBuffered is enabled the buffer is written out by a background thread if the server python supports threads, otherwise by a ModManager timer every logFlushInterval
+* The buffer is always written out when the logger is shutdown, however the server doesnt always call shutdown so up to logFlushInterval of messages may be lost if it exits
+
 ===== History =====
+ v1.6 - 18/10/2026:
+ Added logBuffered which buffers messages in memory and writes them out in the background
+
  v1.5 - 12/10/2011:
  Added BFP4F Support
 
@@ -36,10 +57,10 @@ Copyright (c)2008 Multiplay
 Author: Steven 'Killing' Hartland
 """
 
-__version__ = 1.5
+__version__ = 1.6
 
 __required_modules__ = {
-	'modmanager': 1.6
+	'modmanager': 2.5
 }
 
 __supports_reload__ = True
@@ -62,12 +83,31 @@ configDefaults = {
 	'logFilename': 'modmanager.log',
 	'logAutoFlush': 1,
 	'logAppend': 0,
+	'logBuffered': 0,
+	'logFlushSize': 8192,
+	'logFlushInterval': 1,
+	'logQueueSize': 5000,
 }
 
+try:
+	import threading
+except ImportError:
+	# server python built without threads
+	threading = None
+
 class defaultLogger:
 	def __init__( self, modManager ):
 		self.mm = modManager
 		self.__file = None
+		self.__buffered = 0
+		self.__queue = []
+		self.__queueBytes = 0
+		self.__dropped = 0
+		self.__lock = None
+		self.__wakeup = None
+		self.__thread = None
+		self.__timer = None
+		self.__running = False
 
 	def init( self ):
 		"""Get config and setup log file."""
@@ -84,15 +124,105 @@ class defaultLogger:
 			msg = "Failed to open '%s' (%s)" % ( self.__config['logFilename'], detail )
 			raise IOError, msg
 
+		self.__buffered = self.__config['logBuffered']
+		if self.__buffered:
+			self.__running = True
+			if threading is not None:
+				self.__lock = threading.Lock()
+				self.__wakeup = threading.Event()
+				self.__thread = threading.Thread( target=self.__flushThread )
+				# dont prevent the server from exiting
+				self.__thread.setDaemon( True )
+				self.__thread.start()
+			else:
+				self.__timer = self.mm.createTimer( self.__onFlushTimer, self.__config['logFlushInterval'] )
+				self.__timer.setRecurring( self.__config['logFlushInterval'] )
+
 	def write( self, str ):
 		"""Write the message to the log file, flushing if needed."""
-		if self.__file:
-			self.__file.write( str )
-			if self.__autoFlush:
+		if not self.__buffered:
+			if self.__file:
+				self.__file.write( str )
+				if self.__autoFlush:
+					self.__file.flush()
+			return
+
+		if not self.__running:
+			return
+
+		if self.__lock:
+			self.__lock.acquire()
+		try:
+			if len( self.__queue ) >= self.__config['logQueueSize']:
+				self.__dropped += 1
+				return
+			self.__queue.append( str )
+			self.__queueBytes += len( str )
+			full = self.__queueBytes >= self.__config['logFlushSize']
+		finally:
+			if self.__lock:
+				self.__lock.release()
+
+		if full:
+			if self.__wakeup:
+				self.__wakeup.set()
+			else:
+				self.flush()
+
+	def flush( self ):
+		"""Write out any buffered messages."""
+		if self.__lock:
+			self.__lock.acquire()
+		try:
+			queue = self.__queue
+			dropped = self.__dropped
+			self.__queue = []
+			self.__queueBytes = 0
+			self.__dropped = 0
+		finally:
+			if self.__lock:
+				self.__lock.release()
+
+		if dropped:
+			queue.append( "Warn: %d log messages dropped ( logQueueSize %d exceeded )\n" % ( dropped, self.__config['logQueueSize'] ) )
+
+		if queue and self.__file:
+			try:
+				self.__file.write( ''.join( queue ) )
 				self.__file.flush()
+			except IOError:
+				# nowhere to report this
+				pass
+
+	def dropped( self ):
+		"""Return the number of messages dropped since the last flush."""
+		return self.__dropped
+
+	def __flushThread( self ):
+		"""Background thread which writes out the buffer."""
+		while self.__running:
+			self.__wakeup.wait( self.__config['logFlushInterval'] )
+			self.__wakeup.clear()
+			self.flush()
+
+	def __onFlushTimer( self, data ):
+		"""Write out the buffer when threads arent available."""
+		self.flush()
 
 	def close( self ):
 		"""Close the log file."""
+		if self.__running:
+			# stop buffering and write out anything outstanding
+			self.__running = False
+			if self.__thread:
+				self.__wakeup.set()
+				self.__thread.join()
+				self.__thread = None
+			if self.__timer:
+				self.__timer.destroy()
+				self.__timer = None
+			self.flush()
+
 		if self.__file:
 			ret = self.__file.close()
 			self.__file = None
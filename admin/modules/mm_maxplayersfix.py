@@ -8,6 +8,15 @@ This is the Max Players Fix module
  mm_maxplayersfix.kickMessage "Too many players bug"
 
 ===== History =====
+ v1.4 - 18/10/2026:
+ The reserved slots list is now retrieved via the ModManager rcon query cache hence requires MM v2.8
+
+ v1.3 - 18/10/2026:
+ Now checks the player count using the ModManager player roster hence requires MM v2.7
+
+ v1.2 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
  v1.1 - 12/10/2011:
  Added BFP4F Support
 
@@ -23,11 +32,11 @@ import host
 import mm_utils
 
 # Set the version of your module here
-__version__ = 1.1
+__version__ = 1.4
 
 # Set the required module versions here
 __required_modules__ = {
-	'modmanager': 1.6,
+	'modmanager': 2.8,
 	'mm_kicker': 2.2
 }
 
@@ -88,9 +97,13 @@ class MaxPlayersFix( object ):
 			return 0
 
 		try:
+			max_players = bf2.serverSettings.getMaxPlayers()
+			if self.mm.roster().playerCount() <= max_players:
+				# quick check to avoid fetching all the players on every spawn
+				return 0
+
 			players = bf2.playerManager.getPlayers()
 			num_players = len( players )
-			max_players = bf2.serverSettings.getMaxPlayers()
 			if num_players > max_players:
 				self.mm.warn( "Too may players %d > %d (fixing)" % ( num_players, max_players ) )
 				players_to_kick = num_players - max_players
@@ -98,7 +111,7 @@ class MaxPlayersFix( object ):
 
 				# Need to check the reserved slots for sorting
 				self.__reservedSlots = {}
-				for nick in host.rcon_invoke( 'reservedSlots.list' ).split( '\n' ):
+				for nick in self.mm.rconQuery( 'reservedSlots.list' ).split( '\n' ):
 					self.__reservedSlots[nick] = True
 					
 				# Sort so we kick the last player to join
@@ -124,9 +137,7 @@ class MaxPlayersFix( object ):
 		# Register your game handlers and provide any
 		# other dynamic initialisation here
 
-		if 0 == self.__state:
-			# Register your host handlers here
-			host.registerHandler( 'PlayerSpawn', self.onPlayerSpawn, 1 )
+		self.mm.registerHandler( 'PlayerSpawn', self.onPlayerSpawn, 1 )
 
 		# Update to the running state
 		self.__state = 1
@@ -137,9 +148,9 @@ class MaxPlayersFix( object ):
 		# Unregister game handlers and do any other
 		# other actions to ensure your module no longer affects
 		# the game in anyway
+		self.mm.unregisterHandler( 'PlayerSpawn', self.onPlayerSpawn )
 
-		# Flag as shutdown as there is currently way to:
-		# host.unregisterHandler
+		# Flag as shutdown
 		self.__state = 2
 
 	def update( self ):
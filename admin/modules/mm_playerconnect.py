@@ -8,6 +8,9 @@ This is a rank limiting system ModManager module
  # See serversettings.con: sv.maxRank
 
 ===== History =====
+ v1.6 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
  v1.5 - 12/10/2011:
  Added BFP4F Support
 
@@ -38,10 +41,10 @@ import host
 import bf2.stats.constants
 import mm_utils
 
-__version__ = 1.5
+__version__ = 1.6
 
 __required_modules__ = {
-	'modmanager': 1.6
+	'modmanager': 2.6
 }
 
 __supports_reload__ = True
@@ -77,24 +80,30 @@ class RankLimiter( object ):
 		"""Provides default initialisation."""
 		self.__config = self.mm.getModuleConfig( configDefaults )
 
-		if 0 == self.__state:
-			if ( not self.mm.isBattleField2 ):
-				host.registerHandler( 'PlayerChallenge', self.onPlayerChallenge, 1 )
-				host.registerHandler( 'PrePlayerConnect', self.onPrePlayerConnect, 1 )
+		self.__handlers = []
+		if ( not self.mm.isBattleField2 ):
+			self.__handlers.append( ( 'PlayerChallenge', self.onPlayerChallenge ) )
+			self.__handlers.append( ( 'PrePlayerConnect', self.onPrePlayerConnect ) )
+
+		# Added by Niklas Henriks to validate player Name and ID for update 1.50.
+		self.__handlers.append( ( 'ValidatePlayerNameResponse', self.onPlayerNameValidated ) )
 
-			# Added by Niklas Henriks to validate player Name and ID for update 1.50.
+		for ( event, method ) in self.__handlers[:]:
 			try:
-				host.registerHandler( 'ValidatePlayerNameResponse', self.onPlayerNameValidated, 1 )
+				self.mm.registerHandler( event, method, 1 )
 			except:
 				# Ignore error for backwards compatibility
-				pass
+				self.__handlers.remove( ( event, method ) )
 
 		self.__state = 1
 
 	def shutdown( self ):
 		"""Shutdown and stop processing."""
+		for ( event, method ) in self.__handlers:
+			self.mm.unregisterHandler( event, method )
+		self.__handlers = []
 
-		# Flag as shutdown as there is currently way to do this
+		# Flag as shutdown
 		self.__state = 2
 
 	# onPlayerChallenge is called by the engine as part of the
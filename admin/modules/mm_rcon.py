@@ -14,11 +14,84 @@
  # The super admin password
  mm_rcon.rconPassword ""
  
- # The depth of the listen queue to use
- mm_rcon.rconListenQueue 5
+ # The depth of the listen queue to use, this is raised to at least
+ # rconMaxAccepts
+ mm_rcon.rconListenQueue 32
+
+ # The maximum number of new connections accepted each frame
+ mm_rcon.rconMaxAccepts 16
  
  # Allow batching
  mm_rcon.allowBatching 1
+
+ # The number of bytes of unsent output at which a connection stops having
+ # its commands processed until half of it has been sent, 0 = unlimited
+ mm_rcon.rconOutputHighWater 1048576
+
+ # Do the rcon network I/O in a background thread, commands are still run
+ # by the game thread ( requires thread support in the server python )
+ mm_rcon.rconThreaded 0
+
+ # The commands received from each connection in threaded mode which may
+ # be waiting for the game thread before reading from it stops, 0 = unlimited
+ mm_rcon.rconThreadedBacklog 20
+
+ # The most commands received in threaded mode run each frame, 0 = unlimited
+ mm_rcon.rconThreadedCommands 50
+
+ # The commands per second each authenticated connection may run,
+ # 0 = unlimited, 20 is recommended if rate limiting is wanted
+ mm_rcon.rateLimitCommands 0
+
+ # The expensive commands per second each authenticated connection may run,
+ # 0 = unlimited, 2 is recommended if rate limiting is wanted
+ mm_rcon.rateLimitExpensive 0
+
+ # The commands per second all the connections at each auth level may run
+ # between them, 0 = unlimited
+ mm_rcon.rateLimitLevelCommands 0
+
+ # The expensive commands per second all the connections at each auth level
+ # may run between them, 0 = unlimited, 10 is recommended if rate limiting
+ # is wanted and only a few tools poll at each level
+ mm_rcon.rateLimitLevelExpensive 0
+
+ # The number of seconds worth of commands which may be run in a burst
+ mm_rcon.rateLimitBurst 2
+
+ # The number of commands over the limit queued for each connection, any
+ # more are rejected, 0 = reject all commands over the limit
+ mm_rcon.rateLimitQueue 50
+
+ # The size in bytes at which responses are compressed for connections
+ # which have enabled compression
+ mm_rcon.compressThreshold 4096
+
+ # The zlib compression level 1 ( fastest ) to 9 ( smallest )
+ mm_rcon.compressLevel 6
+
+ # The bytes of unsent output a subscribed connection may have before it is
+ # disconnected for not keeping up with its events
+ mm_rcon.subscribeBacklog 262144
+
+ # The path of a unix domain socket to also listen on for local tools,
+ # "" = disabled
+ mm_rcon.rconUnixSocket ""
+
+ # The octal permissions of the unix domain socket, anyone who can open it
+ # is authenticated
+ mm_rcon.rconUnixSocketMode "0600"
+
+ # The level unix domain socket connections are authenticated at
+ mm_rcon.rconUnixAuthLevel 100
+
+ # Commands which are rate limited as expensive
+ mm_rcon.addExpensiveCommand "bf2cc pl"
+ mm_rcon.addExpensiveCommand "bf2cc si"
+ mm_rcon.addExpensiveCommand "bm listBans"
+ mm_rcon.addExpensiveCommand "exec admin.listPlayers"
+ mm_rcon.addExpensiveCommand "list"
+ mm_rcon.addExpensiveCommand "banlist"
  
  # Enable port lingering
  mm_rcon.enableLinger 0
@@ -50,6 +123,13 @@
  # Restrict gametypes so they cant be used
  mm_rcon.addRestrictedGametype "bf2.gpm_coop"
  
+ # The seconds an unauthenticated in-game admin context is kept unused
+ mm_rcon.contextMaxIdle 3600
+
+ # The most in-game admin contexts kept, the least recently used
+ # unauthenticated ones being removed first
+ mm_rcon.contextMaxCount 128
+
  # Enable advanced map size validation via map.desc files
  # This is disabled by default as custom maps often have invalid .desc files
  mm_rcon.advancedMapSizeValidation 0
@@ -57,8 +137,10 @@
 ===== Rcon commands =====
  # Authenticate with the server must be called before using any other methods
  # for players the parameter is the password for rcon users this is the
- # password hash generated using the given salt
- login <password|password_hash>
+ # password hash generated using the given salt. TCP clients may add tagged
+ # to switch the connection to the tagged protocol ( see below ), unix socket
+ # connections are already authed so just use 'login tagged'
+ login <password|password_hash> [tagged]
  
  # Logout of rcon, this removes all the users privaledges
  logout
@@ -103,6 +185,28 @@
  # Change to a specific map gametype and optional size
  map <map> <gametype> [<size>]
 
+ # Display the rcon server statistics
+ stats
+
+ # Enable / disable compression of large responses for this connection or
+ # display its compression statistics
+ compress [on|off]
+
+ # Subscribe to events which are sent as they happen, with no events lists
+ # the subscribed and available events
+ # ( chat, kill, connect, disconnect, team, ban, status )
+ subscribe [<event> ...]
+
+ # Unsubscribe from the events, with no events unsubscribes from all
+ unsubscribe [<event> ...]
+
+ # Display the command contexts and their memory use
+ contexts
+
+ # Display the level index used by advancedMapSizeValidation or rebuild it
+ # from every levels .desc file e.g. after a mod update
+ levelindex [rebuild]
+
 ===== Enhancements =====
 * ModManager compatible
 * Optimised update()
@@ -124,6 +228,12 @@
 ===== Notes =====
 * Don't disable reuseAddress ( set to 0 ) as this can cause rcon to stop responding
 * Set loginMessage / logoutMessage to "" to disable them
+* Rate limits only apply to authenticated TCP connections, in-game admins are not limited
+* With advancedMapSizeValidation enabled the supported sizes of every level are indexed at startup from their .desc files. The index is cached in settings/mm_rcon_levels.cache in the mod directory and only changed .desc files are read again
+* The command contexts of in-game admins are reset and reused for the next player in the same slot. Contexts of players which have left and idle unauthenticated ones are swept every minute, modules must not keep a context after its disconnect handler is called
+* Events are only sent to connections subscribed to them and the game events are only handled while there are subscribers
+* Connections to rconUnixSocket are authenticated at rconUnixAuthLevel without a login, access is controlled by the socket permissions ( rconUnixSocketMode ) so set them carefully
+* With rconThreaded enabled a background thread accepts connections, reads and splits the commands and sends the output. The commands are passed to the game thread which runs them in update() so slow clients cost the game no time. Modules must send output with ctx.conn.enqueue() rather than writing to ctx.conn.outbuf directly
 
 ===== Original Info =====
 
@@ -144,7 +254,121 @@ Other notes:
   end-of-message marker to all results. This is useful if you need to wait
   for a complete response.
 
+- Clients which login with 'login <password_hash> tagged' use the tagged
+  protocol. Each request is sent as 0x03 followed by a request id ( no
+  spaces ), a space and the command. Each response is sent as 0x03, the
+  request id, a space, the length of the output in bytes and a newline
+  followed by the output. Clients can send any number of requests without
+  waiting and match the responses by id. Requests without the 0x03 prefix
+  are handled as before.
+
+- Clients which enable compression with 'compress on' receive responses of
+  compressThreshold bytes or more as 0x05, the compressed length, a space,
+  the original length and a newline followed by the zlib compressed output.
+  This replaces the output within the usual framing so the 0x04 marker or
+  tagged header still applies.
+
+- Subscribed events are sent between responses as 0x06, the event name and
+  its tab separated fields followed by a newline:
+  chat <playerid> <name> <team> <channel> <text>
+  kill <victimid> <victim> <attackerid> <attacker> <weapon>
+  connect <playerid> <name> <address>
+  disconnect <playerid> <name>
+  team <playerid> <name> <team>
+  ban add|remove <key> <nick> <period> <by> <reason>
+  status <status>
+  Unknown fields are sent as -1 or empty.
+
+- Connections to the unix domain socket are sent a welcome message without a
+  digest seed which reports the auth level instead, they are ready for
+  commands straight away. They switch to the tagged protocol with
+  'login tagged' which leaves their auth unchanged.
+
 ===== History =====
+ v10.6 - 18/10/2026
+ Threaded mode no longer calls the engine from the network thread, its messages are logged by the game thread
+ Added rconThreadedBacklog and rconThreadedCommands which limit the commands waiting for and run by the game thread in threaded mode
+ The cached maplist and next level are now invalidated by every maplist change rcon makes
+ Resetting a command context no longer creates its attribute dict
+ Unix socket connections now switch to the tagged protocol with 'login tagged' instead of being logged out by it
+ validateMaplist now falls back to rebuilding the maplist if the current or next level cant be read
+ Debug messages which look up a player name are now skipped without the lookup when debug logging is disabled
+ Responses are now sent in the update which produced them instead of waiting for the next select
+ Rate limiting is now off by default, the recommended limits are given with each option
+ Cheap commands are no longer queued behind a rate limited expensive command
+ The stats command no longer reports accept latency as it only measured the time between polls
+ rconUnixSocketMode may now be given unquoted and an existing unix socket is only removed if nothing is listening on it
+
+ v10.5 - 18/10/2026
+ Command contexts now use __slots__, in-game contexts being reset and reused for the next player in the slot
+ Contexts of players which have left and idle unauthenticated ones are now swept every minute, see contextMaxIdle and contextMaxCount
+ Added the contexts command which displays the command contexts and their memory use
+
+ v10.4 - 18/10/2026
+ The help text is now rendered once for each auth level and cached until a command is registered or unregistered
+
+ v10.3 - 18/10/2026
+ validateMaplist now only removes and re-inserts the invalid maplist entries instead of rebuilding the whole maplist
+ The map is now only restarted by validateMaplist if the current map was altered
+
+ v10.2 - 18/10/2026
+ With advancedMapSizeValidation enabled every levels supported sizes are now indexed once at startup and cached by .desc file modification time
+ Added the levelindex command which displays or rebuilds the level index
+
+ v10.1 - 18/10/2026
+ Added the subscribe and unsubscribe commands which push chat, kill, connect, disconnect, team, ban and status events to tcp clients as they happen
+ Added subscribeBacklog which disconnects subscribed clients that dont keep up with their events
+
+ v10.0 - 18/10/2026
+ Added rconUnixSocket which also listens on a unix domain socket for local tools, connections are authed at rconUnixAuthLevel by the socket permissions
+
+ v9.9 - 18/10/2026
+ Added the compress command which enables zlib compression of large responses for the connection
+ The stats command now includes the bytes sent and compression for each connection
+
+ v9.8 - 18/10/2026
+ Added the tagged protocol, requested by login, where each request carries an id which is returned with its length prefixed response
+
+ v9.7 - 18/10/2026
+ Authenticated connections are now rate limited per connection and per auth level with separate limits for expensive commands
+ Commands over the limit are queued up to rateLimitQueue then rejected
+ The stats command now includes the rate limited command counts
+
+ v9.6 - 18/10/2026
+ Added rconThreaded which moves the network I/O to a background thread, the game thread only runs the received commands
+ Added AdminConnection.enqueue which should be used to send output instead of writing to the output buffer directly
+
+ v9.5 - 18/10/2026
+ Received data is now split into commands in a single pass so batched commands no longer cost quadratic time
+ Connections now read up to 16KB at a time and only read more once the queued commands have been run
+
+ v9.4 - 18/10/2026
+ Output is now sent from the queued chunks without copying, small chunks being coalesced into a single send
+ Sending now stops when the socket buffer is full instead of retrying until it drains
+ Added rconOutputHighWater which stops processing a connections commands while it has too much unsent output
+ The stats command now includes the queued output
+
+ v9.3 - 18/10/2026
+ All pending connections up to rconMaxAccepts are now accepted each frame
+ The listen backlog is now at least rconMaxAccepts and defaults to 32
+ Added the stats command which includes the connection accept latency
+
+ v9.2 - 18/10/2026
+ The listen socket and connections are now checked with a single select each frame so only ready sockets are read from or written to
+ Connections stop reading once a short read shows no more data is waiting
+
+ v9.1 - 18/10/2026
+ Debug messages are now only formatted if debug logging is enabled at their level hence requires MM v3.2
+
+ v9.0 - 18/10/2026
+ Console commands run via exec and map now invalidate the ModManager rcon query cache hence requires MM v2.8
+
+ v8.9 - 18/10/2026
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
+ v8.8 - 18/10/2026
+ Now registers for high priority updates hence requires MM v2.4
+
  v8.7 - 15/05/2013
  Fixed typo
  
@@ -435,14 +659,48 @@ import string
 import random
 import struct
 import sys
+import marshal
+import bisect
+import time
 import host
 import bf2
 import re
 
-__version__ = 8.5
+try:
+	import select
+except ImportError:
+	# fall back to polling each socket
+	select = None
+
+try:
+	import threading
+except ImportError:
+	# server python built without threads
+	threading = None
+
+try:
+	import zlib
+except ImportError:
+	# compression unavailable
+	zlib = None
+
+try:
+	import os
+	import stat
+except ImportError:
+	# no unix domain socket support
+	os = None
+
+# high resolution timer for the compression statistics
+if sys.platform == 'win32':
+	timer = time.clock
+else:
+	timer = time.time
+
+__version__ = 10.6
 
 __required_modules__ = {
-	'modmanager': 1.6
+	'modmanager': 3.2
 }
 
 __supports_reload__ = False
@@ -463,12 +721,32 @@ __all__ = [
 	"rconBasicPassword",
 	"rconPassword",
 	"rconListenQueue",
+	"rconMaxAccepts",
 	"allowBatching",
+	"rconOutputHighWater",
+	"rconThreaded",
+	"rconThreadedBacklog",
+	"rconThreadedCommands",
+	"rateLimitCommands",
+	"rateLimitExpensive",
+	"rateLimitLevelCommands",
+	"rateLimitLevelExpensive",
+	"rateLimitBurst",
+	"rateLimitQueue",
+	"expensiveCommands",
+	"compressThreshold",
+	"compressLevel",
+	"subscribeBacklog",
+	"rconUnixSocket",
+	"rconUnixSocketMode",
+	"rconUnixAuthLevel",
 	"enableLinger",
 	"reuseAddress",
 	"basicAuthLevel",
 	"superAuthLevel",
 	"logCommands",
+	"contextMaxIdle",
+	"contextMaxCount",
 
 	# Module specific methods
 	"registerCmdHandler",
@@ -481,6 +759,7 @@ __all__ = [
 	"unregisterConnectHandler",
 	"registerDisconnectHandler",
 	"unregisterDisconnectHandler",
+	"publishEvent",
 
 	# ModManager methods
 	"mm_load",
@@ -503,6 +782,12 @@ __cmd_maplist__ = 'maplist'
 __cmd_map__ = 'map'
 __cmd_list_locked_settings__ = 'listlocked'
 __cmd_help__ = 'help'
+__cmd_stats__ = 'stats'
+__cmd_compress__ = 'compress'
+__cmd_subscribe__ = 'subscribe'
+__cmd_unsubscribe__ = 'unsubscribe'
+__cmd_levelindex__ = 'levelindex'
+__cmd_contexts__ = 'contexts'
 
 __help_cmds__ = [ __cmd_help__, '?', '' ]
 
@@ -534,8 +819,33 @@ configDefaults = {
 	'rconIp': '0.0.0.0',
 	'rconBasicPassword': '',
 	'rconPassword': '',
-	'rconListenQueue': 5,
+	'rconListenQueue': 32,
+	'rconMaxAccepts': 16,
 	'allowBatching': 1,
+	'rconOutputHighWater': 1048576,
+	'rconThreaded': 0,
+	'rconThreadedBacklog': 20,
+	'rconThreadedCommands': 50,
+	'rateLimitCommands': 0,
+	'rateLimitExpensive': 0,
+	'rateLimitLevelCommands': 0,
+	'rateLimitLevelExpensive': 0,
+	'rateLimitBurst': 2,
+	'rateLimitQueue': 50,
+	'compressThreshold': 4096,
+	'compressLevel': 6,
+	'subscribeBacklog': 262144,
+	'rconUnixSocket': '',
+	'rconUnixSocketMode': '0600',
+	'rconUnixAuthLevel': 100,
+	'expensiveCommands': [
+		'bf2cc pl',
+		'bf2cc si',
+		'bm listBans',
+		'exec admin.listPlayers',
+		'list',
+		'banlist',
+	],
 	'enableLinger': 0,
 	'lingerFor': 1,
 	'reuseAddress': 1,
@@ -548,12 +858,48 @@ configDefaults = {
 	'restrictedGametypes': [],
 	'defaultGametype': 'gpm_cq',
 	'advancedMapSizeValidation': 0,
+	'contextMaxIdle': 3600,
+	'contextMaxCount': 128,
 }
 
 
+class TokenBucket(object):
+	"""Token bucket rate limiter.
+
+	Tokens are added at rate per second up to capacity, each command
+	taking one.
+	"""
+
+	def __init__( self, rate, capacity, now ):
+		self.rate = rate
+		self.capacity = max( capacity, 1 )
+		self.tokens = self.capacity
+		self.stamp = now
+
+	def available( self, now ):
+		"""Return True if a token is available."""
+		if self.tokens < self.capacity:
+			self.tokens = min( self.capacity, self.tokens + ( now - self.stamp ) * self.rate )
+		self.stamp = now
+		return self.tokens >= 1
+
+	def consume( self ):
+		"""Take a token, available must have been checked first."""
+		self.tokens -= 1
+
 # The server itself.
 class AdminServer(object):
 	"""Core Rcon server."""
+
+	# The longest the network thread waits for activity in seconds
+	networkTimeout = 1.0
+
+	# The most rendered help texts cached
+	helpCacheSize = 64
+
+	# How often the command contexts are swept in seconds
+	contextSweepInterval = 60
+
 	def __init__( self, modManager ):
 		"""Create an Rcon server listerning on the requested port."""
 		self.mm = modManager
@@ -564,7 +910,11 @@ class AdminServer(object):
 		self.__game = self.mm.getGameString()
 		self.__nextLevel = None
 		self.__tempLevels = []
+
+		# the supported sizes of each levels gametypes keyed by lower case map
 		self.__mapDetails = {}
+		self.__levelIndexTime = None
+		self.__levelIndexRead = 0
 		self.__officialMaps = {
 			'bf2': {
 				'dalian_plant': 1,
@@ -671,6 +1021,36 @@ class AdminServer(object):
 		for restrict in self.__config['restrictedGametypes']:
 			self.__restrictedGametypes[restrict.lower()] = 1
 
+		# Parse in expensive commands
+		self.__expensiveCmds = []
+		for cmd in self.__config['expensiveCommands']:
+			self.__expensiveCmds.append( cmd.lower() )
+
+		# rate limit state, contexts with queued commands and the buckets
+		# shared by each auth level
+		self.__deferred = {}
+		self.__levelBuckets = {}
+		self.__rateQueued = 0
+		self.__rateRejected = 0
+
+		if self.__config['advancedMapSizeValidation']:
+			self.buildLevelIndex()
+
+		# event subscriptions, the subscribed contexts for each event and
+		# the game event and handler which provides it
+		self.__subscribers = {}
+		self.__subscribersDropped = 0
+		self.__eventSources = {
+			'chat': ( 'ChatMessage', self.onEventChat ),
+			'kill': ( 'PlayerKilled', self.onEventKill ),
+			'connect': ( 'PlayerConnect', self.onEventConnect ),
+			'disconnect': ( 'PlayerDisconnect', self.onEventDisconnect ),
+			'team': ( 'PlayerChangeTeams', self.onEventTeam ),
+			'status': ( None, self.onEventStatus ),
+			# published by the ban manager
+			'ban': ( None, None ),
+		}
+
 		# Note: We use __var for all our private vars to prevent
 		# someone altering them by mistake as python doesnt have
 		# any really concept of private member variables
@@ -680,6 +1060,28 @@ class AdminServer(object):
 		# contains our current connected clients
 		self.__peers = []
 
+		# the listening sockets and if they are local ( unix domain )
+		self.__listeners = []
+		self.__unixSocket = None
+		self.__unixCount = 0
+
+		# threaded mode state, events are appended by the network thread
+		# and removed by the game thread which is safe without a lock
+		self.__thread = None
+		self.__running = False
+		self.__wakeSocket = None
+		self.__wakeAddr = None
+		self.__events = []
+
+		# what the network code logs through, in threaded mode the messages
+		# are passed to the game thread
+		self.__netLog = self.mm
+
+		# accept statistics, latency is measured from the last frame the
+		# listen queue was seen to be empty
+		self.__acceptCount = 0
+		self.__acceptCapped = 0
+
 		# Note: we use dict's here not list's to prevent duplication
 		# and to gives us an easy way to check if the unregisters
 		# are in fact valid, although this could be achieved with list.count
@@ -700,20 +1102,32 @@ class AdminServer(object):
 		# The client can be checked to see it they a authed using ctx.authed
 		self.__clients = {}
 
+		# reset contexts of disconnected players for reuse by the next player
+		# in the slot
+		self.__contextPool = {}
+		self.__contextsSwept = 0
+		self.__contextsReused = 0
+		self.__sweepTimer = None
+
 		# rcon commands supported
 		self.__cmds = {}
 
 		# rcon commands supported then the user is unauthed ( auth level 0 )
 		self.__unauthedCmds = {}
 
+		# rendered help keyed by auth level, allowed handler and command
+		self.__helpCache = {}
+
 		if not self.__config['allowBatching']:
 			self.mm.warn( "Batching disabled, this is not recommended" )
 
 		# open the socket
 		self.openSocket()
+		if self.__config['rconThreaded'] and self.__listeners:
+			self.__startNetworkThread()
 
 		# register our built in command handlers
-		self.registerCmdHandler( __cmd_login__, { 'method': self.cmdLogin, 'args': '<password|digest>' , 'level': 0 } )
+		self.registerCmdHandler( __cmd_login__, { 'method': self.cmdLogin, 'args': '<password|digest> [tagged]' , 'level': 0 } )
 		self.registerCmdHandler( __cmd_logout__, { 'method': self.cmdLogout, 'level': 0 } )
 		self.registerCmdHandler( __cmd_users__, { 'method': self.cmdUsers, 'level': 20 } )
 		self.registerCmdHandler( __cmd_kick_player__, { 'method': self.kickPlayer, 'args': '<playerid> "<reason>"', 'level': 5 } )
@@ -730,13 +1144,19 @@ class AdminServer(object):
 		self.registerCmdHandler( __cmd_map__, { 'method': self.cmdMap, 'args': '<map> <gametype> [<size>]', 'level': 5 } )
 		self.registerCmdHandler( __cmd_exec__, { 'method': self.cmdExec, 'args': '[arg1] [arg2] ... [argn]', 'level': 90 } )
 		self.registerCmdHandler( __cmd_help__, { 'method': self.cmdHelp, 'aliases': [ '?' ], 'level': 0 } )
+		self.registerCmdHandler( __cmd_stats__, { 'method': self.cmdStats, 'level': 20 } )
+		self.registerCmdHandler( __cmd_compress__, { 'method': self.cmdCompress, 'args': '[on|off]', 'level': 1 } )
+		self.registerCmdHandler( __cmd_subscribe__, { 'method': self.cmdSubscribe, 'args': '[<event> ...]', 'level': 10 } )
+		self.registerCmdHandler( __cmd_unsubscribe__, { 'method': self.cmdUnsubscribe, 'args': '[<event> ...]', 'level': 10 } )
+		self.registerCmdHandler( __cmd_levelindex__, { 'method': self.cmdLevelIndex, 'args': '[rebuild]', 'level': 50 } )
+		self.registerCmdHandler( __cmd_contexts__, { 'method': self.cmdContexts, 'level': 20 } )
 
 		# register our built in auth methods
 		self.registerAuthHandler( self.basicAuth, self.basicAllowed )
 		self.registerAuthedHandler( self.clientAuthed )
 
 		# register the fact we are interested in updates
-		self.mm.registerUpdates( self.update )
+		self.mm.registerUpdates( self.update, mm_utils.UpdatePriority.high )
 
 		# All initialisation done
 		self.mm.info( "ModManager Rcon started" )
@@ -757,6 +1177,18 @@ class AdminServer(object):
 		"""Return if batching is allowed."""
 		return self.__config['allowBatching']
 
+	def isThreaded( self ):
+		"""Return True if the network I/O is done by a background thread."""
+		return self.__thread is not None
+
+	def unixAuthLevel( self ):
+		"""Return the auth level of unix domain socket connections."""
+		return self.__config['rconUnixAuthLevel']
+
+	def outputHighWater( self ):
+		"""Return the unsent output size at which connections are throttled."""
+		return self.__config['rconOutputHighWater']
+
 	def registerCmdHandler( self, cmd, detail ):
 		"""Registers a new command handler.
 
@@ -790,6 +1222,7 @@ class AdminServer(object):
 			self.__unauthedCmds[cmd] = detail
 
 		self.__cmds[cmd] = detail
+		self.__helpCache = {}
 
 		# Add the aliases
 		for alias in detail['aliases']:
@@ -861,6 +1294,7 @@ class AdminServer(object):
 			return 0
 
 		del self.__cmds[cmd]
+		self.__helpCache = {}
 
 		if self.__unauthedCmds.has_key( cmd ):
 			del self.__unauthedCmds[cmd]
@@ -939,16 +1373,19 @@ class AdminServer(object):
 		console window or when a TCP client sends a complete line to be
 		evaluated.
 		"""
+		ctx = self.getContext( client )
+		if ctx.isSocket() and ctx.authedLevel and not self.__rateAllowed( ctx, cmd ):
+			return
 
-		interactive = True
-
-		# Is this a non-interactive client?
-		if len(cmd) > 0 and cmd[0] == '\x02':
-			cmd = cmd[1:]
-			interactive = False
+		self.__runCommand( client, cmd )
 
+	def __runCommand( self, client, cmd ):
+		"""Run a remote request."""
 		ctx = self.getContext( client )
 
+		# Is this a non-interactive or tagged client?
+		( cmd, interactive ) = self.__parseFraming( ctx, cmd )
+
 		( subcmd, args ) = mm_utils.lsplit( cmd.strip(), ' ', 2 )
 
 		# you can only login unless you are authenticated
@@ -1007,6 +1444,127 @@ class AdminServer(object):
 		# Now send any info created by the command
 		ctx.send( interactive )
 
+	def __parseFraming( self, ctx, cmd ):
+		"""Return the command without its framing prefix and if its interactive.
+
+		Sets ctx.requestId for tagged requests.
+		"""
+		if cmd.startswith( '\x02' ):
+			return ( cmd[1:], False )
+
+		if cmd.startswith( '\x03' ) and ctx.isSocket() and ctx.conn.tagged:
+			( ctx.requestId, cmd ) = mm_utils.lsplit( cmd[1:], ' ', 2 )
+			return ( cmd, False )
+
+		return ( cmd, True )
+
+	def __rateAllowed( self, ctx, cmd ):
+		"""Return True if the command can be run now.
+
+		Commands over the rate limit are queued to be run by update or
+		rejected if the queue is full. Only an expensive command waits for
+		the expensive commands queued before it so cheap ones aren't held
+		up by them.
+		"""
+		expensive = self.__isExpensive( cmd )
+		if not self.__isWaiting( ctx, expensive ) and self.__takeTokens( ctx, expensive ):
+			return True
+
+		if len( ctx.deferred ) < self.__config['rateLimitQueue']:
+			ctx.deferred.append( ( cmd, expensive ) )
+			ctx.rateQueued += 1
+			self.__rateQueued += 1
+			self.__deferred[ctx] = 1
+			return False
+
+		ctx.rateRejected += 1
+		self.__rateRejected += 1
+		( cmd, interactive ) = self.__parseFraming( ctx, cmd )
+		ctx.write( "error: rate limit exceeded, command '%s' rejected\n" % cmd )
+		ctx.send( interactive )
+		self.mm.warn( "Client %s rate limited, command '%s' rejected", ctx.getName(), cmd )
+		return False
+
+	def __isWaiting( self, ctx, expensive ):
+		"""Return True if a command of the same kind is queued for the context."""
+		for ( cmd, queued ) in ctx.deferred:
+			if queued == expensive:
+				return True
+		return False
+
+	def __takeTokens( self, ctx, expensive ):
+		"""Take a token from each of the buckets which apply to a command.
+
+		Returns False, taking nothing, if any of them are empty.
+		"""
+		now = host.timer_getWallTime()
+		if ctx.rateBuckets is None:
+			ctx.rateBuckets = ( self.__newBucket( 'rateLimitCommands', now ), self.__newBucket( 'rateLimitExpensive', now ) )
+		if not self.__levelBuckets.has_key( ctx.authedLevel ):
+			self.__levelBuckets[ctx.authedLevel] = ( self.__newBucket( 'rateLimitLevelCommands', now ), self.__newBucket( 'rateLimitLevelExpensive', now ) )
+		levelBuckets = self.__levelBuckets[ctx.authedLevel]
+
+		buckets = [ ctx.rateBuckets[0], levelBuckets[0] ]
+		if expensive:
+			buckets.append( ctx.rateBuckets[1] )
+			buckets.append( levelBuckets[1] )
+
+		for bucket in buckets:
+			if bucket is not None and not bucket.available( now ):
+				return False
+
+		for bucket in buckets:
+			if bucket is not None:
+				bucket.consume()
+
+		return True
+
+	def __newBucket( self, key, now ):
+		"""Return a TokenBucket for the rate configured by key or None if unlimited."""
+		rate = self.__config[key]
+		if not rate:
+			return None
+		return TokenBucket( rate, rate * self.__config['rateLimitBurst'], now )
+
+	def __isExpensive( self, cmd ):
+		"""Return True if the command is rate limited as expensive."""
+		if cmd.startswith( '\x03' ):
+			# strip the request id
+			cmd = mm_utils.lsplit( cmd, ' ', 2 )[1]
+		cmd = cmd.lstrip( '\x02' ).strip().lower()
+		for expensive in self.__expensiveCmds:
+			if cmd == expensive or cmd.startswith( expensive + ' ' ):
+				return True
+		return False
+
+	def __runDeferred( self ):
+		"""Run the queued commands which are now within the rate limits.
+
+		Cheap and expensive commands each run in the order they were
+		received but a waiting expensive command doesn't hold up the cheap
+		ones queued after it.
+		"""
+		for ctx in self.__deferred.keys():
+			if ctx.conn.socket is None or ctx.conn.closing is not None:
+				ctx.deferred = []
+			else:
+				waiting = []
+				blocked = { True: False, False: False }
+				for ( cmd, expensive ) in ctx.deferred[:]:
+					if ctx.conn.socket is None or ctx.conn.closing is not None:
+						# closed by one of the commands
+						waiting = []
+						break
+					if blocked[expensive] or not self.__takeTokens( ctx, expensive ):
+						blocked[expensive] = True
+						waiting.append( ( cmd, expensive ) )
+					else:
+						self.__runCommand( ctx.conn, cmd )
+				ctx.deferred = waiting
+
+			if not ctx.deferred:
+				del self.__deferred[ctx]
+
 	def getContext( self, client ):
 		"""Return a CommandContext.
 
@@ -1014,16 +1572,55 @@ class AdminServer(object):
 		If not found creates a new one and returns that
 		"""
 		if not self.__clients.has_key( client ):
-			self.__clients[client] = CommandContext( client )
+			if self.__contextPool.has_key( client ):
+				# reuse the context of the last player in this slot
+				self.__clients[client] = self.__contextPool.pop( client )
+				self.__contextsReused += 1
+			else:
+				self.__clients[client] = CommandContext( client )
+
+		ctx = self.__clients[client]
+		ctx.lastUsed = host.timer_getWallTime()
+		return ctx
 
-		return self.__clients[client]
+	def __sweepContexts( self, data=None ):
+		"""Remove the contexts of players which have gone and idle ones.
+
+		Only in-game contexts are swept, connection contexts are always
+		removed when the connection closes.
+		"""
+		now = host.timer_getWallTime()
+		max_idle = self.__config['contextMaxIdle']
+		idle = []
+		for ( client, ctx ) in self.__clients.items():
+			if not ctx.isInGame() or ctx.deferred:
+				continue
+
+			if -1 != client and bf2.playerManager.getPlayerByIndex( client ) is None:
+				# player left without us seeing the disconnect
+				self.__removeClientCtx( client )
+				self.__contextsSwept += 1
+			elif not ctx.authedLevel:
+				if max_idle and now - ctx.lastUsed > max_idle:
+					self.__removeClientCtx( client )
+					self.__contextsSwept += 1
+				else:
+					idle.append( ( ctx.lastUsed, client ) )
+
+		# remove the least recently used unauthed contexts over the limit
+		excess = len( self.__clients ) - self.__config['contextMaxCount']
+		if 0 < excess:
+			idle.sort()
+			for ( last_used, client ) in idle[:excess]:
+				self.__removeClientCtx( client )
+				self.__contextsSwept += 1
 
 	def onChatMessage(self, playerid, text, channel, flags):
 		"""Called whenever a player issues a chat string."""
-		self.mm.debug( 3, 'chat: pid=%d text=\'%s\' channel=%s flags=%s' % ( playerid, text, channel, flags ) )
+		self.mm.debug( 3, 'chat: pid=%d text=\'%s\' channel=%s flags=%s', playerid, text, channel, flags )
 
 	def openSocket(self):
-		"""Set up the listening TCP Rcon socket."""
+		"""Set up the listening TCP Rcon socket and the unix domain socket if enabled."""
 		try:
 			self.__socket = socket.socket( socket.AF_INET, socket.SOCK_STREAM )
 			if self.__config['enableLinger']:
@@ -1032,53 +1629,386 @@ class AdminServer(object):
 			if self.__config['reuseAddress']:
 				self.__socket.setsockopt( socket.SOL_SOCKET, socket.SO_REUSEADDR, 1 )
 			self.__socket.bind( ( self.__config['rconIp'] , self.__config['rconPort'] ) )
-			self.__socket.listen( self.__config['rconListenQueue'] )
+			# size the backlog so a full frames worth of connections can queue
+			backlog = max( self.__config['rconListenQueue'], self.__config['rconMaxAccepts'] )
+			self.__socket.listen( min( backlog, getattr( socket, 'SOMAXCONN', backlog ) ) )
 			self.__socket.setblocking( 0 )
+			self.__listeners.append( ( self.__socket, False ) )
 		except Exception, detail:
 			self.mm.error( 'Failed to bind rcon socket, only in-game rcon will be enabled (%s)' % detail, True )
 			self.__socket = None
 
+		if self.__config['rconUnixSocket']:
+			self.__openUnixSocket()
+
+	def __openUnixSocket( self ):
+		"""Set up the listening unix domain socket for local tools.
+
+		Access is controlled by the permissions of the socket file.
+		"""
+		path = self.__config['rconUnixSocket']
+		if os is None or not hasattr( socket, 'AF_UNIX' ):
+			self.mm.warn( "Unix domain sockets are not supported, rconUnixSocket ignored" )
+			return
+
+		try:
+			# the mode may have been written unquoted and so parsed as an int
+			mode = int( str( self.__config['rconUnixSocketMode'] ), 8 )
+			if os.path.exists( path ):
+				# remove the socket left by a previous run but nothing else
+				if not stat.S_ISSOCK( os.stat( path )[stat.ST_MODE] ):
+					raise socket.error( "'%s' exists and is not a socket" % path )
+				probe = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+				try:
+					try:
+						probe.connect( path )
+					except socket.error, detail:
+						if errno.ECONNREFUSED != detail[0]:
+							raise
+						# nothing is listening on it
+						os.remove( path )
+					else:
+						raise socket.error( "'%s' is in use by another server" % path )
+				finally:
+					probe.close()
+
+			sock = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+			# create the socket without access so its never open to others
+			umask = os.umask( 0777 )
+			try:
+				sock.bind( path )
+			finally:
+				os.umask( umask )
+			os.chmod( path, mode )
+			backlog = max( self.__config['rconListenQueue'], self.__config['rconMaxAccepts'] )
+			sock.listen( min( backlog, getattr( socket, 'SOMAXCONN', backlog ) ) )
+			sock.setblocking( 0 )
+		except Exception, detail:
+			self.mm.error( "Failed to bind rcon unix socket '%s' (%s)" % ( path, detail ), True )
+			return
+
+		self.__unixSocket = sock
+		self.__listeners.append( ( sock, True ) )
+		self.mm.info( "Rcon listening on unix socket '%s' with mode %04o" % ( path, mode ) )
+
+	def __closeUnixSocket( self ):
+		"""Close the unix domain socket and remove its file."""
+		if self.__unixSocket is None:
+			return
+
+		self.__unixSocket.close()
+		self.__unixSocket = None
+		try:
+			os.remove( self.__config['rconUnixSocket'] )
+		except OSError, detail:
+			self.mm.warn( "Failed to remove rcon unix socket (%s)" % detail )
+
 	def update( self ):
 		"""Process the server update.
 
 		WARNING: update is called very frequently!! Don't go crazy with logic here.
 		"""
-		if self.__socket is None:
+		if self.__deferred:
+			self.__runDeferred()
+
+		if self.__thread is not None:
+			# the network thread does the socket work, just run what it received
+			self.__runEvents()
+			return
+
+		if not self.__listeners:
 			# No socket, just return
 			return
 
-		# without blocking, check for new connections
+		self.__pollNetwork( 0 )
+
+	def __startNetworkThread( self ):
+		"""Start the background thread which does the network I/O."""
+		if threading is None or select is None:
+			self.mm.warn( "Rcon threaded mode requires thread and select support, using the game thread" )
+			return
+
 		try:
-			sock, peeraddr = self.__socket.accept()
-			peer = AdminConnection( self, sock, peeraddr, self.__game )
-			self.__peers.append( peer )
+			# a udp socket sent to itself wakes the thread when there is output
+			self.__wakeSocket = socket.socket( socket.AF_INET, socket.SOCK_DGRAM )
+			self.__wakeSocket.bind( ( '127.0.0.1', 0 ) )
+			self.__wakeSocket.setblocking( 0 )
+			self.__wakeAddr = self.__wakeSocket.getsockname()
+		except socket.error, detail:
+			self.mm.error( "Rcon failed to create wake socket, using the game thread (%s)" % detail )
+			self.__wakeSocket = None
+			return
+
+		self.__running = True
+		self.__netLog = EventLog( self.mm, self.__postLog )
+		self.__thread = threading.Thread( target=self.__networkThread )
+		self.__thread.setDaemon( True )
+		self.__thread.start()
+		self.mm.info( "Rcon network I/O running in a background thread" )
+
+	def __stopNetworkThread( self ):
+		"""Stop the network thread and wait for it to finish."""
+		if self.__thread is None:
+			return
+
+		self.__running = False
+		self.wakeNetwork()
+		self.__thread.join()
+		self.__thread = None
+		self.__wakeSocket.close()
+		self.__wakeSocket = None
+
+		# the game thread owns the connections again
+		self.__netLog = self.mm
+		for peer in self.__peers:
+			peer.threaded = False
+			peer.mm = peer.outbuf.mm = self.mm
+
+		# only the messages are still of interest
+		for ( event, peer, data ) in self.__events:
+			if 'log' == event:
+				self.__runLog( data )
+		self.__events = []
+
+	def wakeNetwork( self ):
+		"""Wake the network thread so it sends any new output."""
+		if self.__wakeSocket is not None:
+			try:
+				self.__wakeSocket.sendto( 'w', self.__wakeAddr )
+			except socket.error:
+				# already has a wake pending
+				pass
+
+	def __networkThread( self ):
+		"""Do the socket work until stopped."""
+		while self.__running:
+			try:
+				self.__pollNetwork( self.networkTimeout )
+			except:
+				self.__netLog.error( "Rcon network thread failed", True )
+
+	def __postEvent( self, event, peer, data=None ):
+		"""Pass an event from the network thread to the game thread."""
+		self.__events.append( ( event, peer, data ) )
+
+	def __postLog( self, method, *args ):
+		"""Pass a log message from the network thread to the game thread."""
+		self.__postEvent( 'log', None, ( method, args ) )
+
+	def __runLog( self, data ):
+		"""Log a message posted by the network thread."""
+		( method, args ) = data
+		getattr( self.mm, method )( *args )
+
+	def __runEvents( self ):
+		"""Process the events posted by the network thread.
+
+		At most rconThreadedCommands commands are run each frame, the rest
+		being left for the following frames.
+		"""
+		count = len( self.__events )
+		if not count:
+			return
+
+		limit = self.__config['rconThreadedCommands']
+		if limit:
+			commands = 0
+			i = 0
+			while i < count:
+				if 'command' == self.__events[i][0]:
+					if commands == limit:
+						break
+					commands += 1
+				i += 1
+			count = i
+
+		events = self.__events[:count]
+		del self.__events[:count]
+		wake = False
+		for ( event, peer, data ) in events:
+			if 'command' == event:
+				if peer.backlogged():
+					# the network thread can read from it again
+					wake = True
+				peer.ran += 1
+				if peer.closing is None:
+					self.onRemoteCommand( peer, data )
+			elif 'log' == event:
+				self.__runLog( data )
+			elif 'connect' == event:
+				self.__clientConnected( peer )
+			else:
+				self.__removeClientCtx( peer )
+
+		if wake:
+			self.wakeNetwork()
+
+	def dispatchCommand( self, peer, cmd ):
+		"""Run a command received from a connection."""
+		if self.__thread is not None:
+			peer.posted += 1
+			self.__postEvent( 'command', peer, cmd )
+		else:
+			self.onRemoteCommand( peer, cmd )
+
+	def eventLog( self ):
+		"""Return what connections created by the network thread log through."""
+		return self.__netLog
+
+	def threadedBacklog( self ):
+		"""Return the commands a connection may have waiting in threaded mode."""
+		return self.__config['rconThreadedBacklog']
+
+	def __clientConnected( self, peer ):
+		"""Inform the connect handlers of the new client."""
+		ctx = CommandContext( peer )
+		for handler in self.__connectHandlers:
+			try:
+				handler( ctx )
+			except:
+				self.mm.error( "Handler '%s' failed to process connect" % mm_utils.method_name( handler ), True )
+
+		if peer.local:
+			self.__localAuth( peer )
+
+	def __localAuth( self, peer ):
+		"""Authenticate a unix domain socket connection.
+
+		Anyone able to open the socket is authed at rconUnixAuthLevel.
+		"""
+		ctx = self.getContext( peer )
+		ctx.authedLevel = self.__config['rconUnixAuthLevel']
+		ctx.authedBy = 'unix socket permissions'
+		ctx.authedAllowed = self.basicAllowed
+
+		# tell each authed handler about the clients new authed status
+		for handler in self.__authedHandlers:
+			try:
+				handler( ctx )
+			except:
+				self.mm.error( "Handler '%s' failed to process authed" % mm_utils.method_name( handler ), True )
+
+		# the welcome message has already told the client its authed
+		ctx.output = []
+
+	def __pollNetwork( self, timeout ):
+		"""Accept new connections and update the existing ones.
+
+		This runs on the network thread in threaded mode so must not call
+		the engine, messages are logged through __netLog.
+		"""
+		# find out which sockets are ready so only those are touched
+		ready = self.__selectSockets( timeout )
+
+		# without blocking, accept the pending connections up to rconMaxAccepts
+		drained = True
+		accepted = 0
+		for ( listener, local ) in self.__listeners:
+			if not drained:
+				break
+			if ready is not None and not ready[0].has_key( listener ):
+				continue
+
+			while True:
+				if accepted >= self.__config['rconMaxAccepts']:
+					# leave the rest for the next frame
+					self.__acceptCapped += 1
+					drained = False
+					break
 
-			# inform the connect handlers of the new client
-			ctx = CommandContext( peer )
-			for handler in self.__connectHandlers:
 				try:
-					handler( ctx )
-				except:
-					self.mm.error( "Handler '%s' failed to process connect" % mm_utils.method_name( handler ), True )
+					sock, peeraddr = listener.accept()
+				except Exception, detail:
+					error = detail[0]
+					if errno.EWOULDBLOCK != error and errno.EAGAIN != error:
+						self.__netLog.error( "Rcon accept error (%s)" % detail, True )
+						# raising an error here appears to break rcon so we now just continue processing
+						#raise socket.error, detail
+					break
 
-		except Exception, detail:
-			error = detail[0]
-			if errno.EWOULDBLOCK != error and errno.EAGAIN != error:
-				self.mm.error( "Rcon accept error (%s)" % detail, True )
-				# raising an error here appears to break rcon so we now just continue processing
-				#raise socket.error, detail
+				accepted += 1
+				self.__acceptCount += 1
+
+				if local:
+					# unix domain peers have no address, number them instead
+					self.__unixCount += 1
+					peeraddr = ( self.__config['rconUnixSocket'], self.__unixCount )
+
+				try:
+					peer = AdminConnection( self, sock, peeraddr, self.__game, local )
+				except Exception, detail:
+					self.__netLog.error( "Rcon failed to setup connection (%s)" % detail, True )
+					continue
+				self.__peers.append( peer )
+
+				if self.__thread is not None:
+					self.__postEvent( 'connect', peer )
+				else:
+					self.__clientConnected( peer )
 
 		# update clients and removing the clients that fail their update
 		peers = []
 		for peer in self.__peers:
-			if peer.update():
+			if ready is None or peer.socket is None:
+				ok = peer.update()
+			else:
+				ok = peer.update( ready[0].has_key( peer.socket ), ready[1].has_key( peer.socket ) )
+			if ok:
 				peers.append( peer )
+			elif self.__thread is not None:
+				self.__postEvent( 'disconnect', peer )
 			else:
 				self.__removeClientCtx( peer )
 
 		# now keep the remaining clients
 		self.__peers = peers
 
+	def __selectSockets( self, timeout=0 ):
+		"""Return the readable and writable sockets as dictionaries.
+
+		Returns None if select isnt available or fails in which case every
+		socket should be tried.
+		"""
+		if select is None:
+			return None
+
+		rlist = []
+		for ( listener, local ) in self.__listeners:
+			rlist.append( listener )
+		if self.__wakeSocket is not None:
+			rlist.append( self.__wakeSocket )
+		wlist = []
+		for peer in self.__peers:
+			if peer.socket is not None:
+				if self.__thread is not None:
+					peer.pump()
+				if not peer.outbuf.full() and not peer.backlogged():
+					rlist.append( peer.socket )
+				if peer.outbuf.pending():
+					wlist.append( peer.socket )
+
+		try:
+			( rlist, wlist, xlist ) = select.select( rlist, wlist, [], timeout )
+		except ( select.error, socket.error ), detail:
+			self.__netLog.error( "Rcon select failed (%s)" % detail )
+			return None
+
+		readable = {}
+		for sock in rlist:
+			readable[sock] = 1
+
+		if readable.has_key( self.__wakeSocket ):
+			try:
+				while 1:
+					self.__wakeSocket.recv( 16 )
+			except socket.error:
+				pass
+		writable = {}
+		for sock in wlist:
+			writable[sock] = 1
+
+		return ( readable, writable )
+
 	def onPlayerDisconnect( self, player ):
 		"""Remove the disconnecting player."""
 		return self.__removeClientCtx( player.index )
@@ -1096,6 +2026,10 @@ class AdminServer(object):
 
 		# delete the closed connection from our clients list
 		del self.__clients[client]
+		if self.__deferred.has_key( ctx ):
+			del self.__deferred[ctx]
+		if ctx.subscriptions:
+			self.__unsubscribe( ctx, ctx.subscriptions.keys() )
 
 		# Note: __peer is cleared by the calling method so we dont need
 		# to do anything with it here
@@ -1106,15 +2040,39 @@ class AdminServer(object):
 			except:
 				self.mm.error( "Handler '%s' failed to process disconnect" % mm_utils.method_name( handler ), True )
 
+		if ctx.isInGame() and len( self.__contextPool ) < self.__config['contextMaxCount']:
+			# keep it for the next player in this slot
+			ctx.reset()
+			self.__contextPool[client] = ctx
+
 	def cmdLogin( self, ctx, cmd ):
 		"""Authenticates with the server.
 
 		You must call this before you can use any other commands
 		"""
+		if ctx.isSocket() and ctx.conn.local and ctx.authedLevel:
+			# authed by the socket permissions, there is no seed to login
+			# with so only the protocol can be changed
+			parts = cmd.split()
+			if parts and 'tagged' == parts[-1].lower():
+				ctx.conn.tagged = True
+				ctx.write( 'Tagged protocol enabled.\n' )
+			else:
+				ctx.write( 'Already authenticated by socket permissions.\n' )
+			return
+
 		authed_level = 0
 		authed_by = None
 		authed_allower = None
 
+		# tcp clients may request the tagged protocol after the password
+		tagged = False
+		if ctx.isSocket():
+			parts = cmd.split()
+			if 2 == len( parts ) and 'tagged' == parts[1].lower():
+				cmd = parts[0]
+				tagged = True
+
 		# ask each auth handler in turn to auth the client
 		for handler in self.__authHandlers:
 			try:
@@ -1139,6 +2097,10 @@ class AdminServer(object):
 			except:
 				self.mm.error( "Handler '%s' failed to process authed" % mm_utils.method_name( handler ), True )
 
+		if tagged and authed_level:
+			ctx.conn.tagged = True
+			ctx.write( 'Tagged protocol enabled.\n' )
+
 	def cmdLogout( self, ctx, cmd ):
 		"""Logout from rcon."""
 		ctx.authedLevel = 0
@@ -1255,6 +2217,7 @@ class AdminServer(object):
 	def cmdExec( self, ctx, cmd ):
 		"""Execute a console command on the server."""
 		self.mm.info( "cmdExec '%s' by %s" % ( cmd, ctx.getName() ) )
+		self.mm.rconInvalidate( cmd )
 		try:
 			( subcmd, args ) = mm_utils.lsplit( cmd.strip(), ' ', 2 )
 			subcmd_orig = subcmd
@@ -1472,6 +2435,7 @@ class AdminServer(object):
 	def maplistClear( self, ctx=None ):
 		"""Clears the maplist, maintaing the details of temporary maps in the process."""
 		ret = host.rcon_invoke( 'maplist.clear' )
+		self.mm.rconInvalidate( 'maplist.' )
 		if ctx is not None:
 			ctx.write( ret )
 
@@ -1502,6 +2466,9 @@ class AdminServer(object):
 
 		ret = host.rcon_invoke( 'maplist.remove %d' % ( idx ) )
 
+		# covers the next level changes below too as nothing is queried between
+		self.mm.rconInvalidate( 'maplist.' )
+
 		# Tell the rcon user the result
 		ctx.write( ret )
 
@@ -1563,6 +2530,7 @@ class AdminServer(object):
 			ret = host.rcon_invoke( 'maplist.append %s %s %s' % ( map_name, gametype, size ) )
 		else:
 			ret = host.rcon_invoke( 'maplist.append %s %s' % ( map_name, gametype ) )
+		self.mm.rconInvalidate( 'maplist.' )
 
 		return True
 
@@ -1581,6 +2549,7 @@ class AdminServer(object):
 			ret = host.rcon_invoke( 'maplist.insert %d %s %s %s' % ( idx, map_name, gametype, size ) )
 		else:
 			ret = host.rcon_invoke( 'maplist.insert %d %s %s' % ( idx, map_name, gametype ) )
+		self.mm.rconInvalidate( 'maplist.' )
 
 		# Tell the rcon user the result
 		ctx.write( ret )
@@ -1606,10 +2575,13 @@ class AdminServer(object):
 
 	def mapRun( self, ctx, map_name, gametype, size ):
 		"""Run's a specific map, gametype and size without requiring it to already be in the server maplist"""
-		self.mm.debug( 2, "mapRun: %s, %s, %s" % ( map_name, gametype, size ) )
+		self.mm.debug( 2, "mapRun: %s, %s, %s", map_name, gametype, size )
 		if not self.mapGametypeAllowed( ctx, map_name, gametype ):
 			return False
 
+		# We change the maplist and next level
+		self.mm.rconInvalidate( 'maplist.' )
+
 		# Make a note of the current maplist so that we can restore it later
 		maplist = []
 		max_idx = 0
@@ -1617,7 +2589,7 @@ class AdminServer(object):
 			if "" != line:
 				( idx, cur_map_name, cur_gametype, cur_size ) = mm_utils.largs( line.lower(), None, 4, None )
 				max_idx = int( idx.strip( ':' ) )
-				self.mm.debug( 2, "%s == %s and %s == %s and %s == %s" % ( map_name, cur_map_name, gametype, cur_gametype, size, cur_size ) )
+				self.mm.debug( 2, "%s == %s and %s == %s and %s == %s", map_name, cur_map_name, gametype, cur_gametype, size, cur_size )
 				if map_name == cur_map_name and ( gametype is None or gametype == cur_gametype ) and ( size is None or size == cur_size ):
 					# We found a match in the current maplist lets use it
 					if self.__nextLevel is None:
@@ -1705,7 +2677,7 @@ class AdminServer(object):
 				self.warn( "Invalid map size '%s' specified (defaulting)" % ( size ) )
 				size = int( host.ss_getParam( 'maxPlayers' ) )
 
-			self.mm.debug( 5, "SIZE1: %d" % ( size ) )
+			self.mm.debug( 5, "SIZE1: %d", size )
 			if 'gpm_cq' == gametype or 'gpm_nv' == gametype:
 				# Conquest supports 16, 32 and 64 players types
 				if ( 16 != size and 32 != size and 64 != size ):
@@ -1740,47 +2712,19 @@ class AdminServer(object):
 			if 1 != self.__config['advancedMapSizeValidation']:		
 				return size
 		
-			self.mm.debug( 5, "SIZE2: %d" % ( size ) )
-			if not self.__mapDetails.has_key( map_name ):
-				try:
-					desc_file = "%s/levels/%s/info/%s.desc" % ( host.sgl_getModDirectory().replace( '\\', '/' ), map_name, map_name )
-					mode_re = re.compile( r'<mode\s+type="(.*?)">', re.IGNORECASE )
-					players_re = re.compile( r'\s+players="(\d+)"', re.IGNORECASE )
-
-					self.mm.debug( 4, "Loading map desc file: '%s'" % ( desc_file ) )
-					f = open( desc_file, 'r' )
-					modes = {}
-					mode_name = None
-					for line in f.readlines():
-						self.mm.debug( 5, "LINE: %s" % ( line ) )
-						if mode_name is None:
-							# Looking for gametype
-							match = mode_re.search( line )
-							if match is not None:
-								mode_name = match.group(1)
-								self.mm.debug( 3, "MODE: '%s'" % ( mode_name ) )
-								modes[mode_name] = {}
-						else:
-							# looking for sizes
-							match = players_re.search( line )
-							if match is not None:
-								self.mm.debug( 3, "SIZE: '%s'" % ( match.group(1) ) )
-								modes[mode_name][int(match.group(1))] = 1
-							elif -1 != line.find( "</mode>" ):
-								# end of sizes
-								self.mm.debug( 5, "MODE End" )
-								mode_name = None
-
-					self.__mapDetails[map_name] = modes
-					f.close()
-
-				except RuntimeError, detail:
-					self.mm.warn( "Failed to process map description file '%s' (%s)" % ( desc_file, detail ) )
+			self.mm.debug( 5, "SIZE2: %d", size )
+			map_key = map_name.lower()
+			if not self.__mapDetails.has_key( map_key ):
+				# not indexed e.g. added since the index was built
+				desc_file = "%s/levels/%s/info/%s.desc" % ( host.sgl_getModDirectory().replace( '\\', '/' ), map_name, map_name )
+				modes = self.__parseMapDesc( desc_file )
+				if modes is not None:
+					self.__mapDetails[map_key] = modes
 
 			# Apply full validation if possible
-			if self.__mapDetails.has_key( map_name ):
-				if self.__mapDetails[map_name].has_key( gametype ):
-					details = self.__mapDetails[map_name][gametype]
+			if self.__mapDetails.has_key( map_key ):
+				if self.__mapDetails[map_key].has_key( gametype ):
+					details = self.__mapDetails[map_key][gametype]
 					if not details.has_key( size ):
 						# this is not a valid size so find one
 						# here we look for the closest numberical match to the value given
@@ -1798,7 +2742,7 @@ class AdminServer(object):
 
 						if 0 != closest_size:
 							size = closest_size
-							self.mm.debug( 5, "SIZE3: %d" % ( size ) )
+							self.mm.debug( 5, "SIZE3: %d", size )
 						else:
 							self.mm.error( "Failed to find a valid size for map '%s' gametype '%s' requested %d" % ( map_name, gametype, size ) )
 							size = None
@@ -1807,9 +2751,162 @@ class AdminServer(object):
 
 		return size
 
+	def __parseMapDesc( self, desc_file ):
+		"""Return the supported sizes of each gametype from a levels .desc file.
+
+		The result is a dictionary of gametype to a dictionary of sizes, None
+		if the file couldnt be read.
+		"""
+		mode_re = re.compile( r'<mode\s+type="(.*?)">', re.IGNORECASE )
+		players_re = re.compile( r'\s+players="(\d+)"', re.IGNORECASE )
+
+		self.mm.debug( 4, "Loading map desc file: '%s'", desc_file )
+		try:
+			f = open( desc_file, 'r' )
+			try:
+				lines = f.readlines()
+			finally:
+				f.close()
+		except IOError, detail:
+			self.mm.warn( "Failed to process map description file '%s' (%s)" % ( desc_file, detail ) )
+			return None
+
+		modes = {}
+		mode_name = None
+		debugLines = self.mm.isDebugEnabled( 5 )
+		for line in lines:
+			if debugLines:
+				self.mm.debug( 5, "LINE: %s", line )
+			if mode_name is None:
+				# Looking for gametype
+				match = mode_re.search( line )
+				if match is not None:
+					mode_name = match.group(1)
+					self.mm.debug( 3, "MODE: '%s'", mode_name )
+					modes[mode_name] = {}
+			else:
+				# looking for sizes
+				match = players_re.search( line )
+				if match is not None:
+					self.mm.debug( 3, "SIZE: '%s'", match.group(1) )
+					modes[mode_name][int(match.group(1))] = 1
+				elif -1 != line.find( "</mode>" ):
+					# end of sizes
+					self.mm.debug( 5, "MODE End" )
+					mode_name = None
+
+		return modes
+
+	def buildLevelIndex( self, rebuild=False ):
+		"""Index the supported sizes of every levels gametypes.
+
+		The index is cached along with the modification time and size of each
+		.desc file so only changed files are read, unless rebuild is set.
+		Returns the number of .desc files read or None if the levels couldnt
+		be listed.
+		"""
+		if os is None:
+			# fall back to reading each .desc file when first used
+			self.mm.warn( "Level index requires os support, map .desc files will be read as needed" )
+			return None
+
+		start = timer()
+		mod_dir = host.sgl_getModDirectory().replace( '\\', '/' )
+		levels_dir = "%s/levels" % mod_dir
+		cache_file = "%s/settings/mm_rcon_levels.cache" % mod_dir
+		try:
+			names = os.listdir( levels_dir )
+		except OSError, detail:
+			self.mm.warn( "Failed to list the levels in '%s' (%s)" % ( levels_dir, detail ) )
+			return None
+
+		cached = {}
+		if not rebuild:
+			try:
+				fh = open( cache_file, 'rb' )
+				try:
+					( version, entries ) = marshal.load( fh )
+				finally:
+					fh.close()
+				if version == __version__:
+					cached = entries
+			except ( IOError, EOFError, ValueError, TypeError ), detail:
+				self.mm.debug( 1, "No valid level index cache '%s' (%s)", cache_file, detail )
+
+		index = {}
+		entries = {}
+		read = 0
+		for name in names:
+			desc_file = "%s/%s/info/%s.desc" % ( levels_dir, name, name )
+			try:
+				info = os.stat( desc_file )
+			except OSError:
+				# not a level
+				continue
+
+			map_key = name.lower()
+			key = ( info[stat.ST_MTIME], info[stat.ST_SIZE] )
+			if cached.has_key( map_key ) and key == cached[map_key][0]:
+				modes = cached[map_key][1]
+			else:
+				modes = self.__parseMapDesc( desc_file )
+				if modes is None:
+					continue
+				read += 1
+
+			index[map_key] = modes
+			entries[map_key] = ( key, modes )
+
+		self.__mapDetails = index
+		self.__levelIndexRead = read
+		self.__levelIndexTime = timer() - start
+
+		if read or len( entries ) != len( cached ):
+			try:
+				fh = open( cache_file, 'wb' )
+				try:
+					marshal.dump( ( __version__, entries ), fh )
+				finally:
+					fh.close()
+			except IOError, detail:
+				self.mm.warn( "Failed to write level index cache '%s' (%s)" % ( cache_file, detail ) )
+
+		self.mm.info( "Indexed %d levels in %.1fms ( %d .desc files read )" % ( len( index ), self.__levelIndexTime * 1000, read ) )
+		return read
+
+	def cmdLevelIndex( self, ctx, cmd ):
+		"""Display or rebuild the level index."""
+		arg = cmd.strip().lower()
+		if 'rebuild' == arg:
+			if self.buildLevelIndex( True ) is None:
+				ctx.write( "error: failed to list the levels\n" )
+				return
+		elif arg:
+			ctx.write( "error: usage levelindex [rebuild]\n" )
+			return
+
+		if self.__levelIndexTime is None:
+			ctx.write( "Level index not built, %d levels read as needed\n" % len( self.__mapDetails ) )
+		else:
+			ctx.write( "Level index: %d levels built in %.1fms ( %d .desc files read )\n" % ( len( self.__mapDetails ), self.__levelIndexTime * 1000, self.__levelIndexRead ) )
+
+		map_names = self.__mapDetails.keys()
+		map_names.sort()
+		for map_name in map_names:
+			modes = self.__mapDetails[map_name]
+			gametypes = modes.keys()
+			gametypes.sort()
+			details = []
+			for gametype in gametypes:
+				sizes = modes[gametype].keys()
+				sizes.sort()
+				details.append( "%s %s" % ( gametype, ','.join( map( str, sizes ) ) ) )
+			ctx.write( " %s: %s\n" % ( map_name, ', '.join( details ) ) )
+
 	def kickPlayer( self, ctx, cmd, wild=False ):
 		"""Kick a player from the server with a message."""
-		self.mm.debug( 2, "kickPlayer '%s' by %s" % ( cmd, ctx.getName() ) )
+		if self.mm.isDebugEnabled( 2 ):
+			self.mm.debug( 2, "kickPlayer '%s' by %s", cmd, ctx.getName() )
 
 		( playerid, reason ) = mm_utils.largs( cmd, None, 2, '' )
 
@@ -1826,13 +2923,15 @@ class AdminServer(object):
 
 	def cmdBanList( self, ctx, cmd ):
 		"""Ban a player for a specified timer period from the server with a message."""
-		self.mm.debug( 2, "cmdBanList by %s" % ( ctx.getName() ) )
+		if self.mm.isDebugEnabled( 2 ):
+			self.mm.debug( 2, "cmdBanList by %s", ctx.getName() )
 		self.mm.banManager().banList( ctx )
 
 
 	def cmdUnBan( self, ctx, cmd ):
 		"""Unban a player with an optional reason."""
-		self.mm.debug( 2, "cmdUnBan '%s' by %s" % ( cmd, ctx.getName() ) )
+		if self.mm.isDebugEnabled( 2 ):
+			self.mm.debug( 2, "cmdUnBan '%s' by %s", cmd, ctx.getName() )
 		( ban, msg ) = mm_utils.largs( cmd, None, 2, '' )
 		if self.mm.banManager().unbanPlayer( ban, msg ):
 			ctx.write( 'Unban successful\n' )
@@ -1842,7 +2941,8 @@ class AdminServer(object):
 
 	def cmdClearBanList( self, ctx, cmd ):
 		"""Ban a player for a specified timer period from the server with a message."""
-		self.mm.debug( 2, "cmdClearBanList by %s" % ( ctx.getName() ) )
+		if self.mm.isDebugEnabled( 2 ):
+			self.mm.debug( 2, "cmdClearBanList by %s", ctx.getName() )
 		if self.mm.banManager().clearBanList():
 			ctx.write( "Banlist cleared\n" )
 		else:
@@ -1851,7 +2951,8 @@ class AdminServer(object):
 
 	def banPlayer( self, ctx, cmd, wild=False ):
 		"""Ban a player for a specified timer period from the server with a message."""
-		self.mm.debug( 2, "banPlayer '%s' by %s" % ( cmd, ctx.getName() ) )
+		if self.mm.isDebugEnabled( 2 ):
+			self.mm.debug( 2, "banPlayer '%s' by %s", cmd, ctx.getName() )
 
 		( playerid, banPeriod, banReason ) = mm_utils.largs( cmd, None, 3, '' )
 
@@ -1868,7 +2969,8 @@ class AdminServer(object):
 
 	def banPlayerBy( self, ctx, cmd, wild=False ):
 		"""Ban a player for a specified timer period from the server with a message."""
-		self.mm.debug( 2, "banPlayerBy '%s' by %s" % ( cmd, ctx.getName() ) )
+		if self.mm.isDebugEnabled( 2 ):
+			self.mm.debug( 2, "banPlayerBy '%s' by %s", cmd, ctx.getName() )
 
 		( playerid, bannedBy, banPeriod, banReason ) = mm_utils.largs( cmd, None, 4, '' )
 
@@ -1930,27 +3032,265 @@ class AdminServer(object):
 			ctx.write( "Failed to saved config\n" )
 			self.mm.error( "Failed to save config '%s' (%s)" % ( self.mm.configFile(), error ) )
 
+	def cmdStats( self, ctx, cmd ):
+		"""Display the rcon server statistics."""
+		ctx.write( "rcon statistics:\n" )
+		ctx.write( " connections: %d\n" % len( self.__peers ) )
+		ctx.write( " accepted: %d\n" % self.__acceptCount )
+		ctx.write( " frames limited by rconMaxAccepts: %d\n" % self.__acceptCapped )
+
+		queued = 0
+		throttled = 0
+		for peer in self.__peers:
+			queued += peer.outbuf.queued
+			throttled += peer.outbuf.throttleCount
+		ctx.write( " output queued: %d bytes\n" % queued )
+		ctx.write( " output throttled by rconOutputHighWater: %d times\n" % throttled )
+
+		waiting = 0
+		for client in self.__deferred:
+			waiting += len( client.deferred )
+		ctx.write( " rate limited: %d queued, %d rejected, %d waiting\n" % ( self.__rateQueued, self.__rateRejected, waiting ) )
+		for client in self.__clients.values():
+			if client.rateQueued or client.rateRejected:
+				ctx.write( "  %s: %d queued, %d rejected\n" % ( client.getName(), client.rateQueued, client.rateRejected ) )
+
+		subscribers = {}
+		for contexts in self.__subscribers.values():
+			subscribers.update( contexts )
+		ctx.write( " subscribers: %d, dropped for subscribeBacklog: %d\n" % ( len( subscribers ), self.__subscribersDropped ) )
+
+		ctx.write( " connection output:\n" )
+		for peer in self.__peers:
+			ctx.write( "  %s: %s\n" % ( peer.getName(), peer.compressionStats() ) )
+
+	def cmdCompress( self, ctx, cmd ):
+		"""Enable / disable compression of large responses for this connection."""
+		if not ctx.isSocket():
+			ctx.write( "error: compression is only available to tcp clients\n" )
+			return
+
+		arg = cmd.strip().lower()
+		if 'on' == arg:
+			if zlib is None:
+				ctx.write( "error: compression is not available on this server\n" )
+				return
+			ctx.conn.compressThreshold = self.__config['compressThreshold']
+			ctx.conn.compressLevel = self.__config['compressLevel']
+		elif 'off' == arg:
+			ctx.conn.compressThreshold = 0
+		elif arg:
+			ctx.write( "error: usage compress [on|off]\n" )
+			return
+
+		if ctx.conn.compressThreshold:
+			ctx.write( "Compression on ( threshold %d bytes ), %s\n" % ( ctx.conn.compressThreshold, ctx.conn.compressionStats() ) )
+		else:
+			ctx.write( "Compression off, %s\n" % ctx.conn.compressionStats() )
+
+	def cmdSubscribe( self, ctx, cmd ):
+		"""Subscribe to events."""
+		if not ctx.isSocket():
+			ctx.write( "error: events are only available to tcp clients\n" )
+			return
+
+		events = cmd.lower().split()
+		for event in events:
+			if not self.__eventSources.has_key( event ):
+				ctx.write( "error: unknown event '%s'\n" % event )
+				return
+
+		for event in events:
+			if ctx.subscriptions.has_key( event ):
+				continue
+
+			if not self.__subscribers.has_key( event ):
+				# first subscriber start handling the game event
+				self.__subscribers[event] = {}
+				self.__eventSource( event, True )
+			self.__subscribers[event][ctx] = 1
+			ctx.subscriptions[event] = 1
+
+		subscribed = ctx.subscriptions.keys()
+		subscribed.sort()
+		available = self.__eventSources.keys()
+		available.sort()
+		ctx.write( "Subscribed to: %s\n" % ' '.join( subscribed ) )
+		ctx.write( "Available events: %s\n" % ' '.join( available ) )
+
+	def cmdUnsubscribe( self, ctx, cmd ):
+		"""Unsubscribe from events."""
+		events = cmd.lower().split()
+		if not events:
+			events = ctx.subscriptions.keys()
+		self.__unsubscribe( ctx, events )
+
+		subscribed = ctx.subscriptions.keys()
+		subscribed.sort()
+		ctx.write( "Subscribed to: %s\n" % ' '.join( subscribed ) )
+
+	def __unsubscribe( self, ctx, events ):
+		"""Remove the contexts subscriptions to events."""
+		for event in events:
+			if not ctx.subscriptions.has_key( event ):
+				continue
+
+			del ctx.subscriptions[event]
+			del self.__subscribers[event][ctx]
+			if not self.__subscribers[event]:
+				# last subscriber gone stop handling the game event
+				del self.__subscribers[event]
+				self.__eventSource( event, False )
+
+	def __eventSource( self, event, enable ):
+		"""Start or stop handling the game event which provides event."""
+		( name, method ) = self.__eventSources[event]
+		if method is None:
+			return
+
+		try:
+			if name is None:
+				if enable:
+					host.registerGameStatusHandler( method )
+				else:
+					host.unregisterGameStatusHandler( method )
+			elif enable:
+				self.mm.registerHandler( name, method, 1 )
+			else:
+				self.mm.unregisterHandler( name, method )
+		except:
+			self.mm.error( "Rcon failed to update the '%s' event source" % event, True )
+
+	def publishEvent( self, event, *fields ):
+		"""Send an event to the connections subscribed to it.
+
+		Connections which have more than subscribeBacklog bytes of unsent
+		output are disconnected instead.
+		"""
+		if not self.__subscribers.has_key( event ):
+			return
+
+		values = []
+		for field in fields:
+			if field is None:
+				field = ''
+			values.append( str( field ).replace( '\t', ' ' ).replace( '\n', ' ' ) )
+		line = '\x06%s\t%s\n' % ( event, '\t'.join( values ) )
+
+		backlog = self.__config['subscribeBacklog']
+		for ctx in self.__subscribers[event].keys():
+			conn = ctx.conn
+			if conn.socket is None or conn.closing is not None:
+				# closing, removed by the disconnect
+				continue
+
+			if backlog and conn.outbuf.queued + len( line ) > backlog:
+				self.__subscribersDropped += 1
+				self.mm.warn( "Rcon disconnecting %s, its not keeping up with its events" % ctx.getName() )
+				self.__unsubscribe( ctx, ctx.subscriptions.keys() )
+				conn.close( 'subscribeBacklog exceeded' )
+				continue
+
+			conn.enqueue( line )
+
+	def __playerDetails( self, player ):
+		"""Return the index and name of player for an event."""
+		if player is None:
+			return ( -1, '' )
+		try:
+			return ( player.index, player.getName() )
+		except:
+			return ( -1, '' )
+
+	def onEventChat( self, playerid, text, channel, flags ):
+		"""Publish a chat event."""
+		name = ''
+		team = ''
+		if playerid >= 0:
+			player = bf2.playerManager.getPlayerByIndex( playerid )
+			if player is not None:
+				name = player.getName()
+				team = player.getTeam()
+		self.publishEvent( 'chat', playerid, name, team, channel, text )
+
+	def onEventKill( self, victim, attacker, weapon, assists, object ):
+		"""Publish a kill event."""
+		( victim_id, victim_name ) = self.__playerDetails( victim )
+		( attacker_id, attacker_name ) = self.__playerDetails( attacker )
+		weapon_name = ''
+		if weapon is not None:
+			weapon_name = weapon.templateName
+		self.publishEvent( 'kill', victim_id, victim_name, attacker_id, attacker_name, weapon_name )
+
+	def onEventConnect( self, player ):
+		"""Publish a player connect event."""
+		( player_id, name ) = self.__playerDetails( player )
+		try:
+			address = player.getAddress()
+		except:
+			address = ''
+		self.publishEvent( 'connect', player_id, name, address )
+
+	def onEventDisconnect( self, player ):
+		"""Publish a player disconnect event."""
+		( player_id, name ) = self.__playerDetails( player )
+		self.publishEvent( 'disconnect', player_id, name )
+
+	def onEventTeam( self, player, humanHasSpawned ):
+		"""Publish a player team change event."""
+		( player_id, name ) = self.__playerDetails( player )
+		self.publishEvent( 'team', player_id, name, player.getTeam() )
+
+	def onEventStatus( self, status ):
+		"""Publish a game status change event."""
+		self.publishEvent( 'status', status )
+
+	def cmdContexts( self, ctx, cmd ):
+		"""Display the command contexts and their memory use."""
+		now = host.timer_getWallTime()
+		clients = self.__clients.values()
+		ctx.write( "Command contexts: %d active, %d pooled, %d reused, %d swept\n" % ( len( clients ), len( self.__contextPool ), self.__contextsReused, self.__contextsSwept ) )
+
+		total = 0
+		for client in clients:
+			size = client.memoryUsage()
+			total += size
+			ctx.write( " %s: level %d, idle %ds, %d bytes\n" % ( client.getName(), client.authedLevel, now - client.lastUsed, size ) )
+
+		for client in self.__contextPool.values():
+			total += client.memoryUsage()
+		ctx.write( "Total: %d bytes\n" % total )
+
 	def cmdHelp( self, ctx, cmd ):
 		"""Displays list the available commands or displays help on the specified command."""
-		return self.__writeCmdsHelp( ctx, 0, cmd, self.__cmds )
-
-	def __writeCmdsHelp( self, ctx, level, cmd, cmds ):
-		"""Return the list of available commands or help on the specified command."""
+		cmd = cmd.strip()
+		key = ( ctx.authedLevel, ctx.authedAllowed, cmd )
+		if not self.__helpCache.has_key( key ):
+			lines = []
+			self.__writeCmdsHelp( ctx, lines, 0, cmd, self.__cmds )
+			if len( self.__helpCache ) >= self.helpCacheSize:
+				self.__helpCache = {}
+			self.__helpCache[key] = ''.join( lines )
+
+		ctx.write( self.__helpCache[key] )
+
+	def __writeCmdsHelp( self, ctx, lines, level, cmd, cmds ):
+		"""Add the list of available commands or help on the specified command to lines."""
 		( subcmd, remaining ) = mm_utils.lsplit( cmd.strip(), ' ', 2 )
 		if subcmd:
 			# help on a specific command
 			if cmds.has_key( subcmd ):
 				# we know about this command
 				details = cmds[subcmd]
-				self.__writeCmdHelp( ctx, cmd, level, details, 'help' )
+				self.__writeCmdHelp( lines, cmd, level, details, 'help' )
 				# Recurse
-				self.__writeCmdsHelp( ctx, level + 1, remaining, details['subcmds'] )
+				self.__writeCmdsHelp( ctx, lines, level + 1, remaining, details['subcmds'] )
 			else:
-				ctx.write( "Unknown command '%s'\n" % cmd )
+				lines.append( "Unknown command '%s'\n" % cmd )
 		else:
 			# just list the available commands
 			if 0 == level:
-				ctx.write( 'Available commands: (commands marked with a * are restricted on ranked servers)\n' )
+				lines.append( 'Available commands: (commands marked with a * are restricted on ranked servers)\n' )
 			next_level = level + 1
 
 			# sort the commands
@@ -1960,20 +3300,20 @@ class AdminServer(object):
 				details = cmds[cmd]
 				if 0 == details['alias'] and ( 0 == details['level'] or ctx.authedAllowed( ctx, details ) ):
 					# None alias command print it out
-					self.__writeCmdHelp( ctx, cmd, next_level, details, 'desc' )
+					self.__writeCmdHelp( lines, cmd, next_level, details, 'desc' )
 					# Recurse
-					self.__writeCmdsHelp( ctx, next_level, remaining, details['subcmds'] )
+					self.__writeCmdsHelp( ctx, lines, next_level, remaining, details['subcmds'] )
 
-	def __writeCmdHelp( self, ctx, cmd, level, details, want ):
-		"""Return the details about the command and sub commands to the client."""
+	def __writeCmdHelp( self, lines, cmd, level, details, want ):
+		"""Add the details about the command and sub commands to lines."""
 		if details['restricted']:
 			restricted = '*'
 		else:
 			restricted = ''
 		if details['args']:
-			ctx.write( "%s%s%s %s: %s\n" % ( '  ' * level, restricted, cmd, details['args'], details[want] ) )
+			lines.append( "%s%s%s %s: %s\n" % ( '  ' * level, restricted, cmd, details['args'], details[want] ) )
 		else:
-			ctx.write( "%s%s%s: %s\n" % ( '  ' * level, restricted, cmd, details[want] ) )
+			lines.append( "%s%s%s: %s\n" % ( '  ' * level, restricted, cmd, details[want] ) )
 
 	def onGameStatusChanged( self, status ):
 		# TODO: remove __validatedMapList check when unregisterGameStatusHandler is fixed
@@ -1994,6 +3334,7 @@ class AdminServer(object):
 
 				# Set the next level back to what it was
 				host.rcon_invoke( 'maplist.nextLevel %d' % self.__nextLevel )
+				self.mm.rconInvalidate( 'maplist.' )
 
 				# Clear out our internals
 				self.__nextLevel = None
@@ -2003,14 +3344,17 @@ class AdminServer(object):
 		"""Check the maplist is valid"""
 		self.mm.info( "Validating maplist..." )
 		maplist = []
+		edits = []
 		( default_gametype, default_size ) = self.mapDefaults()
-		fixed = False
+		idx = 0
 		for line in host.rcon_invoke( 'maplist.list' ).split( '\n' ):
 			if "" != line:
-				( idx, map_name, gametype, size ) = mm_utils.largs( line, None, 4, '' )
+				( map_idx, map_name, gametype, size ) = mm_utils.largs( line, None, 4, '' )
+				fixed = False
 				if not self.allowMap( map_name ):
 					self.mm.warn( "Map %s can't be used on a ranked server, removing\n" % map_name )
-					fixed = True
+					edits.append( ( idx, None ) )
+					idx += 1
 					continue
 
 				if self.restrictedGametype( gametype ):
@@ -2038,28 +3382,106 @@ class AdminServer(object):
 						size = new_size
 						fixed = True
 
-				maplist.append( [ map_name, gametype, size ] )
+				entry = [ map_name, gametype, size ]
+				maplist.append( entry )
+				if fixed:
+					edits.append( ( idx, entry ) )
+				idx += 1
 
-		if fixed:
-			# apply the changes need to clear and re-add as gametype combinations
-			# are rejected by the server
+		if edits:
+			# apply just the changes, replacing entries by removing and
+			# re-inserting them as gametype combinations cant be changed
 			self.mm.info( 'Fixing / restricting maplist:' )
-			self.maplistClear()
-			for entry in maplist:
-				( map, gametype, size ) = entry
-				if '' == size:
-					size = default_size
-				self.mm.info( 'maplist.append "%s" "%s" %s' % ( map, gametype, size ) )
-				host.rcon_invoke( 'maplist.append "%s" "%s" %s' % ( map, gametype, size ) )
+			restart = self.__applyMaplistEdits( edits, idx, default_size )
+			if restart is None:
+				# the edits didnt apply cleanly so fall back to rebuilding it
+				self.mm.warn( "Maplist edits failed, rebuilding the maplist" )
+				self.maplistClear()
+				for entry in maplist:
+					( map, gametype, size ) = entry
+					if '' == size:
+						size = default_size
+					self.mm.info( 'maplist.append "%s" "%s" %s' % ( map, gametype, size ) )
+					host.rcon_invoke( 'maplist.append "%s" "%s" %s' % ( map, gametype, size ) )
+				restart = True
 
 			host.rcon_invoke( 'maplist.save' )
-			self.mm.warn( "Maplist was altered restarting map" )
-			host.rcon_invoke( 'admin.restartMap' )
+			self.mm.rconInvalidate( 'maplist.' )
+			if restart:
+				self.mm.warn( "Current map was altered restarting map" )
+				host.rcon_invoke( 'admin.restartMap' )
+			else:
+				self.mm.info( "Maplist altered, current map unchanged" )
 		else:
 			self.mm.info( "No maplist changes required" )
 
 		self.__validatedMapList = True
 
+	def __applyMaplistEdits( self, edits, count, default_size ):
+		"""Apply the maplist fixes found by validateMaplist.
+
+		edits is a list of ( index, entry ) in index order where entry is the
+		replacement [ map, gametype, size ] or None to remove the map. They are
+		applied last first so the indexes of the earlier edits are unchanged.
+		Returns True if the current level was changed, False if not and None
+		if the levels couldnt be read or the maplist didnt end up the expected
+		size.
+		"""
+		try:
+			current_idx = int( host.rcon_invoke( 'admin.currentLevel' ).strip() )
+			next_idx = int( host.rcon_invoke( 'admin.nextLevel' ).strip() )
+		except ValueError:
+			return None
+
+		removed = []
+		restart = False
+		edits = edits[:]
+		edits.reverse()
+		for ( idx, entry ) in edits:
+			if idx == current_idx:
+				restart = True
+
+			host.rcon_invoke( 'maplist.remove %d' % idx )
+			if entry is None:
+				self.mm.info( 'maplist.remove %d' % idx )
+				removed.append( idx )
+			else:
+				( map, gametype, size ) = entry
+				if '' == size:
+					size = default_size
+				self.mm.info( 'maplist.insert %d "%s" "%s" %s' % ( idx, map, gametype, size ) )
+				host.rcon_invoke( 'maplist.insert %d "%s" "%s" %s' % ( idx, map, gametype, size ) )
+
+		count -= len( removed )
+		try:
+			if count != int( host.rcon_invoke( 'maplist.mapCount' ).strip() ):
+				return None
+		except ValueError:
+			return None
+
+		if removed:
+			# move the level pointers down past the removed maps, a removed
+			# level being replaced by the one after it
+			removed.sort()
+
+			def newIndex( idx ):
+				before = bisect.bisect_left( removed, idx )
+				if count:
+					return ( idx - before ) % count
+				return 0
+
+			host.rcon_invoke( 'admin.nextLevel %d' % newIndex( next_idx ) )
+
+			tempLevels = []
+			for idx in self.__tempLevels:
+				if idx not in removed:
+					tempLevels.append( newIndex( idx ) )
+			self.__tempLevels = tempLevels
+			if self.__nextLevel is not None:
+				self.__nextLevel = newIndex( self.__nextLevel )
+
+		return restart
+
 	#
 	# Game methods
 	#
@@ -2067,27 +3489,44 @@ class AdminServer(object):
 	def shutdown( self ):
 		"""Shutdown rcon, closing the socket."""
 		self.mm.unregisterUpdates( self.update )
+		self.mm.unregisterHandler( 'RemoteCommand', self.onRemoteCommand )
+		self.mm.unregisterHandler( 'PlayerDisconnect', self.onPlayerDisconnect )
+		self.mm.unregisterHandler( 'ChatMessage', self.onChatMessage )
+		for event in self.__subscribers.keys():
+			self.__eventSource( event, False )
+		self.__subscribers = {}
+		if self.__sweepTimer is not None:
+			self.__sweepTimer.destroy()
+			self.__sweepTimer = None
+		self.__stopNetworkThread()
+
+		# stop listening first so the unix socket is always removed
+		if self.__socket:
+			self.__socket.close()
+			self.__socket = None
+		self.__closeUnixSocket()
+		self.__listeners = []
+
 		for peer in self.__peers:
 			peer.shutdown()
 			self.__disconnectClient( peer )
 		self.__peers = []
 
-		if self.__socket:
-			self.__socket.close()
-			self.__socket = None
-
 		# N.B. onGameStatusChanged is unregisted by itself
 
 	def init( self ):
 		"""Provides default initialisation."""
 		# state for in-game rcon connections
-		host.registerHandler( 'RemoteCommand', self.onRemoteCommand, 1 )
-		host.registerHandler( 'PlayerDisconnect', self.onPlayerDisconnect, 1 )
-		host.registerHandler( 'ChatMessage', self.onChatMessage, 1 )
+		self.mm.registerHandler( 'RemoteCommand', self.onRemoteCommand, 1 )
+		self.mm.registerHandler( 'PlayerDisconnect', self.onPlayerDisconnect, 1 )
+		self.mm.registerHandler( 'ChatMessage', self.onChatMessage, 1 )
 
 		# Register our base handlers
 		host.registerGameStatusHandler( self.onGameStatusChanged )
 
+		self.__sweepTimer = self.mm.createTimer( self.__sweepContexts, self.contextSweepInterval )
+		self.__sweepTimer.setRecurring( self.contextSweepInterval )
+
 class CommandContext( object ):
 	"""Context passed to remote command implementations.
 
@@ -2096,6 +3535,32 @@ class CommandContext( object ):
 	2. in-game client executing 'rcon <command>'.
 	"""
 
+	# __dict__ is only created for modules which add their own attributes
+	__slots__ = (
+		'player',
+		'conn',
+		'logout',
+		'authedLevel',
+		'authedBy',
+		'authedAllowed',
+		'authedChecker',
+		'currentCmd',
+		'currentBaseCmd',
+		'output',
+		'cmdCount',
+		'requestId',
+		'rateBuckets',
+		'deferred',
+		'rateQueued',
+		'rateRejected',
+		'subscriptions',
+		'lastUsed',
+		'__dict__',
+	)
+
+	# The estimated size of an empty dict
+	dictSize = 140
+
 	def __init__( self, client ):
 		if isinstance( client, ( int, long ) ):
 			self.player = client
@@ -2105,6 +3570,13 @@ class CommandContext( object ):
 			self.conn = client
 		else:
 			raise TypeError( "client must be either player index or AdminConnection not '%s'" % type( client ) )
+		self.reset()
+
+	def reset( self ):
+		"""Return the context to its unauthed state ready for reuse."""
+		# deleting rather than clearing drops any module attributes without
+		# creating the dict for contexts which never had one
+		del self.__dict__
 		self.logout = False
 		self.authedLevel = 0
 		self.authedBy = None
@@ -2114,13 +3586,37 @@ class CommandContext( object ):
 		self.currentBaseCmd = ''
 		self.output = []
 		self.cmdCount = 0
-
-	def notAllowed( self, ctx, details ):
+		self.requestId = None
+		self.rateBuckets = None
+		self.deferred = []
+		self.rateQueued = 0
+		self.rateRejected = 0
+		self.subscriptions = {}
+		self.lastUsed = 0
+
+	def notAllowed( ctx, details ):
 		"""Default allowed handler.
 
 		Checks to see if the user is allowed to use the method.
+		N.B. static so the context doesnt reference itself.
 		"""
 		return False
+	notAllowed = staticmethod( notAllowed )
+
+	def memoryUsage( self ):
+		"""Return an estimate of the bytes used by the context."""
+		size = 4 * len( self.__slots__ ) + 16
+		for text in self.output:
+			size += len( text )
+		size += 64 * ( len( self.deferred ) + len( self.subscriptions ) )
+
+		# reading __dict__ creates it so drop it again if it is empty
+		attrs = self.__dict__
+		if attrs:
+			size += self.dictSize + 64 * len( attrs )
+		else:
+			del self.__dict__
+		return size
 
 	def isInGame(self):
 		"""Return if the client is an in-game player."""
@@ -2153,7 +3649,7 @@ class CommandContext( object ):
 	def getName( self ):
 		"""Return a descriptive name for this context."""
 		if self.conn is not None:
-			return 'tcp: %s:%d' % ( self.conn.addr[0], self.conn.addr[1] )
+			return self.conn.getName()
 		else:
 			if self.player == -1:
 				return '-1 (local server console)'
@@ -2179,10 +3675,16 @@ class CommandContext( object ):
 		# clear the contexts output
 		self.output = []
 		if self.isSocket():
-			if interactive:
-				self.conn.outbuf.enqueue( feedback )
+			if self.conn.compressThreshold and len( feedback ) >= self.conn.compressThreshold:
+				feedback = self.conn.compress( feedback )
+			if self.requestId is not None:
+				# tagged response
+				self.conn.enqueue( '\x03%s %d\n%s' % ( self.requestId, len( feedback ), feedback ) )
+				self.requestId = None
+			elif interactive:
+				self.conn.enqueue( feedback )
 			else:
-				self.conn.outbuf.enqueue( feedback + '\x04' )
+				self.conn.enqueue( feedback + '\x04' )
 		else:
 			host.rcon_feedback( self.player, feedback )
 
@@ -2190,63 +3692,277 @@ class OutputBuffer(object):
 	"""A stateful output buffer.
 
 	This knows how to enqueue data and ship it out without blocking.
+
+	Chunks are consumed from head so nothing is shifted as they are sent,
+	small chunks are coalesced into a single send and partial sends
+	continue from a buffer into the chunk rather than a copy of its tail.
 	"""
 
-	def __init__( self, modManager, socket, allowBatching ):
+	# The most bytes coalesced into a single send
+	coalesceSize = 65536
+
+	def __init__( self, modManager, socket, allowBatching, highWater=0 ):
 		self.mm = modManager
 		self.allowBatching = allowBatching
 		self.socket = socket
 		self.data = []
+		self.head = 0
 		self.index = 0
+		self.queued = 0
+		self.sent = 0
+		self.highWater = highWater
+		self.throttled = False
+		self.throttleCount = 0
 
 	def enqueue(self, str):
+		if not str:
+			return
 		try:
 			self.data.append(str)
+			self.queued += len( str )
 		except Exception, e:
 			self.mm.error( "Failed to enqueue '%s' (%s)" % ( str, e ), True )
+			return
+
+		if self.highWater and not self.throttled and self.queued >= self.highWater:
+			self.throttled = True
+			self.throttleCount += 1
+
+	def pending( self ):
+		"""Return True if there is data waiting to be sent."""
+		return 0 != self.queued
+
+	def full( self ):
+		"""Return True if no more output should be produced until the client catches up."""
+		return self.throttled
+
+	def __coalesce( self ):
+		"""Join the small chunks at the head into one."""
+		data = self.data
+		end = self.head
+		size = 0
+		while end < len( data ) and size + len( data[end] ) <= self.coalesceSize:
+			size += len( data[end] )
+			end += 1
+
+		if end - self.head > 1:
+			# replace the last joined chunk and skip the rest
+			data[end - 1] = ''.join( data[self.head:end] )
+			for i in xrange( self.head, end - 1 ):
+				data[i] = None
+			self.head = end - 1
 
 	def update(self):
-		while len(self.data) > 0:
+		data = self.data
+		while self.head < len( data ):
+			if not self.index and self.head + 1 < len( data ):
+				self.__coalesce()
+			item = data[self.head]
 			try:
-				item = self.data[0]
-				scount = self.socket.send(item[self.index:])
-				self.index += scount
-				if self.index == len(item):
-					del self.data[0]
-					self.index = 0
+				if self.index:
+					scount = self.socket.send( buffer( item, self.index ) )
+				else:
+					scount = self.socket.send( item )
 			except socket.error, detail:
 				if detail[0] != errno.EWOULDBLOCK:
 					self.mm.error( "Failed to send", True )
 					return detail[1]
+				# the socket buffer is full
+				break
+
+			self.index += scount
+			self.queued -= scount
+			self.sent += scount
+			if self.index == len( item ):
+				data[self.head] = None
+				self.head += 1
+				self.index = 0
 			if not self.allowBatching:
 				break
+
+		# drop the sent chunks
+		if self.head == len( data ):
+			self.data = []
+			self.head = 0
+		elif self.head > 64 and self.head * 2 > len( data ):
+			self.data = data[self.head:]
+			self.head = 0
+
+		if self.throttled and self.queued <= self.highWater / 2:
+			self.throttled = False
+
 		return None
 
+class LineReader(object):
+	"""Splits the data received from a connection into lines.
+
+	Each chunk is scanned once as it arrives, complete lines being queued
+	and only the trailing partial line being kept, so the cost is linear
+	in the amount of data received however many lines are batched.
+	"""
+
+	def __init__( self, maxPartial ):
+		self.maxPartial = maxPartial
+		self.partial = []
+		self.partialLen = 0
+		self.lines = []
+		self.head = 0
+
+	def feed( self, data ):
+		"""Add received data.
+
+		Returns an error if a partial line exceeds maxPartial.
+		"""
+		lines = data.split( '\n' )
+		# the last entry is the start of the next line
+		tail = lines.pop()
+		if lines:
+			if self.partial:
+				self.partial.append( lines[0] )
+				lines[0] = ''.join( self.partial )
+				self.partial = []
+				self.partialLen = 0
+			self.lines.extend( lines )
+
+		if tail:
+			self.partial.append( tail )
+			self.partialLen += len( tail )
+			if self.partialLen > self.maxPartial:
+				return 'data format error: no newline in message'
+
+		return None
+
+	def pending( self ):
+		"""Return True if there are complete lines waiting."""
+		return self.head < len( self.lines )
+
+	def next( self ):
+		"""Return the next complete line or None if there isnt one."""
+		if self.head == len( self.lines ):
+			return None
+
+		line = self.lines[self.head]
+		self.head += 1
+		if self.head == len( self.lines ):
+			self.lines = []
+			self.head = 0
+		return line
+
+class EventLog(object):
+	"""Logs for the network thread by passing the messages to the game thread.
+
+	ModManager logging may call the engine so it is only done by the game
+	thread, messages are formatted here and logged by AdminServer.update.
+	"""
+
+	def __init__( self, modManager, post ):
+		self.mm = modManager
+		self.post = post
+
+	def isDebugEnabled( self, level ):
+		return self.mm.isDebugEnabled( level )
+
+	def debug( self, level, msg, *args ):
+		if self.mm.isDebugEnabled( level ):
+			if args:
+				msg = msg % args
+			self.post( 'debug', level, msg )
+
+	def info( self, msg, *args ):
+		if args:
+			msg = msg % args
+		self.post( 'info', msg )
+
+	def warn( self, msg, *args ):
+		if args:
+			msg = msg % args
+		self.post( 'warn', msg )
+
+	def error( self, msg, traceback=False ):
+		self.post( 'error', msg )
+		if traceback:
+			# the exception is only known to this thread
+			self.post( 'error', self.mm.exceptionString() )
+
 class AdminConnection(object):
 	"""Each TCP connection is represented by an object of this class."""
 
-	def __init__( self, srv, socket, addr, game ):
+	# The most bytes read from the socket in one go
+	recvSize = 16384
+
+	# The longest partial command allowed
+	maxPartial = 128
+
+	def __init__( self, srv, socket, addr, game, local=False ):
+		# in threaded mode output from the game thread is passed via outbox
+		# and close requests via closing, posted and ran count the commands
+		# passed to the game thread and run by it
+		self.threaded = srv.isThreaded()
+		self.outbox = []
+		self.closing = None
+		self.posted = 0
+		self.ran = 0
+
 		# convenience vars
 		self.allowBatching = srv.allowBatching()
-		self.mm = srv.mm
+		if self.threaded:
+			# the network thread must not log through the engine
+			self.mm = srv.eventLog()
+			self.maxBacklog = srv.threadedBacklog()
+		else:
+			self.mm = srv.mm
+			self.maxBacklog = 0
 
 		self.server = srv
 		self.socket = socket
 		self.addr = addr
 		self.socket.setblocking( 0 )
-		self.buffer = ''
-		self.seed = self.make_seed( 16 )
-		self.basicDigest = self.digest( srv.rconBasicPassword() )
-		self.superDigest = self.digest( srv.rconSuperPassword() )
-		self.outbuf = OutputBuffer( self.mm, self.socket, self.allowBatching )
+		self.reader = LineReader( self.maxPartial )
+
+		# unix domain connections are authed by the socket permissions so
+		# dont need a seed or digests
+		self.local = local
+		if local:
+			self.seed = None
+			self.basicDigest = None
+			self.superDigest = None
+		else:
+			self.seed = self.make_seed( 16 )
+			self.basicDigest = self.digest( srv.rconBasicPassword() )
+			self.superDigest = self.digest( srv.rconSuperPassword() )
+		self.outbuf = OutputBuffer( self.mm, self.socket, self.allowBatching, srv.outputHighWater() )
+
+		# set once the client has negotiated the tagged protocol
+		self.tagged = False
 
-		self.mm.debug( 1, 'new rcon/admin connection from %s:%d' % ( addr[0], addr[1] ) )
+		# compression, enabled by the client
+		self.compressThreshold = 0
+		self.compressLevel = 6
+		self.compressCount = 0
+		self.compressIn = 0
+		self.compressOut = 0
+		self.compressTime = 0.0
+
+		self.mm.debug( 1, 'new rcon/admin connection from %s', self.getName() )
 
 		# Welcome message *must* end with \n\n
 		self.outbuf.enqueue('### %s ModManager Rcon v%s.\n' % ( game, __version__ ) )
-		self.outbuf.enqueue('### Digest seed: %s\n' % (self.seed))
+		if local:
+			self.outbuf.enqueue('### Authenticated at level %d by socket permissions\n' % srv.unixAuthLevel() )
+		else:
+			self.outbuf.enqueue('### Digest seed: %s\n' % (self.seed))
 		self.outbuf.enqueue('\n') # terminate welcome message with extra LF
 
+	def getName( self ):
+		"""Return a descriptive name for this connection."""
+		if self.local:
+			return 'unix: %s:%d' % ( self.addr[0], self.addr[1] )
+		return 'tcp: %s:%d' % ( self.addr[0], self.addr[1] )
+
+	def backlogged( self ):
+		"""Return True if too many commands are waiting for the game thread."""
+		return self.maxBacklog and self.posted - self.ran >= self.maxBacklog
+
 	def make_seed( self, seed_length ):
 		"""Returns a seed string of random characters.
 
@@ -2267,29 +3983,41 @@ class AdminConnection(object):
 		m.update( password )
 		return m.hexdigest()
 
-	def update( self ):
+	def update( self, readable=True, writable=True ):
+		"""Process incoming commands and send any pending output.
+
+		readable and writable indicate the sockets readiness as reported by
+		select, no recv is attempted if the socket isnt ready. Output queued
+		during the update is sent straight away rather than waiting for the
+		next select.
+		"""
 		if not self.socket:
 			# socket already closed e.g. DOS protection
 			return 0
 
+		# output already waiting when select ran is only sent once its writable
+		waiting = self.outbuf.pending()
+		if self.threaded:
+			self.pump()
+			if self.closing is not None:
+				# the game thread closed us, send what we can first
+				self.outbuf.update()
+				self.__close( self.closing )
+				return 0
+
 		err = None
-		# Process incoming requests
+		# Process incoming requests, stopping while the client isnt reading its output
 		try:
-			while not err:
-				data = self.socket.recv(1024)
+			if self.reader.pending():
+				# commands left over from a previous update
+				self.__processLines()
+
+			# only read more once the queued commands have been run
+			while readable and not self.outbuf.full() and not self.reader.pending():
+				data = self.socket.recv( self.recvSize )
 				if data:
-					self.buffer += data
-					while not err:
-						nlpos = self.buffer.find('\n')
-						if nlpos != -1:
-							self.server.onRemoteCommand( self, self.buffer[0:nlpos] )
-							self.buffer = self.buffer[nlpos+1:] # keep rest of buffer
-						else:
-							if len(self.buffer) > 128:
-								err = 'data format error: no newline in message'
-							break
-						if not self.allowBatching:
-							break
+					err = self.reader.feed( data )
+					self.__processLines()
 				else:
 					err = 'peer disconnected'
 
@@ -2297,7 +4025,8 @@ class AdminConnection(object):
 					# socket already closed e.g. DOS protection
 					return 0
 
-				if not self.allowBatching:
+				if err or not self.allowBatching or len( data ) < self.recvSize:
+					# a short read means theres nothing more to read yet
 					break
 
 		except socket.error, detail:
@@ -2307,28 +4036,89 @@ class AdminConnection(object):
 					# only print error if the client didnt disconnect
 					self.mm.error( "rcon: update failed %s" % detail )
 
-		if not err:
+		if not err and ( writable or ( not waiting and self.outbuf.pending() ) ):
 			# Send any output
 			err = self.outbuf.update()
 
 		if err:
-			self.close( err )
+			self.__close( err )
 			return 0
 
 		return 1
 
+	def enqueue( self, data ):
+		"""Queue data to be sent to the client."""
+		if self.threaded:
+			self.outbox.append( data )
+			self.server.wakeNetwork()
+		else:
+			self.outbuf.enqueue( data )
+
+	def compress( self, data ):
+		"""Return the compressed frame for data."""
+		start = timer()
+		packed = zlib.compress( data, self.compressLevel )
+		self.compressTime += timer() - start
+		self.compressCount += 1
+		self.compressIn += len( data )
+		self.compressOut += len( packed )
+		return '\x05%d %d\n%s' % ( len( packed ), len( data ), packed )
+
+	def compressionStats( self ):
+		"""Return a description of the data sent and the compression."""
+		stats = "%d bytes sent" % self.outbuf.sent
+		if self.compressCount:
+			stats += ", %d responses compressed from %d to %d bytes ( %.1f%% ) in %.1fms" % ( self.compressCount, self.compressIn, self.compressOut, self.compressOut * 100.0 / self.compressIn, self.compressTime * 1000 )
+		return stats
+
+	def pump( self ):
+		"""Move the output queued by the game thread to the output buffer."""
+		count = len( self.outbox )
+		if count:
+			for data in self.outbox[:count]:
+				self.outbuf.enqueue( data )
+			del self.outbox[:count]
+
+	def __processLines( self ):
+		"""Run the complete commands received."""
+		while self.socket and not self.outbuf.full() and not self.backlogged():
+			line = self.reader.next()
+			if line is None:
+				break
+			self.server.dispatchCommand( self, line )
+			if not self.allowBatching:
+				break
+
 	def flush( self ):
 		"""Flush any remaining output."""
+		if self.threaded:
+			# sent by the network thread
+			self.server.wakeNetwork()
+			return 1
+
 		err = self.outbuf.update()
 
 		if err:
-			self.close( err )
+			self.__close( err )
 			return 0
 
 		return 1
 
 	def close( self, err = 'unknown' ):
-		self.mm.debug( 1, 'rcon: closing %s:%d (%s)' % ( self.addr[0], self.addr[1], err ) )
+		"""Close the connection.
+
+		In threaded mode the network thread is asked to close it.
+		"""
+		if self.threaded:
+			if self.closing is None:
+				self.closing = err
+				self.server.wakeNetwork()
+			return 1
+
+		return self.__close( err )
+
+	def __close( self, err ):
+		self.mm.debug( 1, 'rcon: closing %s:%d (%s)', self.addr[0], self.addr[1], err )
 		# ensure we close down as best we can
 		if self.socket is not None:
 			try:
@@ -43,6 +43,9 @@ This module is very much still '''BETA''' due to some missing functionality in t
 * The private password is currently only effective on none ranked servers
 
 ===== History =====
+ v0.9 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
  v0.8 - 12/10/2011:
  Added BFP4F Support
 
@@ -77,10 +80,10 @@ import bf2
 import host
 import mm_utils
 
-__version__ = 0.8
+__version__ = 0.9
 
 __required_modules__ = {
-	'modmanager': 1.6
+	'modmanager': 2.6
 }
 
 __supports_reload__ = True
@@ -303,10 +306,9 @@ class Reserver( object ):
 
 		# Register your game handlers and provide any
 		# other dynamic initialisation here
-		if 0 == self.__state:
-			host.registerHandler( 'PlayerSpawn', self.onPlayerSpawn, 1 )
-			host.registerHandler( 'PlayerConnect', self.onPlayerConnect, 1 )
-			host.registerHandler( 'PlayerDisconnect', self.onPlayerDisconnect, 1 )
+		self.mm.registerHandler( 'PlayerSpawn', self.onPlayerSpawn, 1 )
+		self.mm.registerHandler( 'PlayerConnect', self.onPlayerConnect, 1 )
+		self.mm.registerHandler( 'PlayerDisconnect', self.onPlayerDisconnect, 1 )
 
 		# Register our rcon command handlers
 		self.mm.registerRconCmdHandler( 'reserver', { 'method': self.cmdExec, 'subcmds': self.__cmds, 'level': 1 } )
@@ -321,9 +323,11 @@ class Reserver( object ):
 		# other actions to ensure your module no longer affects
 		# the game in anyway
 		self.mm.unregisterRconCmdHandler( 'reserver' )
+		self.mm.unregisterHandler( 'PlayerSpawn', self.onPlayerSpawn )
+		self.mm.unregisterHandler( 'PlayerConnect', self.onPlayerConnect )
+		self.mm.unregisterHandler( 'PlayerDisconnect', self.onPlayerDisconnect )
 
-		# Flag as shutdown as there is currently way to:
-		# host.unregisterHandler
+		# Flag as shutdown
 		self.__state = 2
 
 def mm_load( modManager ):
@@ -11,6 +11,9 @@ This is a Sample ModManager module
  mm_sample.myOption2 "hello there"
 
 ===== History =====
+ v1.5 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
  v1.4 - 12/10/2011:
  Added BFP4F Support
 
@@ -35,11 +38,11 @@ import host
 import mm_utils
 
 # Set the version of your module here
-__version__ = 1.4
+__version__ = 1.5
 
 # Set the required module versions here
 __required_modules__ = {
-	'modmanager': 1.6
+	'modmanager': 2.6
 }
 
 # Does this module support reload ( are all its reference closed on shutdown? )
@@ -113,9 +116,8 @@ class MyModule( object ):
 		# Register your game handlers and provide any
 		# other dynamic initialisation here
 
-		if 0 == self.__state:
-			# Register your host handlers here
-			host.registerHandler( 'PlayerSpawn', self.onPlayerSpawn, 1 )
+		# Register your host handlers here
+		self.mm.registerHandler( 'PlayerSpawn', self.onPlayerSpawn, 1 )
 
 		# Register our rcon command handlers
 		self.mm.registerRconCmdHandler( 'sample', { 'method': self.cmdExec, 'subcmds': self.__cmds, 'level': 1 } )
@@ -130,9 +132,9 @@ class MyModule( object ):
 		# other actions to ensure your module no longer affects
 		# the game in anyway
 		self.mm.unregisterRconCmdHandler( 'sample' )
+		self.mm.unregisterHandler( 'PlayerSpawn', self.onPlayerSpawn )
 
-		# Flag as shutdown as there is currently way to:
-		# host.unregisterHandler
+		# Flag as shutdown
 		self.__state = 2
 
 	def update( self ):
@@ -32,6 +32,12 @@ This is a team kill ModManager module
  mm_tk_punish.bannedBy "ModManager Team Kill Punisher"
 
 ===== History =====
+ v2.5 - 18/10/2026:
+ Now uses modmanager.registerHandler so game handlers are removed on shutdown hence requires MM v2.6
+
+ v2.4 - 18/10/2026:
+ The update timer now uses the ModManager timer heap hence requires MM v2.5
+
  v2.3 - 12/10/2011:
  Added BFP4F Support
 
@@ -85,10 +91,10 @@ import host
 import mm_utils
 import bf2.stats.constants
 
-__version__ = 2.3
+__version__ = 2.5
 
 __required_modules__ = {
-	'modmanager': 1.6
+	'modmanager': 2.6
 }
 
 __supports_reload__ = True
@@ -140,7 +146,7 @@ class Punisher( object ):
 			return False
 		else:
 			if not self.updateTimer:
-				self.updateTimer = bf2.Timer( self.onUpdate, 10, 1 )
+				self.updateTimer = self.mm.createTimer( self.onUpdate, 10 )
 				self.updateTimer.setRecurring( 10 )
 
 			return True
@@ -341,10 +347,9 @@ class Punisher( object ):
 		# Register our base handlers
 		host.registerGameStatusHandler( self.onGameStatusChanged )
 
-		if 0 == self.__state:
-			host.registerHandler( 'PlayerConnect', self.onPlayerConnect, 1 )
-			host.registerHandler( 'PlayerKilled', self.onPlayerKilled )
-			host.registerHandler( 'ClientCommand', self.onClientCommand )
+		self.mm.registerHandler( 'PlayerConnect', self.onPlayerConnect, 1 )
+		self.mm.registerHandler( 'PlayerKilled', self.onPlayerKilled )
+		self.mm.registerHandler( 'ClientCommand', self.onClientCommand )
 
 		# Connect already connected players if reinitializing
 		for p in bf2.playerManager.getPlayers():
@@ -358,12 +363,15 @@ class Punisher( object ):
 
 		# Unregister our game handlers
 		host.unregisterGameStatusHandler( self.onGameStatusChanged )
+		self.mm.unregisterHandler( 'PlayerConnect', self.onPlayerConnect )
+		self.mm.unregisterHandler( 'PlayerKilled', self.onPlayerKilled )
+		self.mm.unregisterHandler( 'ClientCommand', self.onClientCommand )
 
 		if self.updateTimer:
 			self.updateTimer.destroy()
 			self.updateTimer = None
 
-		# Flag as shutdown as there is currently way to do this
+		# Flag as shutdown
 		self.__state = 2
 
 def mm_load( modManager ):
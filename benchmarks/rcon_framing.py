@@ -0,0 +1,150 @@
+# vim: ts=4 sw=4 noexpandtab
+"""Rcon line framing benchmark.
+
+Pipes a batch of commands through a single mm_rcon AdminConnection and
+times how long it takes for them all to be framed and dispatched. The
+framing is also timed on its own against the previous buffer reslicing
+implementation.
+
+Usage: python benchmarks/rcon_framing.py [commands]
+
+The game server modules host and bf2 are only needed by mm_rcon at import
+time so empty placeholders are used.
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+import imp
+
+root = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+sys.path.insert( 0, os.path.join( root, 'admin' ) )
+sys.path.insert( 0, os.path.join( root, 'admin', 'modules' ) )
+
+for name in ( 'host', 'bf2' ):
+	if not sys.modules.has_key( name ):
+		sys.modules[name] = imp.new_module( name )
+
+import mm_rcon
+
+class BenchManager:
+	"""The ModManager methods used by AdminConnection."""
+	def debug( self, level, msg, *args ):
+		pass
+
+	def error( self, msg, traceback=False ):
+		sys.stderr.write( "%s\n" % msg )
+
+class BenchServer:
+	"""The AdminServer methods used by AdminConnection."""
+	def __init__( self ):
+		self.mm = BenchManager()
+		self.commands = 0
+
+	def allowBatching( self ):
+		return 1
+
+	def outputHighWater( self ):
+		return 0
+
+	def rconBasicPassword( self ):
+		return ''
+
+	def rconSuperPassword( self ):
+		return ''
+
+	def isThreaded( self ):
+		return 0
+
+	def dispatchCommand( self, peer, cmd ):
+		self.onRemoteCommand( peer, cmd )
+
+	def onRemoteCommand( self, client, cmd ):
+		self.commands += 1
+
+def legacyFraming( chunks ):
+	"""The framing used before LineReader, returns the number of lines."""
+	lines = 0
+	buffer = ''
+	for data in chunks:
+		buffer += data
+		while 1:
+			nlpos = buffer.find( '\n' )
+			if nlpos == -1:
+				break
+			cmd = buffer[0:nlpos]
+			buffer = buffer[nlpos+1:]
+			lines += 1
+	return lines
+
+def readerFraming( chunks ):
+	"""The framing used by AdminConnection, returns the number of lines."""
+	lines = 0
+	reader = mm_rcon.LineReader( mm_rcon.AdminConnection.maxPartial )
+	for data in chunks:
+		reader.feed( data )
+		while reader.next() is not None:
+			lines += 1
+	return lines
+
+def timeFraming( name, method, chunks, count ):
+	start = time.time()
+	lines = method( chunks )
+	elapsed = time.time() - start
+	if lines != count:
+		raise RuntimeError( "%s framed %d of %d lines" % ( name, lines, count ) )
+	print "%-10s %8.1fms %10.0f lines/s" % ( name, elapsed * 1000, count / max( elapsed, 1e-9 ) )
+
+def timeConnection( payload, count ):
+	"""Send payload to an AdminConnection and time until count commands are dispatched."""
+	( client, server ) = socket.socketpair()
+	srv = BenchServer()
+	conn = mm_rcon.AdminConnection( srv, server, ( 'bench', 0 ), 'Benchmark' )
+
+	sender = threading.Thread( target=client.sendall, args=( payload, ) )
+	start = time.time()
+	sender.start()
+	updates = 0
+	while srv.commands < count:
+		if not conn.update():
+			raise RuntimeError( "connection closed after %d commands" % srv.commands )
+		updates += 1
+	elapsed = time.time() - start
+	sender.join()
+	conn.close( 'done' )
+	client.close()
+
+	print "%-10s %8.1fms %10.0f cmds/s ( %d updates )" % ( 'connection', elapsed * 1000, count / max( elapsed, 1e-9 ), updates )
+
+def split( payload, size ):
+	"""Split payload into chunks of size bytes."""
+	chunks = []
+	for i in xrange( 0, len( payload ), size ):
+		chunks.append( payload[i:i + size] )
+	return chunks
+
+def main():
+	count = 10000
+	if len( sys.argv ) > 1:
+		count = int( sys.argv[1] )
+
+	payload = '\x02bf2cc si\n' * count
+
+	print "Framing %d commands ( %d bytes )" % ( count, len( payload ) )
+
+	# split as each would receive it
+	chunks = split( payload, 1024 )
+	timeFraming( 'legacy', legacyFraming, chunks, count )
+	chunks = split( payload, mm_rcon.AdminConnection.recvSize )
+	timeFraming( 'linereader', readerFraming, chunks, count )
+
+	# the whole batch arriving at once is the worst case for reslicing
+	timeFraming( 'legacy x1', legacyFraming, [ payload ], count )
+	timeFraming( 'reader x1', readerFraming, [ payload ], count )
+
+	timeConnection( payload, count )
+
+if __name__ == '__main__':
+	main()
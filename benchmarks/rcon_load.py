@@ -0,0 +1,533 @@
+# vim: ts=4 sw=4 noexpandtab
+"""Rcon load generator and throughput benchmark.
+
+Runs ModManager with mm_rcon, mm_bf2cc and mm_banmanager against stub host
+and bf2 modules, then connects an increasing number of local TCP clients.
+Each client logs in with the seeded MD5 digest and replays a mix of
+commands at a target rate. For each connection count the commands per
+second, the p50 / p99 command latency and the cost of each update() frame
+are reported.
+
+Usage: python benchmarks/rcon_load.py [options] [connections ...]
+
+  -r rate      commands per second sent by each client, 0 sends the next
+               command as soon as the previous response arrives ( default 2 )
+  -d seconds   how long to measure each connection count ( default 5 )
+  -f fps       update() calls per second, 0 for a busy loop ( default 100 )
+  -p players   number of fake players on the server ( default 32 )
+  -b bans      number of bans in the ban list ( default 100 )
+  -m mix       comma separated commands to replay
+               ( default "bf2cc pl,bf2cc si,exec admin.listPlayers,bm listBans" )
+  -t           use rconThreaded
+
+  connections  the connection counts to measure ( default 1 10 50 100 250 500 )
+
+The clients run in a child process so they don't share the interpreter
+with the server being measured, the server side runs the update() frames
+in the main thread just as the game would. The engine is stubbed so
+rcon_invoke returns canned output instantly and only the ModManager side
+of each command is measured.
+
+Both processes use select so each connection count must stay below the
+platforms select limit ( 1024 on Linux, 512 on Windows ).
+"""
+
+import os
+import sys
+import time
+import socket
+import select
+import threading
+import getopt
+import tempfile
+import shutil
+import random
+import imp
+import md5
+
+root = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+script = os.path.abspath( __file__ )
+
+password = 'benchmark'
+mapList = [ 'strike_at_karkand', 'sharqi_peninsula', 'gulf_of_oman', 'dalian_plant' ]
+
+#
+# Load generator, run in the child process
+#
+
+class LoadClient:
+	"""A rcon client which sends a command each time it is due."""
+	def __init__( self, sock, commands, interval, due ):
+		self.sock = sock
+		self.commands = commands
+		self.interval = interval
+		self.due = due
+		self.buffer = ''
+		self.authed = 0
+		self.sent = None
+		self.latencies = []
+
+	def fileno( self ):
+		return self.sock.fileno()
+
+	def receive( self, now ):
+		"""Read the waiting data, returns False if the connection closed."""
+		data = self.sock.recv( 65536 )
+		if not data:
+			return False
+		self.buffer += data
+
+		if not self.authed:
+			if -1 == self.buffer.find( '\n\n' ):
+				return True
+			seed = self.buffer.split( 'Digest seed: ' )[1].split( '\n' )[0]
+			self.buffer = ''
+			self.authed = -1
+			self.sock.sendall( '\x02login %s\n' % md5.new( seed + password ).hexdigest() )
+			return True
+
+		while 1:
+			end = self.buffer.find( '\x04' )
+			if -1 == end:
+				break
+			response = self.buffer[:end]
+			self.buffer = self.buffer[end + 1:]
+			if -1 == self.authed:
+				if -1 == response.find( 'Authentication successful' ):
+					raise RuntimeError( "login failed: %s" % response.strip() )
+				self.authed = 1
+			elif self.sent is not None:
+				self.latencies.append( now - self.sent )
+				self.sent = None
+		return True
+
+	def send( self, now ):
+		"""Send the next command if one is due."""
+		if self.sent is not None or now < self.due:
+			return
+		cmd = self.commands[0]
+		self.commands.append( self.commands.pop( 0 ) )
+		self.sent = now
+		self.due = max( self.due + self.interval, now )
+		self.sock.sendall( '\x02%s\n' % cmd )
+
+def percentile( values, fraction ):
+	"""Return the value at fraction of the sorted values."""
+	if not values:
+		return 0.0
+	return values[min( len( values ) - 1, int( len( values ) * fraction ) )]
+
+def runClients( port, count, rate, duration, mix ):
+	"""Connect count clients, replay the mix for duration and report the latencies."""
+	interval = 0.0
+	if rate:
+		interval = 1.0 / rate
+
+	clients = []
+	for i in xrange( count ):
+		sock = socket.socket( socket.AF_INET, socket.SOCK_STREAM )
+		sock.connect( ( '127.0.0.1', port ) )
+		sock.setblocking( 0 )
+		# start each client at a different point in the mix
+		commands = mix[i % len( mix ):] + mix[:i % len( mix )]
+		clients.append( LoadClient( sock, commands, interval, 0 ) )
+
+	# log in
+	waiting = clients[:]
+	deadline = time.time() + 30 + count * 0.1
+	while waiting:
+		if time.time() > deadline:
+			raise RuntimeError( "%d clients failed to log in" % len( waiting ) )
+		( rlist, wlist, xlist ) = select.select( waiting, [], [], 0.5 )
+		for client in rlist:
+			if not client.receive( time.time() ):
+				raise RuntimeError( "connection closed while logging in" )
+			if 1 == client.authed:
+				waiting.remove( client )
+
+	print "ready"
+	sys.stdout.flush()
+
+	start = time.time()
+	end = start + duration
+	for client in clients:
+		client.due = start + random.random() * interval
+
+	now = start
+	while now < end:
+		timeout = end - now
+		for client in clients:
+			client.send( now )
+			if client.sent is None:
+				timeout = min( timeout, client.due - now )
+		( rlist, wlist, xlist ) = select.select( clients, [], [], max( timeout, 0 ) )
+		now = time.time()
+		for client in rlist:
+			if not client.receive( now ):
+				raise RuntimeError( "connection closed" )
+	elapsed = time.time() - start
+
+	latencies = []
+	for client in clients:
+		latencies.extend( client.latencies )
+		client.sock.close()
+	latencies.sort()
+
+	print "result %d %f %f %f %f" % ( len( latencies ), elapsed, percentile( latencies, 0.5 ), percentile( latencies, 0.99 ), percentile( latencies, 1.0 ) )
+	sys.stdout.flush()
+
+#
+# Server, run in the parent process
+#
+
+class Stub( object ):
+	"""An engine object whose unknown methods all return 0."""
+	def __init__( self, **attrs ):
+		self.__dict__.update( attrs )
+
+	def __getattr__( self, name ):
+		if name.startswith( '__' ):
+			raise AttributeError( name )
+		return zero
+
+def zero( *args ):
+	return 0
+
+class Score( object ):
+	"""Player score, every field is 0."""
+	def __getattr__( self, name ):
+		if name.startswith( '__' ):
+			raise AttributeError( name )
+		return 0
+
+class KickerInfo:
+	"""The mm_kicker player details used by bf2cc pl."""
+	def __init__( self ):
+		self.connectedAt = time.time()
+		self.idleTime = 0
+
+	def safePos( self ):
+		return ( 0.0, 0.0, 0.0 )
+
+class Player( Stub ):
+	"""A connected player."""
+	def __init__( self, index ):
+		Stub.__init__( self, index=index, score=Score(), mmKickerInfo=KickerInfo(), mmCdKeyHash='%032x' % index )
+
+	def getName( self ):
+		return 'Player%d' % self.index
+
+	def getAddress( self ):
+		return '10.0.%d.%d' % ( self.index / 256, self.index % 256 )
+
+	def getTeam( self ):
+		return 1 + self.index % 2
+
+	def isConnected( self ):
+		return 1
+
+	def isValid( self ):
+		return 1
+
+	def isRemote( self ):
+		return 1
+
+class PlayerManager:
+	def __init__( self, count ):
+		self.players = []
+		for i in xrange( count ):
+			self.players.append( Player( i ) )
+
+	def getPlayers( self ):
+		return self.players
+
+	def getPlayerByIndex( self, index ):
+		if 0 <= index < len( self.players ):
+			return self.players[index]
+		return None
+
+class StubHost:
+	"""The host functions used by ModManager and the loaded modules."""
+	def __init__( self, playerManager ):
+		self.playerManager = playerManager
+		self.handlers = {}
+		self.statusHandlers = []
+
+	def timer_getWallTime( self ):
+		return time.time()
+
+	def registerHandler( self, event, method, alwaysTrigger=0 ):
+		self.handlers.setdefault( event, [] ).append( method )
+
+	def registerGameStatusHandler( self, method ):
+		self.statusHandlers.append( method )
+
+	def unregisterGameStatusHandler( self, method ):
+		if method in self.statusHandlers:
+			self.statusHandlers.remove( method )
+
+	def fire( self, event, *args ):
+		for method in self.handlers.get( event, [] ):
+			method( *args )
+
+	def setGameStatus( self, status ):
+		for method in self.statusHandlers:
+			method( status )
+
+	def sgl_getModDirectory( self ):
+		return 'mods/bench'
+
+	def sgl_getMapName( self ):
+		return mapList[0]
+
+	def sgl_getParam( self, name, team=0, arg=0 ):
+		if 'teamName' == name:
+			return ( 'US', 'MEC' )[team - 1]
+		return 0
+
+	def sgl_getWorldSize( self ):
+		return 64
+
+	def sgl_sendTextMessage( self, *args ):
+		pass
+
+	def ss_getParam( self, name ):
+		return { 'maxPlayers': 64, 'gameMode': 'gpm_cq' }.get( name, 0 )
+
+	def rcon_feedback( self, playerid, msg ):
+		pass
+
+	def rcon_invoke( self, cmd ):
+		cmd = cmd.strip().lower()
+		if 'admin.listplayers' == cmd:
+			lines = []
+			for p in self.playerManager.getPlayers():
+				lines.append( 'Id: %2d - %s is remote ip: %s:16567' % ( p.index, p.getName(), p.getAddress() ) )
+				lines.append( '          CD-key hash: %s' % p.mmCdKeyHash )
+			return '\n'.join( lines ) + '\n'
+		elif 'maplist.list' == cmd:
+			lines = []
+			for i in xrange( len( mapList ) ):
+				lines.append( '%d: "%s" gpm_cq 64' % ( i, mapList[i] ) )
+			return '\n'.join( lines ) + '\n'
+		elif 'maplist.mapcount' == cmd:
+			return str( len( mapList ) )
+		elif 'admin.nextlevel' == cmd:
+			return '1'
+		elif 'admin.currentlevel' == cmd:
+			return '0'
+		elif 'sv.startdelay' == cmd:
+			return '15'
+		elif 'sv.servername' == cmd:
+			return 'Benchmark'
+		return ''
+
+def installStubs( players ):
+	"""Install the host and bf2 modules, returning the host."""
+	playerManager = PlayerManager( players )
+	host = StubHost( playerManager )
+
+	bf2 = imp.new_module( 'bf2' )
+	class GameStatus:
+		PreGame = 0
+		Playing = 1
+		EndGame = 2
+		Paused = 3
+		RestartServer = 4
+		NotConnected = 5
+	bf2.GameStatus = GameStatus
+	bf2.Timer = Stub
+	bf2.playerManager = playerManager
+	bf2.serverSettings = Stub()
+	bf2.gameLogic = Stub()
+	bf2.objectManager = Stub()
+	bf2.stats = imp.new_module( 'bf2.stats' )
+	bf2.stats.constants = imp.new_module( 'bf2.stats.constants' )
+
+	sys.modules['host'] = host
+	sys.modules['bf2'] = bf2
+	sys.modules['bf2.stats'] = bf2.stats
+	sys.modules['bf2.stats.constants'] = bf2.stats.constants
+	return host
+
+def writeConfig( path, port, threaded ):
+	"""Write the modmanager.con for the benchmark."""
+	os.makedirs( os.path.dirname( path ) )
+	config = open( path, 'w' )
+	for line in (
+		'modmanager.autoSave 0',
+		'modmanager.logLevel 1',
+		'modmanager.logModule "mm_logger"',
+		'modmanager.rconModule "mm_rcon"',
+		'modmanager.banManagerModule "mm_banmanager"',
+		'modmanager.moduleBase "modules"',
+		'modmanager.loadModule "mm_bf2cc"',
+		'mm_rcon.rconIp "127.0.0.1"',
+		'mm_rcon.rconPort %d' % port,
+		'mm_rcon.rconPassword "%s"' % password,
+		'mm_rcon.rconListenQueue 1024',
+		'mm_rcon.rconMaxAccepts 64',
+		'mm_rcon.rconThreaded %d' % threaded,
+		):
+		config.write( line + '\n' )
+	config.close()
+
+def freePort():
+	"""Return a free local TCP port."""
+	sock = socket.socket( socket.AF_INET, socket.SOCK_STREAM )
+	sock.bind( ( '127.0.0.1', 0 ) )
+	port = sock.getsockname()[1]
+	sock.close()
+	return port
+
+class ClientProcess( threading.Thread ):
+	"""Runs the load generator in a child process and collects its output."""
+	def __init__( self, args ):
+		threading.Thread.__init__( self )
+		self.args = args
+		self.ready = 0
+		self.result = None
+		self.errors = []
+
+	def run( self ):
+		cmd = '"%s" "%s" %s' % ( sys.executable, script, ' '.join( self.args ) )
+		pipe = os.popen( cmd + ' 2>&1', 'r' )
+		while 1:
+			# iterating would read ahead and see ready too late
+			line = pipe.readline()
+			if not line:
+				break
+			parts = line.split()
+			if parts and 'ready' == parts[0]:
+				self.ready = 1
+			elif parts and 'result' == parts[0]:
+				self.result = map( float, parts[1:] )
+			else:
+				self.errors.append( line.rstrip() )
+		pipe.close()
+
+def measure( mm, port, count, options ):
+	"""Measure count connections, returns the report line."""
+	args = [ '--client', str( port ), str( count ), str( options['rate'] ), str( options['duration'] ), '"%s"' % options['mix'] ]
+	client = ClientProcess( args )
+	client.start()
+
+	interval = 0.0
+	if options['fps']:
+		interval = 1.0 / options['fps']
+
+	frames = []
+	while client.isAlive():
+		start = time.time()
+		mm.update()
+		cost = time.time() - start
+		if client.ready and client.result is None:
+			frames.append( cost )
+		if interval > cost:
+			time.sleep( interval - cost )
+	client.join()
+
+	# let the server close the finished connections before the next count
+	end = time.time() + 0.5
+	while time.time() < end:
+		mm.update()
+		time.sleep( 0.001 )
+
+	if client.result is None:
+		raise RuntimeError( "load generator failed:\n%s" % '\n'.join( client.errors ) )
+
+	( commands, elapsed, p50, p99, worst ) = client.result
+	frames.sort()
+	total = 0.0
+	for cost in frames:
+		total += cost
+	mean = total / max( len( frames ), 1 )
+
+	return "%5d %9.0f %8.2f %8.2f %8.2f %7d %8.1f %8.1f %8.1f" % ( count, commands / elapsed, p50 * 1000, p99 * 1000, worst * 1000, len( frames ), mean * 1000000, percentile( frames, 0.99 ) * 1000000, percentile( frames, 1.0 ) * 1000000 )
+
+def usage():
+	sys.stderr.write( __doc__ )
+	sys.exit( 2 )
+
+def main():
+	if len( sys.argv ) > 1 and '--client' == sys.argv[1]:
+		( port, count, rate, duration, mix ) = sys.argv[2:7]
+		runClients( int( port ), int( count ), float( rate ), float( duration ), mix.split( ',' ) )
+		return
+
+	options = {
+		'rate': 2.0,
+		'duration': 5.0,
+		'fps': 100.0,
+		'players': 32,
+		'bans': 100,
+		'mix': 'bf2cc pl,bf2cc si,exec admin.listPlayers,bm listBans',
+		'threaded': 0,
+	}
+	try:
+		( opts, args ) = getopt.getopt( sys.argv[1:], 'r:d:f:p:b:m:th' )
+	except getopt.GetoptError:
+		usage()
+	for ( opt, value ) in opts:
+		if '-r' == opt:
+			options['rate'] = float( value )
+		elif '-d' == opt:
+			options['duration'] = float( value )
+		elif '-f' == opt:
+			options['fps'] = float( value )
+		elif '-p' == opt:
+			options['players'] = int( value )
+		elif '-b' == opt:
+			options['bans'] = int( value )
+		elif '-m' == opt:
+			options['mix'] = value
+		elif '-t' == opt:
+			options['threaded'] = 1
+		else:
+			usage()
+
+	counts = map( int, args )
+	if not counts:
+		counts = [ 1, 10, 50, 100, 250, 500 ]
+
+	# ModManager writes its logs relative to the working directory
+	cwd = os.getcwd()
+	workdir = tempfile.mkdtemp( '', 'rcon_load' )
+	out = sys.stdout
+	try:
+		os.chdir( workdir )
+		port = freePort()
+		writeConfig( os.path.join( workdir, 'mods', 'bench', 'settings', 'modmanager.con' ), port, options['threaded'] )
+
+		host = installStubs( options['players'] )
+		sys.path.insert( 0, os.path.join( root, 'admin' ) )
+		sys.path.insert( 0, os.path.join( root, 'admin', 'modules' ) )
+		import modmanager
+		import bf2
+
+		mm = modmanager.modManager
+		mm.init()
+		host.setGameStatus( bf2.GameStatus.Playing )
+		for player in bf2.playerManager.getPlayers():
+			host.fire( 'PlayerConnect', player )
+
+		banManager = mm.banManager()
+		for i in xrange( options['bans'] ):
+			banManager.banPlayerKey( 'b%031x' % i, None, 'Benchmark', 'bench', None, True )
+
+		out.write( "%d players, %d bans, %.1f cmds/s per client for %.1fs, %.0f fps%s\n" % ( options['players'], options['bans'], options['rate'], options['duration'], options['fps'], ( '', ', threaded' )[options['threaded']] ) )
+		out.write( "mix: %s\n\n" % options['mix'] )
+		out.write( "conns    cmds/s  p50(ms)  p99(ms)  max(ms)  frames  avg(us)  p99(us)  max(us)\n" )
+		out.flush()
+		try:
+			for count in counts:
+				out.write( measure( mm, port, count, options ) + '\n' )
+				out.flush()
+		finally:
+			mm.shutdown()
+	finally:
+		os.chdir( cwd )
+		shutil.rmtree( workdir, True )
+
+if __name__ == '__main__':
+	main()